@@ -1,6 +1,5 @@
 """Canary Data Converter - an extendable conversion tool"""
 import configparser
-import importlib
 import logging
 import os
 import platform
@@ -39,15 +38,11 @@ CONSOLE_HANDLER.setFormatter(formatter)
 del logger.handlers[:]
 
 # dynamically add files to __all__
-# get all of the files in this directory
+# get all of the files in this directory, they're imported when they're used
 for f in os.listdir(os.path.dirname(__file__)):
     # make sure it's a module
     file_list = f.split('.')
     if f.startswith('_') or 'py' not in file_list[-1]:
         continue
-    # get rid of extension
-    file = file_list[0]
-    # import module
-    mod = importlib.import_module('cdc.{}'.format(file))
-    # append to all
-    __all__.append(file)
+    # get rid of extension and append to all
+    __all__.append(file_list[0])
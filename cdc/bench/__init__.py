@@ -0,0 +1,9 @@
+"""Benchmarks for Canary Data Converter
+
+The corpus module generates synthetic input files and the harness module runs
+them through every Reader and Writer pair, run it with python -m cdc.bench.
+"""
+from . import corpus, harness
+
+# all list for all of the package's modules
+__all__ = ['corpus', 'harness']
@@ -0,0 +1,69 @@
+"""Module that allows the benchmarks to be run as a Python script"""
+import os
+import sys
+
+# add outer directory to path so toplevel package can import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import argparse
+import multiprocessing
+import shutil
+import tempfile
+from cdc.bench import corpus, harness
+
+def main():
+    """Generates a corpus (unless one is given) and benchmarks it"""
+    # This is needed for freezing on Windows
+    multiprocessing.freeze_support()
+
+    parser = argparse.ArgumentParser(description='Benchmark Canary Data Converter on synthetic files')
+    # options for the generated corpus
+    parser.add_argument('--corpus', action='store', default=None, help='Folder with rpdr, epic, delim, csv and jsonl subfolders to convert instead of generating files (generated files are kept here if it doesn\'t exist)')
+    parser.add_argument('--formats', nargs='+', default=list(corpus.FORMATS), choices=list(corpus.FORMATS), help='The formats to generate')
+    parser.add_argument('--files', type=int, default=4, help='The number of files of each format')
+    parser.add_argument('--records', type=int, default=1000, help='The number of records in each file')
+    parser.add_argument('--record-lines', type=int, default=20, help='The average number of lines in each record')
+    parser.add_argument('--line-length', type=int, default=70, help='The number of characters in each line')
+    parser.add_argument('--header-width', type=int, default=10, help='The number of metadata fields in RPDR, Epic Text, CSV and JSON Lines files')
+    parser.add_argument('--skew', type=float, default=0.0, help='How uneven the record lengths are, 0 for all the same')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated text')
+    # options for the runs
+    parser.add_argument('--processes', type=int, nargs='+', default=[1], help='The process counts to run each case with')
+    parser.add_argument('--variants', nargs='+', default=list(harness.VARIANTS), choices=list(harness.VARIANTS), help='The writer option variants to run')
+    parser.add_argument('--readers', nargs='+', default=None, help='Only run these readers (CLI labels)')
+    parser.add_argument('--writers', nargs='+', default=None, help='Only run these writers (CLI labels)')
+    parser.add_argument('--output', '-o', default='cdc_benchmark.json', help='The JSON file to write results to')
+    args = parser.parse_args()
+
+    # generate the corpus in a temporary folder unless one was given
+    temp_dir = None
+    if args.corpus is not None and os.path.isdir(args.corpus):
+        folders = {name: os.path.join(args.corpus, name) for name in corpus.FORMATS if os.path.isdir(os.path.join(args.corpus, name))}
+    else:
+        folder = args.corpus
+        if folder is None:
+            folder = temp_dir = tempfile.mkdtemp(prefix='cdc-corpus-')
+        print('Generating corpus in {}'.format(folder))
+        folders = corpus.generate_corpus(folder, args.formats, args.files, records=args.records,
+                                         record_lines=args.record_lines, line_length=args.line_length,
+                                         header_width=args.header_width, skew=args.skew, seed=args.seed)
+
+    def report(result):
+        """Prints a line for each finished case"""
+        if result['mb_per_second'] is None:
+            speed = 'failed'
+        else:
+            speed = '{:.2f} MB/s, {:.0f} records/s'.format(result['mb_per_second'], result['records_per_second'])
+        errors = ' ({} errors)'.format(len(result['errors'])) if result['errors'] else ''
+        print('{} -> {} [{}, {} processes]: {}{}'.format(result['reader'], result['writer'], result['variant'], result['processes'], speed, errors))
+
+    try:
+        results = harness.run_benchmarks(folders, args.processes, args.variants, args.readers, args.writers, report=report)
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    harness.write_results(results, args.output)
+    print('Results written to {}'.format(os.path.abspath(args.output)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Generates synthetic RPDR, Epic Text, delimited text, CSV and JSON Lines files for benchmarks"""
+import csv
+import datetime
+import json
+import math
+import os
+import random
+
+# delimiter between documents in the delimited text files
+DELIMITER = '[document_end]'
+
+# words the text is made from, so the text wraps and unwraps like real notes
+WORDS = ('the patient was seen today for follow up of chronic pain and reports '
+         'improvement since last visit no acute distress noted exam is within '
+         'normal limits plan to continue current medications and return in '
+         'three months history of hypertension diabetes and asthma').split()
+
+# metadata fields for each format, extra fields are added for wider headers
+RPDR_FIELDS = ['EMPI', 'EPIC_PMRN', 'MRN_Type', 'MRN', 'Report_Number', 'Report_Date_Time', 'Report_Description', 'Report_Status', 'Report_Type']
+EPIC_FIELDS = ['PAT_ID', 'NOTE_ID', 'CONTACT_DATE', 'NOTE_TYPE', 'LINE']
+CSV_FIELDS = ['PAT_ID', 'NOTE_ID', 'CONTACT_DATE', 'NOTE_TYPE']
+JSONL_FIELDS = ['pat_id', 'note_id', 'contact_date', 'note_type']
+
+# date fields and how they're formatted in each format, the formats are ones the record filter reads
+DATE_FIELDS = {
+    'Report_Date_Time': '%m/%d/%Y %I:%M:%S %p',
+    'CONTACT_DATE': '%m/%d/%Y',
+    'contact_date': '%Y-%m-%d'
+}
+
+# values to choose from for fields that are one of a few categories
+CHOICE_FIELDS = {
+    'MRN_Type': ['BWH', 'MGH', 'NWH'],
+    'Report_Description': ['Progress Note', 'Discharge Summary', 'Radiology Report', 'Consult Note'],
+    'Report_Status': ['F', 'P'],
+    'Report_Type': ['PRG', 'DIS', 'RAD', 'CON'],
+    'NOTE_TYPE': ['Progress Notes', 'Discharge Summary', 'Consults', 'H&P'],
+    'note_type': ['Progress Notes', 'Discharge Summary', 'Consults', 'H&P']
+}
+
+# the dates are spread through these years
+FIRST_DATE = datetime.datetime(2000, 1, 1)
+LAST_DATE = datetime.datetime(2020, 12, 31, 23, 59, 59)
+
+class CorpusGenerator(object):
+    """
+    Writes synthetic input files. The number of lines in each record is drawn
+    from a log-normal distribution around record_lines, so a skew of 0 gives
+    records that are all the same length and larger values give a few very
+    long records among many short ones.
+    """
+
+    def __init__(self, records=1000, record_lines=20, line_length=70, header_width=10, skew=0.0, seed=0):
+        self.records = records
+        self.record_lines = record_lines
+        self.line_length = line_length
+        self.header_width = header_width
+        self.skew = skew
+        # seed the generator so the same options give the same files
+        self.random = random.Random(seed)
+
+    def get_fields(self, fields, text_field):
+        """Returns the header fields padded out to the header width"""
+        fields = list(fields)
+        extra = max(self.header_width - len(fields) - 1, 0)
+        fields += ['Extra_Field_{}'.format(i + 1) for i in range(extra)]
+        return fields + [text_field]
+
+    def get_line_count(self):
+        """Returns the number of lines for the next record"""
+        if not self.skew:
+            return self.record_lines
+        # the mean of the distribution is record_lines whatever the skew
+        mu = math.log(self.record_lines) - self.skew ** 2 / 2
+        return max(int(round(self.random.lognormvariate(mu, self.skew))), 1)
+
+    def get_line(self):
+        """Returns a line of text about line_length characters long"""
+        words = []
+        length = 0
+        while length < self.line_length:
+            word = self.random.choice(WORDS)
+            words.append(word)
+            length += len(word) + 1
+        return ' '.join(words)
+
+    def get_date(self, date_format):
+        """Returns a random date between FIRST_DATE and LAST_DATE in date_format"""
+        seconds = self.random.randint(0, int((LAST_DATE - FIRST_DATE).total_seconds()))
+        return (FIRST_DATE + datetime.timedelta(seconds=seconds)).strftime(date_format)
+
+    def get_values(self, fields, index):
+        """Returns metadata values for a record"""
+        values = []
+        for field in fields:
+            if field in DATE_FIELDS:
+                values.append(self.get_date(DATE_FIELDS[field]))
+            elif field in CHOICE_FIELDS:
+                values.append(self.random.choice(CHOICE_FIELDS[field]))
+            else:
+                values.append('{}_{}'.format(field.split('_')[0].upper(), index))
+        return values
+
+    def write_rpdr(self, path):
+        """Writes a pipe-delimited RPDR file"""
+        fields = self.get_fields(RPDR_FIELDS, 'Report_Text')
+        with open(path, 'w', encoding='utf8', newline='\n') as file:
+            file.write('|'.join(fields) + '\n')
+            for index in range(self.records):
+                # the text starts on the same line as the metadata
+                file.write('|'.join(self.get_values(fields[:-1], index) + [self.get_line()]) + '\n')
+                for _ in range(self.get_line_count() - 1):
+                    file.write(self.get_line() + '\n')
+                file.write('[report_end]\n')
+        return path
+
+    def write_epic(self, path):
+        """Writes a tab-delimited Epic Text file with a row for each line of text"""
+        fields = self.get_fields(EPIC_FIELDS, 'NOTE_TEXT')
+        with open(path, 'w', encoding='utf8', newline='\n') as file:
+            file.write('\t'.join(fields) + '\n')
+            for index in range(self.records):
+                values = self.get_values(fields[:-1], index)
+                for _ in range(self.get_line_count()):
+                    file.write('\t'.join(values + [self.get_line()]) + '\n')
+        return path
+
+    def write_delim(self, path):
+        """Writes a plain text file with documents separated by DELIMITER"""
+        with open(path, 'w', encoding='utf8', newline='\n') as file:
+            for index in range(self.records):
+                for _ in range(self.get_line_count()):
+                    file.write(self.get_line() + '\n')
+                file.write(DELIMITER + '\n')
+        return path
+
+    def write_csv(self, path):
+        """Writes a CSV file with a row for each record, its text quoted with the line breaks in it"""
+        fields = self.get_fields(CSV_FIELDS, 'NOTE_TEXT')
+        with open(path, 'w', encoding='utf8', newline='') as file:
+            writer = csv.writer(file, lineterminator='\n')
+            writer.writerow(fields)
+            for index in range(self.records):
+                text = '\n'.join(self.get_line() for _ in range(self.get_line_count()))
+                writer.writerow(self.get_values(fields[:-1], index) + [text])
+        return path
+
+    def write_jsonl(self, path):
+        """Writes a JSON Lines file with an object for each record"""
+        fields = self.get_fields(JSONL_FIELDS, 'text')
+        with open(path, 'w', encoding='utf8', newline='\n') as file:
+            for index in range(self.records):
+                record = dict(zip(fields[:-1], self.get_values(fields[:-1], index)))
+                record['text'] = '\n'.join(self.get_line() for _ in range(self.get_line_count()))
+                file.write(json.dumps(record) + '\n')
+        return path
+
+# map of format to the generator method that writes it
+FORMATS = {
+    'rpdr': CorpusGenerator.write_rpdr,
+    'epic': CorpusGenerator.write_epic,
+    'delim': CorpusGenerator.write_delim,
+    'csv': CorpusGenerator.write_csv,
+    'jsonl': CorpusGenerator.write_jsonl
+}
+
+# the extension of the files of each format, if it isn't txt
+EXTENSIONS = {
+    'csv': 'csv',
+    'jsonl': 'jsonl'
+}
+
+def generate_corpus(folder, formats=None, files=1, **kwargs):
+    """Writes files of each format into its own subfolder of folder,
+    returns a dict of format to subfolder"""
+    # the keyword arguments go to CorpusGenerator
+    generator = CorpusGenerator(**kwargs)
+    folders = {}
+    for name in formats or FORMATS:
+        subfolder = os.path.join(folder, name)
+        os.makedirs(subfolder, exist_ok=True)
+        for number in range(files):
+            FORMATS[name](generator, os.path.join(subfolder, '{}_{}.{}'.format(name, number, EXTENSIONS.get(name, 'txt'))))
+        folders[name] = subfolder
+    return folders
@@ -0,0 +1,218 @@
+"""Runs benchmark conversions through cdc.convert and measures their throughput"""
+import datetime
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import timeit
+import cdc
+from .. import read, write
+from ..convert import ConversionThread, WorkerPool
+from . import corpus
+
+# resource isn't available on Windows, so peak memory isn't measured there
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# corpus format to convert with each reader, readers without one are skipped
+READER_FORMATS = {
+    'ReadRPDR': 'rpdr',
+    'ReadEpicText': 'epic',
+    'ReadCSV': 'csv',
+    'ReadJSONL': 'jsonl',
+    'ReadDelimTXT': 'delim',
+    'ReadTXT': 'delim'
+}
+
+# the options each variant changes from the defaults
+VARIANTS = {
+    'plain': {},
+    'lowercase': {'lowercase': True},
+    'wrap': {'text_wrap': 80},
+    'unwrap': {'text_unwrap': True},
+    'fast': {'fast_engine': True}
+}
+
+def get_handlers():
+    """Returns the Reader and Writer classes, each only once"""
+    readers = sorted(set(plugin.load() for plugin in read.CLI_KEYS.values()), key=lambda Reader: Reader.__name__)
+    writers = sorted(set(plugin.load() for plugin in write.CLI_KEYS.values()), key=lambda Writer: Writer.__name__)
+    return readers, writers
+
+def get_options(Reader, Writer, input_dir, output_dir, processes, variant):
+    """Returns an options dict like the interfaces create, with the defaults
+    from the UC_PROPS and the benchmark's input and output"""
+    options = {}
+    for prop in Reader.UC_PROPS + Writer.UC_PROPS + ConversionThread.UC_PROPS:
+        options[prop['var']] = prop['default']
+    options.update({
+        'input_dir': input_dir,
+        'output_dir': output_dir,
+        'sep_delim': corpus.DELIMITER,
+        'processes': processes
+    })
+    options.update(VARIANTS[variant])
+    return options
+
+def get_peak_rss():
+    """Returns the peak resident memory in bytes of this process and of its
+    finished child processes, or None if it can't be measured"""
+    if resource is None:
+        return None
+    # ru_maxrss is in bytes on macOS and kilobytes everywhere else
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return {
+        'main': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        'workers': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    }
+
+def run_conversion(Reader, Writer, options):
+    """Runs a conversion the way the CLI does and returns its results"""
+    comm = queue.Queue()
+    pool = WorkerPool(options['processes'])
+    conversion = ConversionThread(options, Reader, Writer, comm, pool)
+    conversion.daemon = True
+    start = timeit.default_timer()
+    conversion.start()
+    # collect the queues for each job until the conversion calls back
+    job_queues = []
+    while True:
+        msg = comm.get()
+        if msg == 'callback':
+            # the error message is only there if the conversion couldn't run
+            callback_args = comm.get()
+            cancelled = callback_args[0]
+            error_message = callback_args[1] if len(callback_args) > 1 else None
+            break
+        elif not isinstance(msg, (int, str)):
+            job_queues.append(msg)
+    stop = timeit.default_timer()
+    # every job is finished, so read each progress queue up to its sentinel
+    records = 0
+    warnings = 0
+    errors = [error_message] if error_message is not None else []
+    for progress_queue, msg_queue in job_queues:
+        last = None
+        while True:
+            # a worker that crashed never sends its sentinel
+            try:
+                prog = progress_queue.get(timeout=10)
+            except queue.Empty:
+                errors.append('No result from a job, its worker may have crashed')
+                break
+            if isinstance(prog, str):
+                break
+            elif isinstance(prog, list):
+                continue
+            else:
+                last = prog
+                if prog['error'] is not None:
+                    errors.append('{}, {}'.format(prog['error']['filename'], prog['error']['message']))
+        # only the first few warnings of each kind are sent, but all of them are counted
+        if last is not None:
+            warnings += sum(last.get('warnings', {}).values())
+        # a split file's records are counted by its chunks, not the job that merges them,
+        # and a file that was only touched isn't converted again
+        if (last is not None and last['state'] == 'Finished'
+                and 'merged_parts' not in last and not last.get('unchanged')):
+            # readers that don't count records read a single document
+            records += last.get('processed', 1)
+    # stop the workers so their memory use is counted as finished children
+    pool.shutdown()
+    # close the conversion's log file like the interfaces do
+    if conversion.logfile is not None:
+        conversion.logfile.close()
+        conversion.logger.removeHandler(conversion.logfile)
+    return {
+        'seconds': stop - start,
+        'records': records,
+        'warnings': warnings,
+        'errors': errors,
+        'cancelled': cancelled,
+        'peak_rss': get_peak_rss()
+    }
+
+def case_process(conn, Reader, Writer, options):
+    """Runs a conversion in its own process so memory is measured per case"""
+    try:
+        conn.send(run_conversion(Reader, Writer, options))
+    finally:
+        conn.close()
+
+def run_case(Reader, Writer, input_dir, output_dir, processes, variant):
+    """Converts input_dir into an empty output_dir and returns the result dict"""
+    options = get_options(Reader, Writer, input_dir, output_dir, processes, variant)
+    size = sum(os.path.getsize(os.path.join(input_dir, f)) for f in os.listdir(input_dir))
+    # run in a child process, the results come back through a pipe
+    reader_conn, writer_conn = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=case_process, args=(writer_conn, Reader, Writer, options))
+    process.start()
+    writer_conn.close()
+    try:
+        result = reader_conn.recv()
+    except EOFError:
+        result = {'seconds': None, 'records': 0, 'warnings': 0, 'errors': ['Benchmark process exited with code {}'.format(process.exitcode)], 'cancelled': True, 'peak_rss': None}
+    process.join()
+    result.update({
+        'reader': Reader.__name__,
+        'writer': Writer.__name__,
+        'variant': variant,
+        'processes': processes,
+        'files': len(os.listdir(input_dir)),
+        'bytes': size
+    })
+    # throughput is only meaningful if it finished
+    if result['seconds']:
+        result['mb_per_second'] = size / 1024 / 1024 / result['seconds']
+        result['records_per_second'] = result['records'] / result['seconds']
+    else:
+        result['mb_per_second'] = None
+        result['records_per_second'] = None
+    return result
+
+def run_benchmarks(input_folders, processes=(1,), variants=None, readers=None, writers=None, work_dir=None, report=None):
+    """Runs every Reader and Writer pair with each variant and process count,
+    returns a dict with information about the machine and a list of results.
+    input_folders maps corpus format to a folder, like generate_corpus returns"""
+    all_readers, all_writers = get_handlers()
+    results = []
+    # the output goes to a temporary folder that's emptied for each case
+    work_dir = tempfile.mkdtemp(prefix='cdc-bench-', dir=work_dir)
+    try:
+        for Reader in all_readers:
+            name = READER_FORMATS.get(Reader.__name__)
+            if name is None or name not in input_folders:
+                continue
+            if readers and not set(Reader.CLI_LABELS) & set(readers):
+                continue
+            for Writer in all_writers:
+                if writers and not set(Writer.CLI_LABELS) & set(writers):
+                    continue
+                for variant in variants or VARIANTS:
+                    for count in processes:
+                        output_dir = os.path.join(work_dir, 'output')
+                        os.makedirs(output_dir)
+                        result = run_case(Reader, Writer, input_folders[name], output_dir, count, variant)
+                        shutil.rmtree(output_dir)
+                        results.append(result)
+                        if report is not None:
+                            report(result)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        'version': cdc.__version__,
+        'platform': cdc.os_string,
+        'cpu_count': multiprocessing.cpu_count(),
+        'date': datetime.datetime.now().isoformat(),
+        'results': results
+    }
+
+def write_results(results, path):
+    """Writes the results to a JSON file"""
+    with open(path, 'w', encoding='utf8') as file:
+        json.dump(results, file, indent=2)
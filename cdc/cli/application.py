@@ -12,7 +12,9 @@ import threading
 import time
 import tkinter as tk
 import cdc
-from ..convert import ConversionThread
+from ..convert import ConversionThread, WorkerPool
+from ..utils.timing import format_timings
+from ..utils.warninglog import format_warning, summarize
 from .. import cli, config, gui, read, write
 
 class CommandLineInterface(object):
@@ -41,6 +43,9 @@ class CommandLineInterface(object):
             # create variable to store conversion thread
             self.conversion = None
 
+            # create variable to store the worker pool
+            self.pool = None
+
             # get reader and writer class dicts
             reader_keys = read.CLI_KEYS
             writer_keys = write.CLI_KEYS
@@ -84,6 +89,9 @@ class CommandLineInterface(object):
             for writer in list(set(writer_keys.values())):
                 self.cli_options(writer)
 
+            # add the conversion options
+            self.cli_options(ConversionThread)
+
             # parse the arguments
             args = self.parser.parse_args()
 
@@ -110,8 +118,8 @@ class CommandLineInterface(object):
 
                 # make sure there was an input format provided
                 if self.options['input-format']:
-                    # get reader class
-                    Reader = reader_keys[self.options['input-format']]
+                    # get reader class, its module is only imported now
+                    Reader = reader_keys[self.options['input-format']].load()
                     
                     # validate the reader options
                     validate_options(Reader, self.options, 'reader')
@@ -122,8 +130,8 @@ class CommandLineInterface(object):
 
                 # make sure there was an output format provided
                 if self.options['output-format']:
-                    # get writer class
-                    Writer = writer_keys[self.options['output-format']]
+                    # get writer class, its module is only imported now
+                    Writer = writer_keys[self.options['output-format']].load()
 
                     # validate writer options
                     validate_options(Writer, self.options, 'writer')
@@ -132,8 +140,11 @@ class CommandLineInterface(object):
                     cli.LOGGER.error('Must enter output format.')
                     sys.exit()
 
+                # start the worker pool
+                self.pool = WorkerPool(max(self.options['processes'], 1))
+
                 # instantiate conversion thread
-                self.conversion = ConversionThread(self.options, Reader, Writer, self.comm)
+                self.conversion = ConversionThread(self.options, Reader, Writer, self.comm, self.pool)
 
                 # set daemon to true so it terminates when main thread does
                 # this is important for ctrl+c to cancel
@@ -200,6 +211,10 @@ class CommandLineInterface(object):
         # if gui is running, close it
         elif self.gui:
             self.gui.close()
+        # stop the workers
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
         # clear running event
         if self.running.is_set():
             self.running.clear()
@@ -240,6 +255,11 @@ class CommandLineInterface(object):
                 # call cancel if KeyboardInterrupt is received
                 self.cancel()
 
+        # stop the workers now that the progress is processed
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
         # log finished message and timestamp
         cli.LOGGER.info('FINISHED')
         if process_time is not None:
@@ -319,6 +339,9 @@ def process_queues(queues, running, cancelled, show_progress):
         # create message variable
         message = ''
 
+        # list of queues for jobs that are done so we can stop checking them
+        finished = []
+
         # iterate over queues
         for progress_queue, msg_queue in queues:
             # create done variable to check for sentinel message
@@ -335,11 +358,13 @@ def process_queues(queues, running, cancelled, show_progress):
                         done = True
 
                         # the sentinel message is the conversion_id, so get the last progress dictionary from the progress_didct
+                        # (if the reader failed before it had an ID, its error was already logged)
+                        if prog not in progress_dict:
+                            break
                         prog = progress_dict[prog]
                     elif isinstance(prog, list):
                         for warning in prog:
-                            # check for a line number and log the warning
-                            cli.LOGGER.warning(' | '.join(warning.split(' | ')[1:]))
+                            cli.LOGGER.warning(format_warning(warning))
                         break
                     else:
                         # store progress dict in progress_dict of all queues
@@ -355,10 +380,19 @@ def process_queues(queues, running, cancelled, show_progress):
                     # if finished and there is no error and queue is done
                     if prog['state'] == 'Finished' and prog['error'] is None and done:
                         # log success, files processed if provided
-                        if 'processed' in prog:
-                            cli.LOGGER.info('SUCCESS - {} | {} records processed'.format(prog['filename'], prog['processed']))
+                        if prog.get('unchanged'):
+                            message = 'UNCHANGED - {} | the output from before is kept'.format(prog['filename'])
+                        elif 'processed' in prog:
+                            message = 'SUCCESS - {} | {} records processed'.format(prog['filename'], prog['processed'])
+                            # and how many were skipped if the records were filtered
+                            if prog.get('filtered'):
+                                message += ', {} filtered out'.format(prog['filtered'])
                         else:
-                            cli.LOGGER.info('SUCCESS - {}'.format(prog['filename']))
+                            message = 'SUCCESS - {}'.format(prog['filename'])
+                        # add where the time went if it was timed
+                        if prog.get('timings'):
+                            message = '{} | {}'.format(message, format_timings(prog['timings']))
+                        cli.LOGGER.info(message)
 
                         # log output path
                         if 'output_path' in prog:
@@ -374,23 +408,43 @@ def process_queues(queues, running, cancelled, show_progress):
                         # set error to None so that it doesn't get logged again
                         prog['error'] = None
 
+                    # say how many warnings there were that weren't logged
+                    if done:
+                        for message in summarize(prog):
+                            cli.LOGGER.warning(message)
+
                     # update the progress_dict of all progress dictionaries
                     progress_dict[prog['conversion_id']].update(prog)
-                    
+
+            # stop checking the queues once the sentinel message is received
+            if done:
+                finished.append((progress_queue, msg_queue))
+
+        # remove the finished queues
+        for queues_tuple in finished:
+            queues.remove(queues_tuple)
+
+        # if every queue is finished and conversion isn't running, we're done
+        if not queues and not running.is_set():
+            stop = True
+
         # if user chose to have progress reported
         if show_progress:
             # iterate over progress dictionaries for each file
             for value in progress_dict.values():
                 # only display if running or error
-                if value['state'] == 'Running' or value['state'] == 'Error' or value['state'] == 'Reading' or value['state'] == 'Writing':
+                if value['state'] == 'Running' or value['state'] == 'Error' or value['state'] == 'Reading' or value['state'] == 'Writing' or value['state'] == 'Merging' or value['state'] == 'Grouping' or value['state'] == 'Indexing':
                     # get percent and add to message
                     try:
                         pct = int(value['progress'] / value['size'] * 100)
                     except ZeroDivisionError:
                         pct = 0
                     
-                    # add to the message string
-                    message += '{} - {} - {}%\n'.format(value['filename'], value['state'], pct)
+                    # add to the message string, with the records if the reader knows how many there are
+                    if value.get('records'):
+                        message += '{} - {} - {}% ({} of {} records)\n'.format(value['filename'], value['state'], pct, value.get('processed', 0) + value.get('filtered', 0), value['records'])
+                    else:
+                        message += '{} - {} - {}%\n'.format(value['filename'], value['state'], pct)
             
             # clear terminal (this should work cross-platform)
             # VERY BUGGY, there aren't great cross-platform alternatives
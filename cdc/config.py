@@ -10,6 +10,13 @@ def create_config():
     config['MAIN']['create_logfile'] = 'True'
     config.set('MAIN', '; This setting is the time format for the logfile name. See datetime docs for strftime for formatting details.')
     config['MAIN']['logfile_timestamp'] = '%%Y-%%m-%%d-%%H.%%M.%%S'
+    config.set('MAIN', '; This setting is the name of the manifest of converted files in the output folder (used to skip unchanged files)')
+    config['MAIN']['manifest_filename'] = 'canary_manifest.jsonl'
+    config.set('MAIN', '; The number of found files to sort by size at a time when converting the largest or smallest files first')
+    config['MAIN']['job_order_window'] = '256'
+    config.set('MAIN', '; Where to cache the list of readers and writers so their modules are only imported when they\'re chosen.')
+    config.set('MAIN', '; Leave blank to keep it in the cdc folder')
+    config['MAIN']['plugin_cache'] = ''
     config['CLI'] = {}
     config.set('CLI', '# CLI settings')
     config.set('CLI', '; Check the CLI communication queue every n milliseconds')
@@ -32,32 +39,73 @@ def create_config():
     config.set('GUI', 'comm_queue_refresh_rate', '100')
     config['PROGRESS'] = {}
     config.set('PROGRESS', '# Settings related to progress updates in the GUI')
-    config.set('PROGRESS', '; Rate to update progress, measured in lines of the input file (updates progress every n lines)')
-    config['PROGRESS']['report_rate'] = '10000'
+    config.set('PROGRESS', '; Seconds between progress updates from each file being converted')
+    config['PROGRESS']['report_interval'] = '0.2'
     config.set('PROGRESS', '; Update the GUI progress bars every n milliseconds')
     config['PROGRESS']['gui_refresh_rate'] = '100'
     config.set('PROGRESS', '; Update the CLI progress every n milliseconds')
     config['PROGRESS']['cli_refresh_rate'] = '100'
     config.set('PROGRESS', '; The number of warnings to send to the main process at a time')
     config['PROGRESS']['warning_list_size'] = '1000'
+    config.set('PROGRESS', '; The number of warnings of each kind for a file to show and log, the rest are counted')
+    config.set('PROGRESS', '; and written to a "<file> warnings.log" file in the output folder')
+    config['PROGRESS']['warning_examples'] = '20'
     config['WRITE'] ={}
     config.set('WRITE', '# Settings related to writing')
     config.set('WRITE', '; Writing buffer size')
     config['WRITE']['OutputBufferSize'] = '8192'
+    config.set('WRITE', '; Save a checkpoint every n seconds when resuming is enabled')
+    config['WRITE']['checkpoint_interval'] = '30'
     config['write.canary'] = {}
     config.set('write.canary', '# Settings related to the Canary writer')
     config.set('write.canary', '; Possible ID fields for Canary format (comma-delimited list)')
     config['write.canary']['Autodetect_HeaderList'] = ', '.join(['Autodetect', 'NOTE_ID', 'Report_Number', 'Record_Id', 'Encounter_Number', 'Accession', 'Accession_Number', 'Microbiology_Number', "*time"])
+    config['write.jsonl'] = {}
+    config.set('write.jsonl', '# Settings related to the JSON Lines writer')
+    config.set('write.jsonl', '; Writing buffer size, records are collected in it and written to the file together')
+    config['write.jsonl']['buffer_size'] = '1048576'
+    config['read.txt'] = {}
+    config.set('read.txt', '# Settings related to the plain text reader')
+    config.set('read.txt', '; Largest part of a document (in characters) to hold in memory at a time when the writer can take it in parts, 0 to read the whole file at once')
+    config['read.txt']['stream_part_size'] = '16777216'
+    config.set('read.txt', '; Folder to save record indexes in, leave empty to save them in the cdc/index folder in the user\'s cache folder')
+    config['read.txt']['index_folder'] = ''
+    config.set('read.txt', '; Bytes in each block decoded when checking the encoding of a file before converting it')
+    config['read.txt']['encoding_check_block_size'] = '1048576'
+    config.set('read.txt', '; Number of blocks spread through a file to decode when checking its encoding, 0 to decode the whole file')
+    config['read.txt']['encoding_check_blocks'] = '16'
+    config.set('read.txt', '; Encodings to try, in order, when a file can\'t be read with the chosen one (comma-delimited list)')
+    config['read.txt']['encoding_candidates'] = ', '.join(['utf8', 'cp1252', 'latin1'])
+    config.set('read.txt', '; Date formats to try when a record filter compares a field to a date (comma-delimited list). See datetime docs for strftime for formatting details.')
+    config['read.txt']['filter_date_formats'] = ', '.join(['%%m/%%d/%%Y %%I:%%M:%%S %%p', '%%m/%%d/%%Y %%H:%%M:%%S', '%%m/%%d/%%Y %%H:%%M', '%%m/%%d/%%Y', '%%Y-%%m-%%d %%H:%%M:%%S', '%%Y-%%m-%%d'])
     config['read.rpdr'] = {}
     config.set('read.rpdr', '# Settings related to the RPDR reader')
     config.set('read.rpdr', '; Possible text fields for RPDR format (comma-delimited list)')
     config['read.rpdr']['Text_Fields'] = ', '.join(['Report_Text', 'Comments', 'Organism_Text'])
+    config.set('read.rpdr', '; Possible ID fields for RPDR records, saved in record indexes (comma-delimited list)')
+    config['read.rpdr']['Id_Fields'] = ', '.join(['Report_Number', 'Accession', 'Accession_Number', 'Record_Id', 'Encounter_Number', 'Microbiology_Number'])
     config['read.epic'] = {}
     config.set('read.epic', '# Settings related to the Epic Text reader')
     config.set('read.epic', '; Possible text fields for Epic Text  (comma-delimited list)')
     config['read.epic']['Text_Fields'] = ', '.join(['NOTE_TEXT'])
     config.set('read.epic', '; Possible ID fields for Epic Text to distinguish between records (comma-delimited list)')
     config['read.epic']['Autodetect_Epic_ID'] = ', '.join(['Autodetect', 'NOTE_ID'])
+    config.set('read.epic', '; Characters of lines to sort in memory before writing them to a temporary file when grouping records by ID')
+    config['read.epic']['group_buffer_size'] = '16777216'
+    config['read.csv'] = {}
+    config.set('read.csv', '# Settings related to the CSV reader')
+    config.set('read.csv', '; Possible text columns for CSV files (comma-delimited list)')
+    config['read.csv']['Text_Columns'] = ', '.join(['NOTE_TEXT', 'Report_Text', 'Text', 'Note', 'Comments'])
+    config.set('read.csv', '; Possible ID columns for CSV files, rows next to each other with the same ID are one record (comma-delimited list)')
+    config['read.csv']['Id_Columns'] = ', '.join(['NOTE_ID', 'Report_Number', 'Record_Id', 'Id'])
+    config.set('read.csv', '; Characters of rows to sort in memory before writing them to a temporary file when grouping records by ID')
+    config['read.csv']['group_buffer_size'] = '16777216'
+    config.set('read.csv', '; Largest field (in characters) the CSV reader will read, a note\'s text is read into memory in one piece')
+    config['read.csv']['field_size_limit'] = '2147483647'
+    config['read.jsonl'] = {}
+    config.set('read.jsonl', '# Settings related to the JSON Lines reader')
+    config.set('read.jsonl', '; Possible text fields for JSON Lines files, the first one in the first object is used (comma-delimited list)')
+    config['read.jsonl']['Text_Fields'] = ', '.join(['text', 'note_text', 'report_text', 'note', 'body'])
     filedir = os.path.abspath(os.path.dirname(__file__))
     with open(os.path.join(filedir, 'canarydc.ini'), 'w') as configfile:
         config.write(configfile)
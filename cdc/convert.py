@@ -1,29 +1,163 @@
-"""This module spawns the conversion thread and the processes for each job"""
+"""This module spawns the conversion thread and the worker pool for the jobs"""
 import datetime
 import logging
 import multiprocessing
+import multiprocessing.connection
 import os
 import queue
+import shutil
 import sys
-import time
+import tempfile
 import timeit
 import threading
 import traceback
 import cdc
 from . import read
+from .utils.encoding import check_encoding, find_encoding, is_ascii_compatible
+from .utils.checkpoint import Checkpoint, get_path as checkpoint_path
+from .utils.manifest import Manifest, describe_input, hash_file, remove_outputs
+from .utils.timing import add_timings, format_timings
+from .utils.ucprop import UCPropMixin
 
 LOG_TIME_FORMAT = cdc.CONFIG.get('MAIN', 'logfile_timestamp', fallback='%Y-%m-%d-%H.%M.%S')
 
-class ConversionThread(threading.Thread):
+# the number of found files to sort by size at a time, for the largest or smallest first
+JOB_ORDER_WINDOW = cdc.CONFIG.getint('MAIN', 'job_order_window', fallback=256)
+
+# seconds to wait for cancelled chunks to stop before deleting the folder of their parts
+PARTS_CLEANUP_TIMEOUT = 30
+
+class ConversionThread(UCPropMixin, threading.Thread):
     """Class representing a new thread for the conversion"""
-    def __init__(self, options, Reader, Writer, comm):
+
+    # conversion options, in addition to the number of processes
+    UC_PROPS = [
+        {'flag': '--chunk',
+         'name': '--chunk-size',
+         'label': 'Split Large Files (MB per Chunk)',
+         'action': 'store',
+         'default': None,
+         'gui_default': 256,
+         'type': int,
+         'help': ('Split files larger than this many megabytes into chunks that are converted '
+                  'in parallel and then merged back together. Only works for formats that '
+                  'can be split, like RPDR, Delimited Plain Text and JSON Lines to a single output file.'),
+         'var': 'chunk_size',
+         'position': 0,
+         'required': False},
+        {'flag': '--order',
+         'name': '--job-order',
+         'label': 'Job Order',
+         'action': 'store',
+         'default': 'discovered',
+         'type': str,
+         'help': ('The order to convert the files in. As-discovered keeps the order the files were found in, '
+                  'converting the largest files first keeps all of the processes busy until the end, and '
+                  'converting the smallest files first gives results sooner. Files are sorted by size as '
+                  'they\'re found, a few hundred at a time, so converting starts before all of them are found.'),
+         'choices': ['discovered', 'largest', 'smallest'],
+         'var': 'job_order',
+         'position': 1,
+         'required': True},
+        {'flag': '--incremental',
+         'name': '--skip-unchanged',
+         'label': 'Skip Unchanged Files',
+         'action': 'store_true',
+         'default': False,
+         'help': ('Keep a manifest of the converted files in the output folder and skip the files '
+                  'that haven\'t changed (same size, modified time and options) since they were '
+                  'last converted there. The old output of a changed file is replaced.'),
+         'var': 'incremental',
+         'position': 2,
+         'required': False},
+        {'flag': '--hash',
+         'name': '--compare-contents',
+         'label': 'Compare File Contents When Skipping',
+         'action': 'store_true',
+         'default': False,
+         'help': ('With --incremental, if a file\'s modified time changed but its size didn\'t, compare '
+                  'a hash of its contents to the last conversion\'s and keep the output if they\'re the same. '
+                  'The workers hash each file they convert, which reads it one more time.'),
+         'var': 'incremental_hash',
+         'position': 3,
+         'required': False},
+        {'flag': '--resume',
+         'name': '--resume-from-checkpoints',
+         'label': 'Save Checkpoints and Resume',
+         'action': 'store_true',
+         'default': False,
+         'help': ('Save checkpoints while converting large files so that a conversion that was '
+                  'cancelled or stopped can pick up where it left off the next time it is run '
+                  'with this option. Works for Delimited Plain Text, RPDR and JSON Lines files written to a '
+                  'single output file, when the file is not split into chunks.'),
+         'var': 'resume',
+         'position': 4,
+         'required': False},
+        {'flag': '--encheck',
+         'name': '--check-encoding',
+         'label': 'Check Encoding First',
+         'action': 'store',
+         'default': 'off',
+         'type': str,
+         'help': ('Check that each file can be read with the chosen encoding before converting it, by '
+                  'decoding blocks spread through the file. With suggest, a file that can\'t be read is '
+                  'skipped and an encoding that works is suggested in the log. With auto, the file is '
+                  'converted with the first encoding in the config file that works instead.'),
+         'choices': ['off', 'suggest', 'auto'],
+         'var': 'encoding_check',
+         'position': 5,
+         'required': True},
+        {'flag': '--sample',
+         'name': '--sample-size',
+         'label': 'Only Convert a Sample (Records)',
+         'action': 'store',
+         'default': None,
+         'gui_default': 100,
+         'type': int,
+         'help': ('Only convert this many records, to check what the output looks like before converting '
+                  'everything. Reading stops as soon as the sample is done. Files aren\'t split, checkpointed '
+                  'or recorded as converted for --incremental when sampling.'),
+         'var': 'sample_size',
+         'position': 6,
+         'required': False},
+        {'flag': '--smode',
+         'name': '--sample-mode',
+         'label': 'Sample Records',
+         'action': 'store',
+         'default': 'first',
+         'type': str,
+         'help': ('Which records to convert for --sample. first converts the first records of each file, '
+                  'random picks records from anywhere in the file by jumping to them instead of reading '
+                  'the whole file (for Delimited Plain Text, RPDR and JSON Lines files, others use the first records).'),
+         'choices': ['first', 'random'],
+         'var': 'sample_mode',
+         'position': 7,
+         'required': True},
+        {'flag': '--sscope',
+         'name': '--sample-scope',
+         'label': 'Sample Size Is For',
+         'action': 'store',
+         'default': 'file',
+         'type': str,
+         'help': ('Whether --sample is the number of records to convert from each file, or from all of '
+                  'the files together (the files are converted until there are that many).'),
+         'choices': ['file', 'job'],
+         'var': 'sample_scope',
+         'position': 8,
+         'required': True}
+    ]
+
+    # sort the UC_PROPS on the position key
+    UC_PROPS = sorted(UC_PROPS, key=lambda k: k['position'])
+
+    def __init__(self, options, Reader, Writer, comm, pool):
         super(ConversionThread, self).__init__()
         self.comm = comm
         self.options = options
         self.Reader = Reader
         self.Writer = Writer
-        self.msg_queues = []
-        self.progress_queues = []
+        # the worker pool, owned by the interface so it can outlive this thread
+        self.pool = pool
         self.cancelled = False
         self.logger = logging.getLogger('log')
         self.logfile = None
@@ -31,6 +165,18 @@ class ConversionThread(threading.Thread):
         self.total_size = 0
         self.workers = []
         self.running_workers = []
+        # the jobs that were running when the conversion was cancelled
+        self.stopped_workers = []
+        # the temporary folders of the parts of split files, deleted when the conversion ends
+        self.parts_dirs = []
+        self.infiles = None
+        self.files_found = 0
+        self.files_skipped = 0
+        self.manifest = None
+        # the number of records converted so far for a sample of the whole job
+        self.sampled = 0
+        # seconds spent in each stage, added up over all of the jobs
+        self.timings = {}
 
         # create logfile if output location is a directory and config file option is True
         if 'output_dir' in self.options and self.options['output_dir'] is not None:
@@ -71,166 +217,126 @@ class ConversionThread(threading.Thread):
         else:
             # if user didn't specify, use number of cores minus 1
             processes = multiprocessing.cpu_count() - 1
+        # make sure there is at least one process
+        processes = max(processes, 1)
+
+        # make sure the worker pool is the right size
+        self.pool.resize(processes)
         
         # instantiate lists for waiting workers and running workers
         self.workers = []
         self.running_workers = []
 
-        # handle single-file input
-        if 'input_file' in self.options and self.options['input_file'] is not None:
-            # create a queue for reporting progress and one for sending messages
-            msg_queue = multiprocessing.Queue()
-            self.msg_queues.append(msg_queue)
-            progress_queue = multiprocessing.Queue()
-            self.progress_queues.append(progress_queue)
+        # a sample isn't a whole conversion, so the files aren't split, checkpointed or recorded as converted
+        self.sampled = 0
+        if self.options.get('sample_size'):
+            self.logger.info('Converting a sample of {} records {}'.format(self.options['sample_size'], 'in total' if self.options.get('sample_scope') == 'job' else 'from each file'))
+            self.options.update({'chunk_size': None, 'resume': False, 'incremental': False})
 
-            try:
-                # instantiate reader and track total bytes
-                read_file = self.Reader(self.options, self.options['input_file'], progress_queue, msg_queue)
-                self.total_size += read_file.progress['size']
-            except read.ReaderError as excp:
-                self.error('Unable to create Reader for {}: {}'.format(self.options['input_file'], str(excp)))
-            except:
-                # get traceback info and log any errors
-                error = traceback.format_exc()
-                excp = sys.exc_info()[1]
-                
-                self.error('Unable to create Reader for {}: {}'.format(self.options['input_file'], excp), stack_info=error, exit_thread=True)
-                return
+        # in incremental mode, the manifest in the output folder is used to skip unchanged files
+        if self.options.get('incremental') and self.options.get('output_dir') is not None:
+            self.manifest = Manifest(self.options['output_dir'])
+
+        # the input files are found lazily so jobs can start while still searching
+        self.infiles = self.find_files()
+        self.files_found = 0
+        self.files_skipped = 0
+        self.timings = {}
+        order = self.options.get('job_order')
+        try:
+            # when sorting by size, get the first files to sort, otherwise just the first one
+            if order in ('largest', 'smallest'):
+                self.fill_window(order)
             else:
-                # append worker dictionary with info for this process
-                self.workers.append({
-                    'info': read_file.info,
-                    'queues': (progress_queue, msg_queue),
-                    'process': multiprocessing.Process(target=convert, args=(self.options, read_file, self.Writer,))
-                })
-        
-        # handle directory input
-        elif ('input_dir' in self.options and self.options['input_dir'] is not None) or ('input_dir_subdir' in self.options and self.options['input_dir_subdir'] is not None):
-            infiles = []
-            try:
-                # handle "Single Folder" option
-                if 'input_dir' in self.options and self.options['input_dir'] is not None:
-                    # get all files in directory
-                    for basename in os.listdir(self.options['input_dir']):
-                        filename = os.path.join(self.options['input_dir'], basename)
-                        # ensure it's a valid file before adding to list
-                        if os.path.isfile(filename) and filename.split('.')[-1].lower() in self.Reader.EXTENSIONS:
-                            infiles.append(filename)
-                
-                # handle "Folders and Subfolders" option
-                else:
-                    # go through folders and subfolders
-                    for root, _, files in os.walk(self.options['input_dir_subdir']):
-                        for basename in files:
-                            filename = os.path.join(root, basename)
-                            # ensure it's a valid file before adding to list
-                            if os.path.isfile(filename) and filename.split('.')[-1].lower() in self.Reader.EXTENSIONS:
-                                infiles.append(filename)
-            except FileNotFoundError:
-                # log exit error if FileNotFoundError is raised
-                self.error('Could not open files in specified input directory', exit_thread=True)
-                return
-            # log the number of infiles found
-            self.logger.info('Found {} files'.format(len(infiles)))
-            # log exit error if no valid infiles are found
-            if infiles == []:
-                self.error('Could not open any files in specified input directory', exit_thread=True)
-                return
-            # iterate over infiles and create processes
-            for index, file in enumerate(infiles):
-                # create a queue for reporting progress and one for sending messages
-                msg_queue = multiprocessing.Queue()
-                self.msg_queues.append(msg_queue)
-                progress_queue = multiprocessing.Queue()
-                self.progress_queues.append(progress_queue)
-
-                # set input_file option to the current file being processed
-                self.options['input_file'] = file
-
-                # save original output filename before altering
-                name = self.options['output_filename']
-
-                # add number to output filename to handle multiple files
-                if self.options['output_filename'] is not None:
-                    self.options['output_filename'] = '{} ({})'.format(name, index + 1)
-                try:
-                    # instantiate reader and track total bytes
-                    read_file = self.Reader(self.options, self.options['input_file'], progress_queue, msg_queue)
-                    self.total_size += read_file.progress['size']
-                except read.ReaderError as excp:
-                    self.error('Unable to create Reader for {}: {}'.format(file, str(excp)))
-                except:
-                    # get traceback info and log exit error
-                    error = traceback.format_exc()
-                    excp = sys.exc_info()[1]
-                    self.error('Unable to create Reader for {}: {}'.format(file, excp), stack_info=error)
-                else:
-                    # create worker dictionary and add to waiting workers
-                    self.workers.append({
-                        'info': read_file.info,
-                        'queues': (progress_queue, msg_queue),
-                        'process': multiprocessing.Process(target=convert, args=(self.options, read_file, self.Writer,))
-                    })
-                    # reset output filename to the original without the number
-                    self.options['output_filename'] = name
-        # communicate total bytes to main thread for overall progress
-        self.comm.put(self.total_size)
-
-        # below is the logic for spawning the processes
-        # this loop will continue as long as there are workers queued
-        while self.workers:
-            # this for-loop will run if there is space to spawn another worker
-            for i in range(processes - len(self.running_workers)):
-                # check again to make sure there are workers left
-                if self.workers:
-                    # pop the next worker out of waiting list
-                    worker = self.workers.pop(0)
-
-                    # send queues to main thread to start progress reporting
-                    queues = worker['queues']
-                    self.comm.put(queues)
-
-                    # log that processing is starting
-                    self.logger.info('Processing {}'.format(worker['info']['metadata']['conversion_id']))
-
-                    # spawn process if the conversion hasn't been cancelled
-                    if not self.cancelled:
-                        worker['process'].start()
-
-                    # add worker to list of running workers
-                    self.running_workers.append(worker)
-                else:
+                self.add_next_file()
+        except FileNotFoundError:
+            # log exit error if FileNotFoundError is raised
+            self.error('Could not open files in specified input directory', exit_thread=True)
+            return
+        # log exit error if no valid infiles are found
+        if not self.workers and not self.files_skipped:
+            self.error('Could not open any files in specified input directory', exit_thread=True)
+            return
+
+        # below is the logic for handing the jobs to the worker pool
+        # this loop will continue until nothing is running and nothing can start
+        reported_size = None
+        while not self.cancelled:
+            # communicate total bytes to main thread for overall progress
+            # (it grows as more files are found)
+            if self.total_size != reported_size:
+                reported_size = self.total_size
+                self.comm.put(self.total_size)
+
+            # submit jobs as long as there is a free slot and a worker that's ready
+            while len(self.running_workers) < processes:
+                # with a sample of the whole job, only start a job if there are records left to sample
+                quota = self.get_sample_quota()
+                if quota is not None and quota <= 0:
+                    # the sample is done once the running jobs finish it
+                    if not self.running_workers:
+                        self.clear_queue()
                     break
-            
-            # Wait for a slot for a new worker.
-            # iterate over running workers to check that they are running
-            for i, worker in enumerate(self.running_workers):
-                # if worker is finished, remove it from running_workers
-                if not worker['process'].is_alive():
-                    del self.running_workers[i]
-                    # break out of for-loop so a new process can be spawned
+
+                # keep finding files to sort while jobs are running
+                if order in ('largest', 'smallest'):
+                    self.fill_window(order)
+
+                # get the next worker that's ready to run
+                worker = self.next_worker()
+                # if there aren't any, try to find another file
+                if worker is None:
+                    if self.add_next_file():
+                        continue
                     break
 
-            # avoid busy-waiting
-            time.sleep(0.5)
+                # the job samples what's left of the sample
+                if quota is not None:
+                    worker['job'][0]['sample_size'] = quota
+                    worker['sample_size'] = quota
 
-        # this loop will just block until all running workers are finished
-        while self.running_workers:
-            # iterate over copy of list so we can remove from the original list
-            for worker in self.running_workers[:]:
-                # remove from (original) list if finished
-                if not worker['process'].is_alive():
-                    if self.cancelled:
-                        break
-                    self.running_workers.remove(worker)
+                # create the job's queues and send them to main thread to start progress reporting
+                worker['queues'] = self.pool.create_queues()
+                self.comm.put(worker['queues'])
 
-            # Check if we are finished
-            if self.cancelled or not self.running_workers:
+                # log that processing is starting
+                self.logger.info('Processing {}'.format(worker['label']))
+
+                # submit the job and add worker to list of running workers
+                worker['job_id'] = self.pool.submit(worker['job'], worker['queues'])
+                self.running_workers.append(worker)
+
+            # nothing is running and nothing can start
+            if not self.running_workers:
                 break
 
-            # Avoid busy-waiting
-            time.sleep(0.5)
+            # block until jobs finish and remove their workers from running_workers
+            for job_id, result in self.pool.wait().items():
+                for worker in self.running_workers:
+                    if worker['job_id'] == job_id:
+                        worker['done'] = True
+                        self.running_workers.remove(worker)
+                        # add up the time the job spent in each stage
+                        if result is not None:
+                            add_timings(self.timings, result.get('timings', {}))
+                        # count the records the job converted towards a sample of the whole job
+                        if result is not None and 'sample_size' in worker:
+                            self.sampled += result.get('processed', 0)
+                        # record the converted file in the manifest
+                        if self.manifest is not None and result is not None and 'entry' in worker:
+                            self.record_result(worker, result)
+                        break
+
+        # delete the parts of any split file that wasn't merged
+        self.remove_parts()
+
+        # write the final manifest
+        if self.manifest is not None:
+            self.manifest.close()
+
+        # log where the time went over all of the files
+        if self.timings:
+            self.logger.info('Time by Stage: {} ({:.1f} seconds of worker time)'.format(format_timings(self.timings), sum(self.timings.values())))
 
         stop = timeit.default_timer()
         process_time = stop - start
@@ -239,7 +345,247 @@ class ConversionThread(threading.Thread):
         # done through queue because tkinter is not thread safe
         self.comm.put('callback')
         self.comm.put((self.cancelled, None, process_time))
-    
+
+    def record_result(self, worker, result):
+        """Records a finished file's output and hash (if the worker hashed it) in the manifest"""
+        entry = worker['entry']
+        entry['hash'] = result.get('hash')
+        check = worker['job'][0].get('manifest_check')
+        # the worker found the contents were the same, so the output from before is kept
+        if result.get('unchanged'):
+            self.logger.info('Skipping {} (unchanged)'.format(entry['path']))
+            entry['output_paths'] = check['output_paths']
+            self.manifest.add(entry)
+            return
+        if len(result.get('replaced', [])) == 1:
+            self.logger.info('Replaced {}'.format(result['replaced'][0]))
+        elif result.get('replaced'):
+            self.logger.info('Replaced the {} files {} was converted to before'.format(len(result['replaced']), entry['path']))
+        entry['output_paths'] = result.get('output_paths', [])
+        # the warnings file is replaced with the output too
+        if result.get('warnings_file'):
+            entry['output_paths'].append(result['warnings_file'])
+        self.manifest.add(entry)
+
+    def remove_parts(self):
+        """Deletes the part folders of split files, which are left behind if the file's
+        merge was cancelled or dropped from the queue (after a merge it's already gone)"""
+        if not self.parts_dirs:
+            return
+        # let the chunks that were told to cancel stop writing their parts first
+        jobs = {worker['job_id'] for worker in self.stopped_workers if 'chunk' in worker['job'][0]}
+        deadline = timeit.default_timer() + PARTS_CLEANUP_TIMEOUT
+        while jobs and self.pool.processes and timeit.default_timer() < deadline:
+            jobs.difference_update(self.pool.wait(timeout=1))
+        for parts_dir in self.parts_dirs:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+        del self.parts_dirs[:]
+
+    def get_sample_quota(self):
+        """Returns the number of records the next job can convert for a sample of the
+        whole job (the ones the running jobs can convert aren't left), or None if
+        the user isn't sampling the whole job"""
+        if not self.options.get('sample_size') or self.options.get('sample_scope') != 'job':
+            return None
+        return self.options['sample_size'] - self.sampled - sum(worker.get('sample_size', 0) for worker in self.running_workers)
+
+    def find_files(self):
+        """Generator that yields the input files as they're found"""
+        # handle single-file input
+        if 'input_file' in self.options and self.options['input_file'] is not None:
+            yield self.options['input_file']
+
+        # handle "Single Folder" option
+        elif 'input_dir' in self.options and self.options['input_dir'] is not None:
+            # get all files in directory
+            for basename in os.listdir(self.options['input_dir']):
+                filename = os.path.join(self.options['input_dir'], basename)
+                # ensure it's a valid file before yielding it
+                if os.path.isfile(filename) and self.Reader.has_extension(filename):
+                    yield filename
+
+        # handle "Folders and Subfolders" option
+        elif 'input_dir_subdir' in self.options and self.options['input_dir_subdir'] is not None:
+            # go through folders and subfolders
+            for root, dirs, files in os.walk(self.options['input_dir_subdir']):
+                # skip the converter's own folders (split file parts, old record indexes)
+                dirs[:] = [name for name in dirs if not name.startswith('.cdc-')]
+                for basename in files:
+                    filename = os.path.join(root, basename)
+                    # ensure it's a valid file before yielding it
+                    if os.path.isfile(filename) and self.Reader.has_extension(filename):
+                        yield filename
+
+    def add_next_file(self):
+        """Adds a waiting worker for the next input file, returns False if there are no more"""
+        while True:
+            # stop looking if the conversion was cancelled or the queue was cleared
+            if self.infiles is None or self.cancelled:
+                return False
+            try:
+                file = next(self.infiles)
+            except StopIteration:
+                # log the number of infiles found and skipped
+                self.infiles = None
+                if self.options.get('input_file') is None:
+                    self.logger.info('Found {} files'.format(self.files_found))
+                if self.files_skipped:
+                    self.logger.info('Skipped {} unchanged files'.format(self.files_skipped))
+                return False
+            self.files_found += 1
+
+            # copy the options so each job has its own
+            options = dict(self.options)
+
+            # set input_file option to the current file being processed
+            options['input_file'] = file
+
+            # add number to output filename to handle multiple files
+            if self.options.get('input_file') is None and options['output_filename'] is not None:
+                options['output_filename'] = '{} ({})'.format(options['output_filename'], self.files_found)
+
+            # skip the file if it hasn't changed since it was last converted
+            entry = None
+            if self.manifest is not None:
+                try:
+                    entry = self.manifest.create_entry(file, self.Reader, self.Writer, options)
+                except OSError:
+                    # the reader reports any problem with the file once it's created
+                    entry = None
+                if entry is not None and self.manifest.is_unchanged(entry):
+                    self.files_skipped += 1
+                    self.logger.info('Skipping {} (unchanged)'.format(entry['path']))
+                    continue
+
+            # the worker checks the encoding and replaces the output of the last conversion,
+            # if only the modified time changed it compares the contents first (it's the one
+            # that reads the file) and keeps or replaces the output
+            check = None
+            if entry is not None and self.options.get('incremental_hash'):
+                check = self.manifest.get_check(entry)
+            if check is not None:
+                options['manifest_check'] = check
+            elif self.manifest is not None:
+                options['replace_outputs'] = self.manifest.get_outputs(file)
+
+            # track total bytes, the reader reports any problem with the file once it's created
+            try:
+                size = os.path.getsize(file)
+            except OSError:
+                size = 0
+            self.total_size += size
+
+            # the reader is created by the worker, so the job only says how to create it
+            self.add_worker(options, file, size, entry)
+            return True
+
+    def add_worker(self, options, file, size, entry=None):
+        """Adds a file's job to the waiting workers, split into chunks if it's large"""
+        # the queues are created when the job is submitted
+        worker = {
+            'filename': os.path.basename(file),
+            'label': os.path.abspath(file),
+            'size': size,
+            'queues': None,
+            'job': (options, self.Reader, file, self.Writer),
+            'job_id': None,
+            'done': False
+        }
+
+        # get the byte ranges to split the file into if it should be split
+        # (unless it's being resumed from a checkpoint)
+        ranges = None
+        if (options.get('chunk_size')
+                and options.get('manifest_check') is None
+                and not (options.get('resume') and os.path.isfile(checkpoint_path(options['output_dir'], file)))
+                and self.Reader.SPLITTABLE
+                and self.Writer.MERGEABLE
+                and is_ascii_compatible(options['w_encoding'])
+                and size > options['chunk_size'] * 1024 * 1024):
+            try:
+                # this reader doesn't report anything, it's just used to find the ranges
+                ranges = self.Reader(options, file).split(options['chunk_size'] * 1024 * 1024)
+            except Exception:
+                # the worker will report the error when it creates the reader
+                ranges = None
+
+        # the manifest entry is recorded once the file's job is finished
+        if entry is not None:
+            worker['entry'] = entry
+
+        # if it's not being split, just add the worker
+        if not ranges or len(ranges) < 2:
+            self.workers.append(worker)
+            return
+
+        self.logger.info('Splitting {} into {} chunks'.format(worker['filename'], len(ranges)))
+
+        # the chunks are written to part files in a temporary folder in the output folder
+        parts_dir = tempfile.mkdtemp(prefix='.cdc-', dir=options['output_dir'])
+        self.parts_dirs.append(parts_dir)
+        worker['parts'] = []
+        for index, (start, end) in enumerate(ranges):
+            # the chunk's reader only reads its byte range
+            chunk_options = dict(options)
+            chunk_options['chunk'] = {
+                'index': index,
+                'count': len(ranges),
+                'start': start,
+                'end': end,
+                'path': os.path.join(parts_dir, 'part{}'.format(index))
+            }
+            part = ' (part {} of {})'.format(index + 1, len(ranges))
+
+            # the chunks can be picked up by any free worker
+            chunk = {
+                'filename': worker['filename'] + part,
+                'label': worker['label'] + part,
+                'size': end - start,
+                'queues': None,
+                'job': (chunk_options, self.Reader, file, self.Writer),
+                'job_id': None,
+                'done': False
+            }
+            self.workers.append(chunk)
+            worker['parts'].append(chunk)
+
+        # the file's own job merges the parts once all the chunks are finished
+        options['merge'] = {
+            'dir': parts_dir,
+            'parts': [chunk['job'][0]['chunk']['path'] for chunk in worker['parts']]
+        }
+        self.workers.append(worker)
+
+        # merging counts towards the total the same as converting
+        self.total_size += size
+
+    def fill_window(self, order):
+        """Finds files until there are JOB_ORDER_WINDOW waiting workers (or there aren't
+        any more files), then sorts the waiting workers by size"""
+        added = False
+        while len(self.workers) < JOB_ORDER_WINDOW and self.add_next_file():
+            added = True
+        if added:
+            self.order_workers(order)
+
+    def order_workers(self, order):
+        """Sorts the waiting workers by the size of their input"""
+        # the files stay in the order they were found if not sorting by size
+        if order not in ('largest', 'smallest'):
+            return
+        # the sort is stable so chunks of the same size keep their order
+        self.workers.sort(key=lambda worker: worker['size'],
+                          reverse=(order == 'largest'))
+
+    def next_worker(self):
+        """Removes and returns the first waiting worker that's ready to run"""
+        for worker in self.workers:
+            # a merge has to wait until all of the file's chunks are finished
+            if all(part['done'] for part in worker.get('parts', [])):
+                self.workers.remove(worker)
+                return worker
+        return None
+
     def log_options(self):
         """Logs the user-specified options"""
         message = '\nINPUT OPTIONS:\n'
@@ -263,6 +609,9 @@ class ConversionThread(threading.Thread):
         message = '\nCONVERSION OPTIONS:\n'
         # iterate over conversion options and append values to message
         message += 'Processes: {}\n'.format(self.options['processes'])
+        for prop in self.UC_PROPS:
+            if self.options.get(prop['var']) is not None:
+                message += '{}: {}\n'.format(prop['label'], self.options[prop['var']])
         # log message
         self.logger.info(message)
 
@@ -289,22 +638,341 @@ class ConversionThread(threading.Thread):
             self.comm.put('callback')
             self.comm.put((True, message))
     
+    def clear_queue(self):
+        """Removes the waiting workers and stops looking for more files"""
+        self.infiles = None
+        del self.workers[:]
+
     def cancel(self):
         """Cancel all conversion jobs"""
         self.cancelled = True
-        # clear the queue to prevent spawning new processes
-        del self.workers[:]
+        # clear the queue to prevent submitting new jobs
+        self.clear_queue()
+        # wake up the scheduler so it sees the cancellation
+        self.pool.wake()
 
-        # cancel the running workers
+        # tell the running jobs to cancel, the workers stay alive for new jobs
+        self.stopped_workers = list(self.running_workers)
         for worker in self.running_workers:
-            worker['process'].terminate()
-            worker['process'].join()
+            worker['queues'][1].put('cancel')
         # delete running workers list
         del self.running_workers[:]
 
-def convert(options, read_file, Writer):
-    """Sends information to proper writer (currently only writes to a directory
-    but there may be future functions for writing to a database"""
+class WorkerPool(object):
+    """Pool of long-lived worker processes that pull conversion jobs from a shared queue"""
+    def __init__(self, processes):
+        self.processes = 0
+        # the queue workers pull jobs from
+        self.job_queue = multiprocessing.Queue()
+        # the pipe workers report finished jobs on (the lock keeps messages whole)
+        self.done_reader, self.done_writer = multiprocessing.Pipe(duplex=False)
+        self.done_lock = multiprocessing.Lock()
+        # pipe for waking up wait() from another thread
+        self.wake_reader, self.wake_writer = multiprocessing.Pipe(duplex=False)
+        # every job's progress goes through one event queue tagged with the job's key,
+        # and a thread sorts the events into a local progress queue for each job
+        self.events = multiprocessing.Queue()
+        self.progress_queues = {}
+        self.key_count = 0
+        self.dispatcher = threading.Thread(target=self.dispatch_events)
+        self.dispatcher.daemon = True
+        self.dispatcher.start()
+        # messages for the jobs (pause, cancel, etc.) are broadcast to every worker
+        self.control_lock = threading.Lock()
+        # counter to give each submitted job a unique ID
+        self.job_count = 0
+        # list of worker dicts with the process, its control queue and the job it's working on
+        self.workers = []
+        # start the workers
+        self.resize(processes)
+
+    def create_queues(self):
+        """Returns a progress queue and a message queue for a job"""
+        self.key_count += 1
+        progress_queue = queue.Queue()
+        self.progress_queues[self.key_count] = progress_queue
+        return progress_queue, ControlQueue(self, self.key_count)
+
+    def dispatch_events(self):
+        """Puts the events from the workers in the progress queue of their job"""
+        while True:
+            event = self.events.get()
+            # None tells the thread to stop
+            if event is None:
+                return
+            key, item = event
+            progress_queue = self.progress_queues.get(key)
+            if progress_queue is None:
+                continue
+            progress_queue.put(item)
+            # the job is done after the sentinel message, so stop tracking it
+            if isinstance(item, str):
+                del self.progress_queues[key]
+
+    def send(self, key, message):
+        """Sends a message to the job with the given key"""
+        with self.control_lock:
+            for worker in self.workers:
+                worker['control'].put((key, message))
+
+    def resize(self, processes):
+        """Starts or stops workers so that there are the given number of them"""
+        # start new workers if there are too few
+        while self.processes < processes:
+            self.spawn()
+            self.processes += 1
+        # tell workers to exit if there are too many
+        while self.processes > processes:
+            self.job_queue.put(None)
+            self.processes -= 1
+
+    def spawn(self):
+        """Starts a new worker process"""
+        # shared value holding the ID of the job the worker is running
+        current = multiprocessing.Value('q', 0, lock=False)
+        # queue the worker gets the broadcast messages from
+        control = multiprocessing.Queue()
+        process = multiprocessing.Process(target=pool_worker, args=(self.job_queue, self.events, control, self.done_writer, self.done_lock, current,))
+        # daemon so that workers never outlive the main process
+        process.daemon = True
+        process.start()
+        with self.control_lock:
+            self.workers.append({'process': process, 'control': control, 'current': current})
+
+    def submit(self, job, queues):
+        """Puts a job in the queue for the workers and returns its ID"""
+        self.job_count += 1
+        # only the key of the job's queues is sent, the worker creates its own ends
+        # (jobs have to be submitted in the order their queues were created, since the
+        # workers drop the messages for keys lower than their job's)
+        self.job_queue.put((self.job_count, queues[1].key, job))
+        return self.job_count
+
+    def wait(self, timeout=None):
+        """Blocks until a job finishes, a worker exits or wake() is called and
+        returns a dict with the IDs of the jobs that have finished and their
+        results (the final progress dict, or None if it didn't finish successfully)"""
+        # wait on the finished jobs pipe, the wake-up pipe and every worker's sentinel
+        sentinels = {worker['process'].sentinel: worker for worker in self.workers}
+        ready = multiprocessing.connection.wait([self.done_reader, self.wake_reader] + list(sentinels), timeout)
+        finished = {}
+        # get all of the finished job IDs and results
+        while self.done_reader.poll():
+            job_id, result = self.done_reader.recv()
+            finished[job_id] = result
+        # clear any wake-up messages
+        while self.wake_reader.poll():
+            self.wake_reader.recv()
+        # a worker exited, if it died in the middle of a job that job is finished too
+        for sentinel in ready:
+            if sentinel in sentinels:
+                worker = sentinels[sentinel]
+                worker['process'].join()
+                with self.control_lock:
+                    self.workers.remove(worker)
+                if worker['current'].value:
+                    finished[worker['current'].value] = None
+                # replace the worker unless it exited because the pool shrank
+                if worker['process'].exitcode != 0:
+                    self.spawn()
+        return finished
+
+    def wake(self):
+        """Wakes up a thread that's blocked in wait()"""
+        self.wake_writer.send(None)
+
+    def shutdown(self):
+        """Lets the workers finish their jobs and then stops them"""
+        for _ in range(self.processes):
+            self.job_queue.put(None)
+        for worker in self.workers:
+            worker['process'].join()
+        self.processes = 0
+        del self.workers[:]
+        # stop the event dispatcher once it has passed on every event
+        self.events.put(None)
+        self.dispatcher.join()
+
+    def terminate(self):
+        """Stops the workers immediately"""
+        for worker in self.workers:
+            worker['process'].terminate()
+            worker['process'].join()
+        self.processes = 0
+        del self.workers[:]
+        # stop the event dispatcher, without waiting on the queue at exit in case
+        # a worker was stopped while writing to it
+        self.events.cancel_join_thread()
+        self.events.put(None)
+
+class ControlQueue(object):
+    """Message queue for a job, the messages are sent to the workers with the job's key"""
+    def __init__(self, pool, key):
+        self.pool = pool
+        self.key = key
+
+    def put(self, message):
+        """Sends a message to the job"""
+        self.pool.send(self.key, message)
+
+class EventQueue(object):
+    """Progress queue used by a job in a worker, the items are tagged with the
+    job's key and put in the pool's event queue"""
+    def __init__(self, events, key):
+        self.events = events
+        self.key = key
+
+    def put(self, item):
+        """Puts an item in the event queue"""
+        self.events.put((self.key, item))
+
+    def put_nowait(self, item):
+        """Puts an item in the event queue without blocking"""
+        self.events.put_nowait((self.key, item))
+
+class MessageQueue(object):
+    """Message queue used by a job in a worker, gets the job's messages from the
+    worker's control queue"""
+    def __init__(self, control, key, pending):
+        self.control = control
+        self.key = key
+        # messages that came in for each key, shared by all of the worker's jobs
+        self.pending = pending
+
+    def receive(self, block=False):
+        """Moves the messages from the control queue into pending"""
+        while True:
+            try:
+                key, message = self.control.get(block)
+            except queue.Empty:
+                return
+            # the jobs start in the order of their keys, so a message for a lower key is
+            # for a job that's finished or running in another worker and can be dropped
+            if key >= self.key:
+                self.pending.setdefault(key, []).append(message)
+            # only block for the first message
+            block = False
+
+    def get_nowait(self):
+        """Returns the next message for the job or raises queue.Empty"""
+        self.receive()
+        if not self.pending.get(self.key):
+            raise queue.Empty
+        return self.pop()
+
+    def get(self):
+        """Blocks until there's a message for the job and returns it"""
+        self.receive()
+        while not self.pending.get(self.key):
+            self.receive(block=True)
+        return self.pop()
+
+    def pop(self):
+        """Removes and returns the job's oldest message"""
+        message = self.pending[self.key].pop(0)
+        if not self.pending[self.key]:
+            del self.pending[self.key]
+        return message
+
+def pool_worker(job_queue, events, control, done_writer, done_lock, current):
+    """Main loop for the worker processes, converts jobs until told to stop"""
+    # messages for this worker's job and the jobs after it that haven't been checked yet, by key
+    pending = {}
+    while True:
+        # block until there's a job, None tells the worker to exit
+        item = job_queue.get()
+        if item is None:
+            return
+        job_id, key, (options, Reader, file, Writer) = item
+        # let the pool know which job this worker is on
+        current.value = job_id
+        # the keys are made in the order the jobs are submitted, and the jobs are taken
+        # from the queue in that order, so this worker won't run a job with a lower key
+        for old_key in [old_key for old_key in pending if old_key < key]:
+            del pending[old_key]
+        # the job's ends of the event and control channels
+        queues = (EventQueue(events, key), MessageQueue(control, key, pending))
+        result = None
+        try:
+            result = convert(options, Reader, file, queues, Writer)
+        # a cancelled job only exits the job, not the worker
+        except SystemExit:
+            pass
+        except KeyboardInterrupt:
+            return
+        finally:
+            current.value = 0
+            # report the finished job so a new one can be submitted
+            with done_lock:
+                done_writer.send((job_id, result))
+
+def convert(options, Reader, file, queues, Writer):
+    """Creates the reader and sends information to proper writer (currently only
+    writes to a directory but there may be future functions for writing to a database.
+    Returns the final progress dict if the conversion finished successfully"""
+    progress_queue, msg_queue = queues
+    result = None
+    # with --hash, the worker hashes the file for the manifest, instead of the scheduler
+    # reading every file one at a time before it's converted
+    file_hash = None
+    replaced = []
+    if options.get('incremental') and options.get('incremental_hash') and options.get('chunk') is None:
+        try:
+            file_hash = hash_file(file)
+        except OSError:
+            # the reader reports any problem with the file once it's created
+            file_hash = None
+        check = options.get('manifest_check')
+        # the file was only touched, the output from before is still right
+        if check is not None and file_hash is not None and file_hash == check['hash']:
+            return report_unchanged(options, file, queues, file_hash)
+    # make sure the file can be decoded before the writer opens its output, the merge
+    # job doesn't read the file so only the chunks check it
+    encoding_message = None
+    if options.get('merge') is None:
+        encoding_message, readable = check_file_encoding(file, options)
+        if not readable:
+            return report_error(options, file, queues, encoding_message)
+    # the new output replaces the output of the last conversion (a split file's
+    # is replaced by its merge)
+    if options.get('chunk') is None:
+        check = options.get('manifest_check')
+        old_outputs = check['output_paths'] if check is not None else options.get('replace_outputs', [])
+        replaced = remove_outputs(options['output_dir'], old_outputs)
+    # files that aren't split can save checkpoints to resume from, the input is
+    # described before the reader and writer change the options so a checkpoint
+    # is only used for the same file converted the same way
+    checkpoint = None
+    if (options.get('resume')
+            and options.get('output_dir') is not None
+            and is_ascii_compatible(options['r_encoding'])
+            and Reader.RESUMABLE
+            and Writer.RESUMABLE
+            and options.get('chunk') is None
+            and options.get('merge') is None):
+        try:
+            checkpoint = Checkpoint(options['output_dir'], describe_input(file, Reader, Writer, options))
+        except OSError:
+            # the reader reports any problem with the file once it's created
+            checkpoint = None
+    try:
+        # instantiate reader, it reports its own errors
+        read_file = Reader(options, file, progress_queue, msg_queue)
+    # catch KeyboardInterrupt, SystemExit, and read.ReaderError to avoid unwanted error messages
+    except (KeyboardInterrupt, SystemExit, read.ReaderError):
+        # send sentinel message
+        progress_queue.put(os.path.abspath(file))
+        return
+    # report any other errors the same way a reader would
+    except:
+        error = traceback.format_exc()
+        excp = sys.exc_info()[1]
+        return report_error(options, file, queues, 'Unable to create Reader: "{}" See log for more info.'.format(excp), stack_info=error)
+
+    # the file is converted with the encoding that works (only the first chunk
+    # warns about it so it's in the merged warnings once)
+    if encoding_message is not None and (options.get('chunk') or {}).get('index', 0) == 0:
+        read_file.put_warning(read_file.info['metadata']['filename'], encoding_message)
 
     # check for messages in case an error came up during reader instantiation
     read_file.check_msg_queue()
@@ -312,10 +980,10 @@ def convert(options, read_file, Writer):
     try:
         # call the write_dir function if writing to a directory
         if 'output_dir' in options and options['output_dir'] is not None:
-            write_dir(options, read_file, Writer)
+            write_dir(options, read_file, Writer, checkpoint)
             
         # put rest of the warnings in the queue
-        read_file.progress_queue.put(read_file.warnings)
+        read_file.send_warnings(last=True)
     # catch KeyboardInterrupt, SystemExit, and read.ReaderError to avoid unwanted error messages
     except (KeyboardInterrupt, SystemExit, read.ReaderError):
         pass
@@ -324,7 +992,11 @@ def convert(options, read_file, Writer):
         error = traceback.format_exc()
         excp = sys.exc_info()[1]
 
-        read_file.put_error(read_file.info['metadata']['conversion_id'], 'Unhandled error occurred while processing: "%s" See log for more info.' % str(excp), stack_info=error)
+        # the error is reported, don't let it stop the worker before the sentinel is sent
+        try:
+            read_file.put_error(read_file.info['metadata']['conversion_id'], 'Unhandled error occurred while processing: "%s" See log for more info.' % str(excp), stack_info=error)
+        except read.ReaderError:
+            pass
     else:
         # check the message queue one last time to make sure nothing went wrong
         read_file.check_msg_queue()
@@ -333,16 +1005,89 @@ def convert(options, read_file, Writer):
         # set the state to finished and report the progress
         read_file.progress['state'] = 'Finished'
         read_file.prog_wait()
+        result = dict(read_file.progress, hash=file_hash, replaced=replaced)
 
     # send sentinel message
     read_file.progress_queue.put(read_file.info['metadata']['conversion_id'])
+    return result
+
+def report_error(options, file, queues, message, stack_info=None):
+    """Reports an error with a file before its reader could be created, the same way
+    a reader would"""
+    progress_queue, msg_queue = queues
+    read_file = read.Read(options, file, progress_queue, msg_queue)
+    read_file.progress['filename'] = os.path.basename(file)
+    read_file.progress['conversion_id'] = os.path.abspath(file)
+    try:
+        read_file.progress['size'] = os.path.getsize(file)
+    except OSError:
+        pass
+    try:
+        read_file.put_error(file, message, stack_info=stack_info)
+    except read.ReaderError:
+        pass
+    # send sentinel message
+    progress_queue.put(os.path.abspath(file))
+
+def check_file_encoding(file, options):
+    """Checks that the file can be decoded with the chosen encoding if the user wants it
+    checked, switching to one that works in auto mode. Returns a message saying what
+    was wrong (or None) and whether the file can be read"""
+    mode = options.get('encoding_check')
+    if mode not in ('suggest', 'auto') or not options.get('r_encoding'):
+        return None, True
+    block_size = cdc.CONFIG.getint('read.txt', 'encoding_check_block_size', fallback=1048576)
+    blocks = cdc.CONFIG.getint('read.txt', 'encoding_check_blocks', fallback=16)
+    encodings = [encoding.strip() for encoding in cdc.CONFIG.get('read.txt', 'encoding_candidates', fallback='utf8, cp1252, latin1').split(',')]
+    try:
+        error = check_encoding(file, options['r_encoding'], block_size, blocks)
+        if error is None:
+            return None, True
+        # look for one that works, other than the one that didn't
+        working = find_encoding(file, [encoding for encoding in encodings if encoding != options['r_encoding']], block_size, blocks)
+    except (OSError, EOFError, ValueError, LookupError):
+        # the reader reports any problem with the file once it's created
+        return None, True
+    if working is not None and mode == 'auto':
+        message = 'Can\'t be read as {} ({}), converting it as {} instead'.format(options['r_encoding'], error, working)
+        options['r_encoding'] = working
+        return message, True
+    if working is not None:
+        return 'Can\'t be read as {} ({}), skipping it. It can be read as {}.'.format(options['r_encoding'], error, working), False
+    return 'Can\'t be read as {} ({}), skipping it. None of the encodings to try ({}) can read it.'.format(options['r_encoding'], error, ', '.join(encodings)), False
 
-def write_dir(options, read_file, Writer):
+def report_unchanged(options, file, queues, file_hash):
+    """Reports a file that wasn't converted because its contents haven't changed since
+    it was last converted, and returns its final progress dict"""
+    progress_queue, msg_queue = queues
+    read_file = read.Read(options, file, progress_queue, msg_queue)
+    try:
+        size = os.path.getsize(file)
+    except OSError:
+        size = 0
+    read_file.progress.update({
+        'filename': os.path.basename(file),
+        'size': size,
+        'progress': size,
+        'state': 'Finished',
+        'unchanged': True
+    })
+    read_file.prog_wait()
+    # send sentinel message
+    progress_queue.put(read_file.progress['conversion_id'])
+    return dict(read_file.progress, hash=file_hash)
+
+def write_dir(options, read_file, Writer, checkpoint=None):
     """Instantiates writer for directory output"""
     # instantiate writer
     outfile = Writer(options, read_file)
+    outfile.checkpoint = checkpoint
     try:
-        # start processing
-        outfile.write_dir()
+        # put the chunks back together if this job is merging a split file
+        if options.get('merge') is not None:
+            outfile.merge_dir(options['merge'])
+        # otherwise start processing
+        else:
+            outfile.write_dir()
     except FileNotFoundError:
         read_file.put_error(read_file.info['metadata']['conversion_id'], 'Could not find output folder.')
@@ -16,7 +16,7 @@ if not getattr(sys, 'frozen', False):
 import cdc
 from .. import gui, read, write
 from . import helpers, progress, windows
-from ..convert import ConversionThread
+from ..convert import ConversionThread, WorkerPool
 
 TIME_FORMAT = cdc.CONFIG.get('GUI', 'gui_log_timestamp', fallback='%H:%M:%S - %m-%d-%Y')
 
@@ -68,6 +68,9 @@ class MainApplication(tk.Frame):
         self.conversion = None
         self.comm = None
 
+        # worker pool, kept warm between conversions
+        self.pool = None
+
         # create list for progress objects
         self.progressbars = []
 
@@ -321,6 +324,12 @@ class MainApplication(tk.Frame):
                                     validatecommand=(vint, '%S', '%P'))
         process_menu.pack(side='left')
 
+        # create the widgets for the rest of the conversion options
+        props_frame = tk.Frame(self.conversion_tab)
+        props_frame.pack(side='top')
+        for prop in ConversionThread.UC_PROPS:
+            helpers.create_option(prop, props_frame, self.conv_options)
+
         # add a separator to keep this separate from progress
         tk.Frame(self.conversion_tab,
                  relief='ridge',
@@ -342,6 +351,8 @@ class MainApplication(tk.Frame):
             if helpers.validate_tab(self.Writer, self.w_options, 'writer'):
                 # if options are valid, enable convert tab
                 self.note.tab(self.convert, state='normal')
+                # start the workers so they're ready when Convert is pressed
+                self.warm_pool()
 
         # go to next tab (won't work if tab is disabled)
         self.note.select(cur_tab + 1)
@@ -450,13 +461,13 @@ class MainApplication(tk.Frame):
             for worker in self.conversion.workers:
                 # lower overall maximum bytes to not include cancelled workers
                 if self.overall_progress is not None:
-                    self.overall_progress.maximum -= worker['info']['metadata']['size']
+                    self.overall_progress.maximum -= worker['size']
                
                 # log cancellation
-                message = '{} | CANCELLED - {}'.format(datetime.datetime.now().strftime(TIME_FORMAT), worker['info']['metadata']['filename'])
+                message = '{} | CANCELLED - {}'.format(datetime.datetime.now().strftime(TIME_FORMAT), worker['filename'])
                 self.completed_listbox.insert('end', message)
                 message = 'CANCELLED - {}'.format(
-                    worker['info']['metadata']['filename']
+                    worker['filename']
                 )
                 gui.LOGGER.info(message)
             
@@ -466,8 +477,8 @@ class MainApplication(tk.Frame):
                     maximum=self.overall_progress.maximum
                 )
            
-            # clear the waiting workers list
-            del self.conversion.workers[:]
+            # clear the waiting workers list and stop looking for files
+            self.conversion.clear_queue()
            
             # clear queue listbox in GUI and update numbers on tabs
             self.queue_listbox.delete(0, 'end')
@@ -501,7 +512,7 @@ class MainApplication(tk.Frame):
             
             # log the cancellation
             for worker in workers:
-                message = 'CANCELLED - {}'.format(worker['info']['metadata']['filename'])
+                message = 'CANCELLED - {}'.format(worker['filename'])
                 self.completed_listbox.insert('end', '{} | {}'.format(datetime.datetime.now().strftime(TIME_FORMAT), message))
             
             # delete all of the Progress instances
@@ -524,8 +535,11 @@ class MainApplication(tk.Frame):
         # set running variable to false
         self.running = False
         
-        # if the window was closed, close the window
+        # if the window was closed, stop the workers and close the window
         if close:
+            if self.pool is not None:
+                self.pool.terminate()
+                self.pool = None
             self.parent.destroy()
         # if not, prepare for another conversion
         else:
@@ -539,7 +553,8 @@ class MainApplication(tk.Frame):
     def populate_input(self):
         """Populates the input options"""
         # set the self.Reader variable and populate options after selection
-        self.Reader = self.reader_keys[self.reader.get()]
+        # (the reader's module is only imported once it's chosen)
+        self.Reader = self.reader_keys[self.reader.get()].load()
         self.r_options = helpers.populate_options(self.Reader,
                                                   self.input_options,
                                                   'Input')
@@ -547,11 +562,24 @@ class MainApplication(tk.Frame):
     def populate_output(self):
         """Populates output options"""
         # set the self.Writer variable and populate options after selection
-        self.Writer = self.writer_keys[self.writer.get()]
+        # (the writer's module is only imported once it's chosen)
+        self.Writer = self.writer_keys[self.writer.get()].load()
         self.w_options = helpers.populate_options(self.Writer,
                                                   self.output_options,
                                                   'Output')
 
+    def warm_pool(self):
+        """Starts the worker pool, or resizes it to the chosen number of processes"""
+        try:
+            processes = max(self.conv_options['processes'].get(), 1)
+        except:
+            # the number of processes isn't valid yet, wait until it is
+            return
+        if self.pool is None:
+            self.pool = WorkerPool(processes)
+        else:
+            self.pool.resize(processes)
+
     def run(self):
         """Starts the conversion"""
         # make sure all options are valid
@@ -567,6 +595,9 @@ class MainApplication(tk.Frame):
                 messagebox.showerror('Error', 'Must enter a number of processes.')
                 return
 
+            # make sure the workers are started
+            self.warm_pool()
+
             # set running to True, update buttons
             self.running = True
             self.update_buttons()
@@ -608,7 +639,8 @@ class MainApplication(tk.Frame):
                 self.conversion = ConversionThread(options,
                                                    self.Reader,
                                                    self.Writer,
-                                                   self.comm)
+                                                   self.comm,
+                                                   self.pool)
             except SystemExit:
             	self.check_comm()
             	return
@@ -666,7 +698,7 @@ class MainApplication(tk.Frame):
         if workers is not None:
             # log cancellation for queued items
             for worker in workers:
-                message = 'CANCELLED - {}'.format(worker['info']['metadata']['filename'])
+                message = 'CANCELLED - {}'.format(worker['filename'])
                 gui.LOGGER.info(message)
         else:
             gui.LOGGER.info('FINISHED')
@@ -40,36 +40,9 @@ def populate_options(chosen_class, frame, label):
         elif 'outtype' in prop:
             options[prop['var']] = None
             outtypes.append(prop)
-        # if there are choices, create a dropdown menu
-        elif 'gui_choices' in prop or 'choices' in prop:
-            widgets.DropDown(options_frame, prop, options).pack(side='top', fill='both', pady=10)
-        # if it has a type, create entry object
-        elif 'type' in prop:
-            # if it's required, just make an entry with a label
-            if prop['required']:
-                widgets.EntryLabel(options_frame,
-                           prop,
-                           options).pack(side='top',
-                                         fill='both',
-                                         pady=10,
-                                         padx=(0, 5))
-            # if it's optional, add a checkbox to enable option
-            else:
-                widgets.EntryOption(options_frame,
-                            prop,
-                            options).pack(side='top',
-                                          fill='both',
-                                          padx=(0, 5))
-        # if it is a boolean, just create a checkbox
-        elif isinstance(prop['default'], bool):
-            # create check button and add variable to options dictionary
-            options[prop['var']] = tk.BooleanVar(value=prop['default'])
-            check_frame = tk.Frame(options_frame)
-            check_frame.pack(side='top', fill='both')
-            tk.Checkbutton(check_frame,
-                           text=prop['label'],
-                           variable=options[prop['var']]).pack(side='left',
-                                                               pady=10)
+        # otherwise create the widget for the option
+        else:
+            create_option(prop, options_frame, options)
     # create input source/output location dropdown
     if intypes:
         widgets.SourceDropDown(location_frame, intypes, options, 'Input Source').pack(side='top')
@@ -78,6 +51,39 @@ def populate_options(chosen_class, frame, label):
     # return the options dictionary
     return options
 
+def create_option(prop, frame, options):
+    """Creates the widget for an option (UC_PROP) and adds its variable to options"""
+    # if there are choices, create a dropdown menu
+    if 'gui_choices' in prop or 'choices' in prop:
+        widgets.DropDown(frame, prop, options).pack(side='top', fill='both', pady=10)
+    # if it has a type, create entry object
+    elif 'type' in prop:
+        # if it's required, just make an entry with a label
+        if prop['required']:
+            widgets.EntryLabel(frame,
+                       prop,
+                       options).pack(side='top',
+                                     fill='both',
+                                     pady=10,
+                                     padx=(0, 5))
+        # if it's optional, add a checkbox to enable option
+        else:
+            widgets.EntryOption(frame,
+                        prop,
+                        options).pack(side='top',
+                                      fill='both',
+                                      padx=(0, 5))
+    # if it is a boolean, just create a checkbox
+    elif isinstance(prop['default'], bool):
+        # create check button and add variable to options dictionary
+        options[prop['var']] = tk.BooleanVar(value=prop['default'])
+        check_frame = tk.Frame(frame)
+        check_frame.pack(side='top', fill='both')
+        tk.Checkbutton(check_frame,
+                       text=prop['label'],
+                       variable=options[prop['var']]).pack(side='left',
+                                                           pady=10)
+
 def validate_tab(Handler, options, handler_type):
     """Validates a tab's options"""
     # make sure a handler is provided
@@ -8,6 +8,8 @@ from tkinter import ttk
 import cdc
 from .. import gui
 from . import helpers
+from ..utils.timing import format_timings
+from ..utils.warninglog import format_warning, summarize
 
 TIME_FORMAT = cdc.CONFIG.get('GUI', 'gui_log_timestamp', fallback='%H:%M:%S - %m-%d-%Y')
 
@@ -222,7 +224,7 @@ class Progress(tk.Frame):
 
         # add all of the waiting workers
         for worker in self.conversion.workers:
-            self.tabs['queue'].insert('end', worker['info']['metadata']['filename'])
+            self.tabs['queue'].insert('end', worker['filename'])
 
     def update_files_left(self):
         """Updates files left displayed in notebook tab"""
@@ -306,11 +308,14 @@ class Progress(tk.Frame):
                     return
             # if it gets a list, it's a list of all the warnings
             elif isinstance(prog, list):
+                # the warnings are shown with the time they came in
+                warnings = ['{} | {}'.format(datetime.datetime.now().strftime(TIME_FORMAT), format_warning(warning)) for warning in prog]
+
                 # add warnings to instance variable so they can be logged later
-                self.warnings.extend(prog)
+                self.warnings.extend(warnings)
 
                 # add the warnings to the GUI Warnings tab
-                self.tabs['warnings'].insert('end', *prog)
+                self.tabs['warnings'].insert('end', *warnings)
                 self.update_files_left()
                 continue
             else:
@@ -330,20 +335,27 @@ class Progress(tk.Frame):
                 self.log_thread.start()
 
                 # if total records processed in progress dict
-                if 'processed' in prog:
-                    # add to completed listbox
+                if prog.get('unchanged'):
+                    message = 'UNCHANGED - {} | the output from before is kept'.format(prog['filename'])
+                elif 'processed' in prog:
                     message = 'SUCCESS - {} | {} records processed'.format(prog['filename'], prog['processed'])
-                    self.tabs['completed'].insert('end', '{} | {}'.format(
-                        datetime.datetime.now().strftime(TIME_FORMAT),
-                        message
-                    ))
+                    # and how many were skipped if the records were filtered
+                    if prog.get('filtered'):
+                        message += ', {} filtered out'.format(prog['filtered'])
                 else:
-                    # add to completed listbox
                     message = 'SUCCESS - {}'.format(prog['filename'])
-                    self.tabs['completed'].insert('end', '{} | {}'.format(
-                        datetime.datetime.now().strftime(TIME_FORMAT),
-                        message
-                    ))
+                # add where the time went if it was timed
+                if prog.get('timings'):
+                    message = '{} | {}'.format(message, format_timings(prog['timings']))
+                # add to completed listbox
+                self.tabs['completed'].insert('end', '{} | {}'.format(
+                    datetime.datetime.now().strftime(TIME_FORMAT),
+                    message
+                ))
+
+                # say how many warnings there were that aren't in the Warnings tab
+                for summary in summarize(prog):
+                    self.tabs['warnings'].insert('end', '{} | {}'.format(datetime.datetime.now().strftime(TIME_FORMAT), summary))
 
                 # remove the widget, update files left
                 self.pack_forget()
@@ -393,26 +405,35 @@ class Progress(tk.Frame):
                 self.last_amt = prog['progress']
                 
             # get time remaining and update labels
-            complete = prog['progress'] / prog['size']
+            # (the size is 0 if the reader failed before it got the size)
+            try:
+                complete = prog['progress'] / prog['size']
+            except ZeroDivisionError:
+                complete = 0
             if prog['timer'] is not None:
                 elapsed = time.time() - prog['timer']
                 self.timelabel.config(text=helpers.create_time_label(
                     elapsed,
                     complete
                 ))
-            self.progresslabel.config(
-                text='{} | {} | Progress: {}%'.format(
-                    prog['filename'],
-                    prog['state'],
-                    int(100 * complete)
-                )
+            label = '{} | {} | Progress: {}%'.format(
+                prog['filename'],
+                prog['state'],
+                int(100 * complete)
             )
+            # show the records too if the reader knows how many there are
+            if prog.get('records'):
+                label += ' ({} of {} records)'.format(prog.get('processed', 0) + prog.get('filtered', 0), prog['records'])
+            self.progresslabel.config(text=label)
 
     def log_completion(self, prog, error=False):
         """Logs the warnings and final messages"""
         # log all of the warnings
         for warning in self.warnings:
             gui.LOGGER.warning(' | '.join(warning.split(' | ')[1:]))
+        # and how many there were that weren't logged
+        for message in summarize(prog):
+            gui.LOGGER.warning(message)
         
         # log the error if there was one
         if error:
@@ -425,14 +446,20 @@ class Progress(tk.Frame):
         # otherwise log success
         else:
             # if total records processed in progress dict
-            if 'processed' in prog:
-                # log success
+            if prog.get('unchanged'):
+                message = 'UNCHANGED - {} | the output from before is kept'.format(prog['filename'])
+            elif 'processed' in prog:
                 message = 'SUCCESS - {} | {} records processed'.format(prog['filename'], prog['processed'])
-                gui.LOGGER.info(message)
+                # and how many were skipped if the records were filtered
+                if prog.get('filtered'):
+                    message += ', {} filtered out'.format(prog['filtered'])
             else:
-                # log success
                 message = 'SUCCESS - {}'.format(prog['filename'])
-                gui.LOGGER.info(message)
+            # add where the time went if it was timed
+            if prog.get('timings'):
+                message = '{} | {}'.format(message, format_timings(prog['timings']))
+            # log success
+            gui.LOGGER.info(message)
 
             # if the output path is in the progress dict, log it
             if 'output_path' in prog:
@@ -7,6 +7,7 @@ import webbrowser
 import cdc
 from . import helpers
 from .. import read, write
+from ..convert import ConversionThread
 
 class HelpWindow(tk.Toplevel):
     """Contextual help window"""
@@ -179,7 +180,7 @@ class HelpWindow(tk.Toplevel):
                 'label': 'Number of Files to Process at a Time',
                 'help': 'Choose the number of files to process at once. The default (recommended) number is one fewer file than the total number of CPU cores on your machine. For you, that number is {}.'.format(cpus)
             }
-        ]
+        ] + ConversionThread.UC_PROPS
 
         # add subheader to GUI
         subheader.pack(side='top', fill='x', pady=10)
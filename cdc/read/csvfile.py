@@ -0,0 +1,365 @@
+"""Contains class for reading in CSV and TSV files"""
+import csv
+import os
+import sys
+import time
+import traceback
+import cdc
+from .text import ReadTXT
+from ..utils import compression, recordfilter
+from ..utils.extsort import external_sort
+
+# the delimiter for each choice of the delimiter option, auto looks for the one in the header
+DELIMITERS = {
+    'comma': ',',
+    'tab': '\t',
+    'semicolon': ';',
+    'pipe': '|'
+}
+
+class ReadCSV(ReadTXT):
+    """CSV Reader"""
+
+    # required class variables for extensions, interface labels, and description
+    EXTENSIONS = ['csv', 'tsv'] + ['{}.{}'.format(name, extension) for name in ('csv', 'tsv') for extension in compression.EXTENSIONS]
+    GUI_LABELS = ['CSV/TSV']
+    CLI_LABELS = ['csv', 'tsv']
+    DESCRIPTION = 'Spreadsheet-style files with a header row and one row per note (or per part of a note), separated by commas or tabs. Fields can be quoted and contain line breaks. These files have a ".csv" or ".tsv" extension.'
+    # get the possible text and ID columns from the config file
+    TEXT_COLUMNS = [column.lower().strip() for column in cdc.CONFIG.get('read.csv', 'Text_Columns', fallback='NOTE_TEXT, Report_Text, Text, Note, Comments').split(',')]
+    ID_COLUMNS = [column.lower().strip() for column in cdc.CONFIG.get('read.csv', 'Id_Columns', fallback='NOTE_ID, Report_Number, Record_Id, Id').split(',')]
+
+    # Add UC_PROPS to ones from ReadTXT
+    UC_PROPS = [
+        {'flag': '--csvdelim',
+         'name': '--csv-delimiter',
+         'label': 'Column Delimiter',
+         'action': 'store',
+         'default': 'auto',
+         'type': str,
+         'help': ('The character between the columns of the file. auto uses tab for ".tsv" files and '
+                  'otherwise whichever of the others is in the header row the most.'),
+         'choices': ['auto'] + list(DELIMITERS),
+         'gui_choices': ['auto'] + list(DELIMITERS),
+         'var': 'csv_delimiter',
+         'position': -3,
+         'required': True},
+        {'flag': '--textcol',
+         'name': '--text-column',
+         'label': 'Text Column',
+         'action': 'store',
+         'default': None,
+         'type': str,
+         'help': ('The column with the note text. If it isn\'t given, the first of the text columns '
+                  'in the config file that is in the file is used.'),
+         'var': 'text_column',
+         'position': -2,
+         'required': False},
+        {'flag': '--idcol',
+         'name': '--id-column',
+         'label': 'ID Column',
+         'action': 'store',
+         'default': None,
+         'type': str,
+         'help': ('The column that identifies each record, rows next to each other with the same ID '
+                  'are one record. If it isn\'t given, the first of the ID columns in the config file '
+                  'that is in the file is used, and if there isn\'t one every row is a record.'),
+         'var': 'id_column',
+         'position': -1,
+         'required': False},
+        {'flag': '--nohdr',
+         'name': '--no-header',
+         'label': 'Create Record Headers',
+         'action': 'store_false',
+         'default': True,
+         'help': 'Do not add header to output files',
+         'gui_help': 'Create record headers using the metadata columns of each record.',
+         'var': 'create_header',
+         'position': 0,
+         'required': False},
+        {'flag': '--group',
+         'name': '--group-by-id',
+         'label': 'Group Unsorted Records',
+         'action': 'store_true',
+         'default': False,
+         'help': ('Collect the rows for each ID even if the file is not sorted by it, so every record '
+                  'is written once. Records are written in order of their IDs.'),
+         'var': 'group_records',
+         'position': 1,
+         'required': False},
+        {'flag': '--metacols',
+         'name': '--metadata-columns',
+         'label': 'Metadata Columns',
+         'action': 'store',
+         'default': None,
+         'type': str,
+         'help': ('The columns to keep as each record\'s metadata (and in its header), separated by '
+                  'commas. All of the columns other than the text column are kept if it isn\'t given.'),
+         'var': 'metadata_columns',
+         'position': 2,
+         'required': False}
+    ] + recordfilter.UC_PROPS + ReadTXT.UC_PROPS
+
+    # sort UC_PROPS
+    UC_PROPS = sorted(UC_PROPS, key=lambda k: k['position'])
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # note text can be far longer than the csv module allows by default (128 KB), the
+        # largest limit it takes on every platform is the largest C long on Windows
+        csv.field_size_limit(min(sys.maxsize, cdc.CONFIG.getint('read.csv', 'field_size_limit', fallback=2147483647)))
+        # the fields variable stores the column names in the file
+        self.fields = []
+        # the positions of the text and ID columns, and the metadata columns
+        self.text_index = None
+        self.id_index = None
+        self.metadata_indexes = []
+        # the delimiter between columns
+        self.delimiter = self.get_delimiter(None)
+        # read the header row to validate the file and get the columns, and where the
+        # rows start after it so read_data() doesn't read it again
+        try:
+            lines = self.read_first_lines(1)
+            if lines:
+                line, start = lines[0]
+                # a byte order mark isn't part of the first column's name
+                line = line.replace(u'\ufeff', '')
+                self.delimiter = self.get_delimiter(line)
+                # a header with a line break in a quoted name goes on past the first line,
+                # so it has to be read again as rows
+                if line.count('"') % 2 == 0:
+                    self.fields = next(csv.reader([line], delimiter=self.delimiter), [])
+                    self.data_start = start
+                else:
+                    with compression.open_text(self.info['metadata']['filepath'], self.options['r_encoding'], newline='') as file:
+                        self.fields = next((row for row in csv.reader(file, delimiter=self.delimiter) if row), [])
+        except (UnicodeDecodeError, UnicodeError) as e:
+            self.put_error(self.info['metadata']['filename'], 'Unable to decode file with given encoding: ' + str(e))
+        except csv.Error as e:
+            self.put_error(self.info['metadata']['filename'], 'Not a valid CSV file: ' + str(e))
+        except:
+            error = traceback.format_exc()
+            self.put_error(self.info['metadata']['filename'], 'Unable to read input file: ' + str(sys.exc_info()[1]), error)
+        self.fields = [field.lower().strip().replace(u'\ufeff', '') for field in self.fields]
+        # make sure there was more than one column, otherwise report error
+        if len(self.fields) <= 1:
+            self.put_error(self.info['metadata']['filename'], 'Not a valid CSV file, the header row has less than two columns')
+        # find the text column, the records have no text without it
+        self.text_index = self.find_column(self.options.get('text_column'), self.TEXT_COLUMNS)
+        if self.text_index is None and self.options.get('text_column'):
+            self.put_error(self.info['metadata']['filename'], 'The text column "{}" is not in the file'.format(self.options['text_column']))
+        elif self.text_index is None:
+            self.put_error(self.info['metadata']['filename'], 'Could not determine file\'s text column.')
+        # find the ID column, every row is a record without one
+        self.id_index = self.find_column(self.options.get('id_column'), self.ID_COLUMNS)
+        if self.id_index is None and self.options.get('id_column'):
+            self.put_error(self.info['metadata']['filename'], 'The ID column "{}" is not in the file'.format(self.options['id_column']))
+        # find the metadata columns, all but the text by default
+        if self.options.get('metadata_columns'):
+            for column in self.options['metadata_columns'].split(','):
+                index = self.find_column(column, [])
+                if index is None:
+                    self.put_error(self.info['metadata']['filename'], 'The metadata column "{}" is not in the file'.format(column.strip()))
+                self.metadata_indexes.append(index)
+        else:
+            self.metadata_indexes = [index for index in range(len(self.fields)) if index != self.text_index]
+        # update metadata fields
+        self.info['metadata'].update({self.fields[index]: None for index in self.metadata_indexes})
+        # only convert the records the user wants, if they filtered them
+        self.create_record_filter()
+
+    def get_delimiter(self, header):
+        """Returns the delimiter the user chose, or the one for the file's extension
+        or in its header row (if it's given) when they chose auto"""
+        choice = self.options.get('csv_delimiter') or 'auto'
+        if choice != 'auto':
+            return DELIMITERS[choice]
+        if compression.strip_extension(self.info['metadata']['filepath']).lower().endswith('.tsv'):
+            return '\t'
+        if header is None:
+            return ','
+        # the first delimiter wins a tie, so a header without any is comma-separated
+        return max(DELIMITERS.values(), key=header.count)
+
+    def find_column(self, name, choices):
+        """Returns the position of the column with name, or of the first of the choices that's
+        in the file if name isn't given, or None if it isn't there (if there are repeated
+        names, the last column with it)"""
+        names = [name.lower().strip()] if name else choices
+        last_index = {field: index for index, field in enumerate(self.fields)}
+        for name in names:
+            if name in last_index:
+                return last_index[name]
+        return None
+
+    def get_row_dict(self, row):
+        """Returns a dict of column name to value for a row"""
+        return dict(zip(self.fields, [value.strip() for value in row]))
+
+    def get_metadata(self, row):
+        """Returns a dict of the metadata columns of a row"""
+        return {self.fields[index]: row[index].strip() if index < len(row) else '' for index in self.metadata_indexes}
+
+    def get_text(self, row):
+        """Returns the text of a row, or an empty string if it doesn't have the text column"""
+        if self.text_index < len(row):
+            return row[self.text_index]
+        return ''
+
+    def get_id(self, row):
+        """Returns the ID of a row, or None if the records don't have IDs"""
+        if self.id_index is None:
+            return None
+        if self.id_index < len(row):
+            return row[self.id_index].strip()
+        return ''
+
+    def read_rows(self, file, start):
+        """Generator that yields the line number and values of each row in file that isn't
+        blank, warning about rows that don't have a value for each column"""
+        reader = csv.reader(file, delimiter=self.delimiter)
+        # the line the next row starts on
+        line = start + 1
+        for index, row in self.file_gen(file, start, reader):
+            row_line = line
+            line = start + reader.line_num + 1
+            # skip blank lines
+            if not row:
+                continue
+            if len(row) != len(self.fields):
+                self.put_warning(self.info['metadata']['filename'], 'header_mismatch', row_line)
+            yield row_line, row
+
+    def read_data(self):
+        """Generator to yield lines from each record in file"""
+        # check for messages before starting
+        self.check_msg_queue()
+        # open the file, the csv module handles the line breaks in quoted fields itself
+        with self.open_file(newline='') as file:
+            # count the number of records
+            count = 0
+            # start the time and set state to Running
+            self.progress['timer'] = time.time()
+            self.progress['state'] = 'Running'
+            # put the progress without waiting
+            self.prog_nowait()
+            # start after the header if it's known where it ends
+            start = 0
+            if self.data_start is not None:
+                file.seek(self.data_start['offset'])
+                start = self.data_start['line'] - 1
+            # if the writer takes the records in parts, yield a part whenever
+            # it has this many characters so a huge note isn't held twice
+            limit = 0
+            if self.streaming:
+                limit = cdc.CONFIG.getint('read.txt', 'stream_part_size', fallback=16777216)
+            self.info['continues'] = False
+            generator = self.read_rows(file, start)
+            # the header row is the first one if it wasn't skipped
+            if self.data_start is None:
+                next(generator, None)
+            # if the rows for an ID may not be together, sort them by ID first
+            if self.options['group_records'] and self.id_index is not None:
+                generator = self.group_rows(generator)
+            # where we'll store the lines for each record, and how many characters they have
+            lines = []
+            size = 0
+            # the ID of the record being read, and whether it was filtered out
+            record_id = None
+            skipping = False
+            first = True
+            try:
+                for line, row in generator:
+                    row_id = self.get_id(row)
+                    # a new record starts at every row without IDs, or when the ID changes
+                    if first or row_id is None or row_id != record_id:
+                        first = False
+                        # yield the last one if there are lines
+                        if lines or self.info['continues']:
+                            count += 1
+                            self.progress['processed'] = count
+                            self.info['continues'] = False
+                            self.info['data'] = lines
+                            yield self.info
+                            lines = []
+                            size = 0
+                        record_id = row_id
+                        self.info['line'] = line
+                        skipping = self.record_filter is not None and not self.record_filter.keep(self.get_row_dict(row))
+                        if skipping:
+                            self.filtered += 1
+                            self.progress['filtered'] = self.filtered
+                            continue
+                        # the metadata of a record is from its first row
+                        metadata = self.get_metadata(row)
+                        self.info['metadata'].update(metadata)
+                        # if the user wants a header, give em a header
+                        if self.options['create_header']:
+                            lines.append('{}\n'.format('\t'.join(metadata.values())))
+                    elif skipping:
+                        continue
+                    # add the text of the row
+                    for text in self.read_text(self.get_text(row), limit):
+                        lines.extend(text)
+                        # yield the record so far if it's too long to keep in memory
+                        if limit > 0:
+                            size += sum(len(text_line) for text_line in text)
+                            if size >= limit:
+                                self.info['continues'] = True
+                                self.info['data'] = lines
+                                yield self.info
+                                lines = []
+                                size = 0
+            except csv.Error as e:
+                self.put_error(self.info['metadata']['filename'], 'Not a valid CSV file: {} (line {})'.format(e, self.info['line']))
+            # if there are still lines to be yielded, increment count
+            last = bool(lines or self.info['continues'])
+            if last:
+                count += 1
+            # set state to finished and add count to progress dict
+            self.progress['state'] = 'Finished'
+            self.progress['processed'] = count
+            # get position in file
+            self.refresh_file_prog(file)
+            # report progress - wait for this one
+            self.prog_wait()
+            # if there are lines to yield, yield them
+            if last:
+                self.info['continues'] = False
+                self.info['data'] = lines
+                yield self.info
+
+    def group_rows(self, rows):
+        """Generator that yields the (line number, values) of each row sorted by record
+        ID, keeping the rows for an ID in the order they were in. Rows are sorted in
+        memory until there are group_buffer_size characters of them, then they are
+        written to a temporary file as a sorted run and the runs are merged at the end."""
+        limit = cdc.CONFIG.getint('read.csv', 'group_buffer_size', fallback=16777216)
+        self.progress['state'] = 'Grouping'
+        self.prog_nowait()
+        entries = self.id_rows(rows)
+        for record_id, line, row in external_sort(entries, limit, lambda entry: sum(len(value) for value in entry[2]),
+                                                  self.write_run, self.read_run):
+            yield line, row
+
+    def id_rows(self, rows):
+        """Generator that yields the (record ID, line number, values) of each row, the
+        line number keeps the rows for an ID in the order they were in"""
+        for line, row in rows:
+            yield self.get_id(row), line, row
+        # every row has been read, the rest is merging
+        self.progress['state'] = 'Running'
+
+    def write_run(self, entries, path):
+        """Writes sorted (record ID, line number, values) tuples to a CSV file and returns its path"""
+        with open(path, 'w', encoding='utf8', newline='') as file:
+            writer = csv.writer(file)
+            for record_id, line, row in entries:
+                writer.writerow([record_id, line] + row)
+        return path
+
+    def read_run(self, path):
+        """Generator that reads the (record ID, line number, values) tuples from a run"""
+        with open(path, 'r', encoding='utf8', newline='') as file:
+            for row in csv.reader(file):
+                yield row[0], int(row[1]), row[2:]
@@ -1,9 +1,13 @@
 """Contains class for reading in RPDR files"""
+import os
 import queue
 import time
 import traceback
 import cdc
 from .text import ReadTXT
+from ..utils import recordfilter
+from ..utils.extsort import external_sort
+from ..utils.timing import ProgressTimer
 
 class ReadEpicText(ReadTXT):
     """Epic Text Reader"""
@@ -32,6 +36,16 @@ class ReadEpicText(ReadTXT):
          'required': True,
          'position': -1
         },
+        {'flag': '--group',
+         'name': '--group-by-id',
+         'label': 'Group Unsorted Records',
+         'action': 'store_true',
+         'default': False,
+         'help': ('Collect the lines for each ID even if the file is not sorted by it, so every record '
+                  'is written once. Records are written in order of their IDs.'),
+         'var': 'group_records',
+         'position': 1,
+         'required': False},
         {'flag': '--nohdr',
          'name': '--no-header',
          'label': 'Create Record Headers',
@@ -42,7 +56,7 @@ class ReadEpicText(ReadTXT):
          'var': 'create_header',
          'position': 0,
          'required': False}
-    ] + ReadTXT.UC_PROPS
+    ] + recordfilter.UC_PROPS + ReadTXT.UC_PROPS
 
     # sort UC_PROPS
     UC_PROPS = sorted(UC_PROPS, key=lambda k: k['position'])
@@ -53,20 +67,15 @@ class ReadEpicText(ReadTXT):
         self.text_field = None
         # the fields variable stores the metadata field titles in the file
         self.fields = []
-        # open the file to validate file and get fields
+        # read the first line with text to validate the file and get the fields, and
+        # where the lines start after it so read_data() doesn't read it again
         try:
-            with open(self.info['metadata']['filepath'], 'r', encoding=self.options['r_encoding']) as file:
-                # read line-by-line, the first two lines with text is all we need
-                for line in file:
-                    # skip any blank lines
-                    if line.strip() == '':
-                        continue
-                    else:
-                        # store first line so we can ignore it later
-                        self.first_line = line
-                        # read in metadata fields and break loop
-                        self.fields = [field.lower().strip().replace(u'\ufeff', '') for field in line.split('\t')]
-                        break
+            for line, start in self.read_first_lines(1):
+                # store first line so we can ignore it later
+                self.first_line = line
+                self.data_start = start
+                # read in metadata fields
+                self.fields = [field.lower().strip().replace(u'\ufeff', '') for field in line.split('\t')]
         except UnicodeDecodeError:
             self.put_error(self.info['metadata']['filename'], 'Unable to decode file with given encoding.')
         except:
@@ -86,7 +95,7 @@ class ReadEpicText(ReadTXT):
                     break
             # warn user if couldn't find text field
             if self.text_field is None:
-                self.put_warning(self.info['metadata']['filename'], 'Could not determine file\'s text field.')
+                self.put_warning(self.info['metadata']['filename'], 'no_text_field')
             # find the ID field - necessary for epic since there's no delimiter
             if (self.options['epic_id'] == 'Autodetect'
                 or self.options['epic_id'] == 'autodetect'):
@@ -107,6 +116,8 @@ class ReadEpicText(ReadTXT):
             else:
                 # make the id all lowercase (because the fields are lowercase)
                 self.options['epic_id'] = self.options['epic_id'].lower()
+            # only convert the records the user wants, if they filtered them
+            self.create_record_filter()
             
 
     def read_data(self):
@@ -114,9 +125,7 @@ class ReadEpicText(ReadTXT):
         # check for messages before starting
         self.check_msg_queue()
         # open the file
-        with open(self.info['metadata']['filepath'],
-                  'r',
-                  encoding=self.options['r_encoding']) as file:
+        with self.open_file() as file:
             # count the number of records
             count = 0
             # where we'll store the lines for each record
@@ -129,8 +138,16 @@ class ReadEpicText(ReadTXT):
                 self.progress_queue.put_nowait(self.progress)
             except queue.Full:
                 pass
+            # start after the header if it's known where it ends
+            start = 0
+            if self.data_start is not None:
+                file.seek(self.data_start['offset'])
+                start = self.data_start['line'] - 1
             # create generator so we can skip the first line and get first entry
-            generator = enumerate(file)
+            generator = enumerate(file, start)
+            # if the lines for an ID may not be together, sort them by ID first
+            if self.options['group_records']:
+                generator = self.group_lines(file, start)
             # iterate through lines in file
             for index, line in generator:
                 # skip first line and blank lines
@@ -140,41 +157,71 @@ class ReadEpicText(ReadTXT):
                 else:
                     last = self.read_helper(index, line)
                     break
-            # if the user wants a header, give em a header
-            if self.options['create_header']:
-                # create a header with metadata (but get rid of text and line #)
-                lines.append('{}\n'.format('\t'.join([value for key, value in last.items() if key != self.text_field and key != 'line'])))
-            # add the line to the lines list
-            lines.append(last[self.text_field])
+            # if the records are filtered, the first line of a record decides if it's
+            # converted, and the lines of one that isn't are skipped
+            skipping = self.record_filter is not None and not self.record_filter.keep(last)
+            if skipping:
+                self.filtered += 1
+                self.progress['filtered'] = self.filtered
+            else:
+                # if the user wants a header, give em a header
+                if self.options['create_header']:
+                    # create a header with metadata (but get rid of text and line #)
+                    lines.append('{}\n'.format('\t'.join([value for key, value in last.items() if key != self.text_field and key != 'line'])))
+                # add the line to the lines list
+                lines.append(last[self.text_field])
+            # the positions of the ID and text columns, so only those are
+            # sliced out of each line and the full metadata is only built
+            # for the first and last lines of each record
+            columns = self.get_columns()
+            # the split values of the last line, for the record's metadata
+            last_values = None
+            # report progress every so often, checking the time every so many lines
+            timer = ProgressTimer(self.report_interval)
+            countdown = 1
+            last_id = last[self.options['epic_id']]
             # keep going through generator
             for index, line in generator:
                 # append blank lines, they'll be removed by writer if told to
                 if line.strip() == '':
-                    lines.append(line)
+                    if not skipping:
+                        lines.append(line)
                     # continue with loop
                     continue
-                # get line dictionary
-                line_dict = self.read_helper(index, line)
+                values = line.split('\t')
+                if columns is not None and len(values) == len(self.fields):
+                    record_id = values[columns[0]].strip()
+                    text = values[columns[1]].strip()
+                else:
+                    # read_helper warns about the line and raises like before
+                    # if it's missing the ID or text
+                    line_dict = self.read_helper(index, line)
+                    record_id = line_dict[self.options['epic_id']]
+                    text = line_dict[self.text_field]
                 # if it's time to report progress/check message queues, do it
-                if index % self.report_rate == 0:
-                    # check messages
-                    self.check_msg_queue()
-                    # flush read-ahead buffer and get position in file
-                    file.flush()
-                    self.progress['progress'] = file.tell()
-                    # report progress without waiting
-                    try:
-                        self.progress_queue.put_nowait(self.progress)
-                    except queue.Full:
-                        pass
+                countdown -= 1
+                if not countdown:
+                    due, countdown = timer.check()
+                    if due:
+                        # check messages
+                        self.check_msg_queue()
+                        # get position in file
+                        self.refresh_file_prog(file)
+                        # report progress without waiting
+                        try:
+                            self.progress_queue.put_nowait(self.progress)
+                        except queue.Full:
+                            pass
                 # check if it's a new record
-                if last and line_dict[self.options['epic_id']] != last[self.options['epic_id']]:
+                if record_id != last_id:
                     # yield lines if there are any
                     if lines:
                         # increment number of records
                         count += 1
                         # delete the text from metadata and update the metadata
                         # you have to update metadata so it's for last record
+                        if last_values is not None:
+                            last = self.get_line_dict(last_values)
                         del last[self.text_field]
                         self.info['metadata'].update(last)
                         # set lines for info dictionary and yield it
@@ -182,38 +229,111 @@ class ReadEpicText(ReadTXT):
                         yield self.info
                         # clear lines list
                         lines = []
+                    # the full metadata is only needed for a header or a filter
+                    if self.options['create_header'] or self.record_filter is not None:
+                        line_dict = self.get_line_dict(values)
+                    skipping = self.record_filter is not None and not self.record_filter.keep(line_dict)
+                    if skipping:
+                        self.filtered += 1
+                        self.progress['filtered'] = self.filtered
+                    else:
                         # if they want a header, create one
                         if self.options['create_header']:
                             lines.append('{}\n'.format('\t'.join([value for key, value in line_dict.items() if key != self.text_field and key != 'line'])))
                         # add text from this line, because this is a new record
-                        lines.append('{}\n'.format(line_dict[self.text_field]))
+                        lines.append('{}\n'.format(text))
                 # if it's not a new record, add the line
-                else:
-                    lines.append('{}\n'.format(line_dict[self.text_field]))
-                last = line_dict
+                elif not skipping:
+                    lines.append('{}\n'.format(text))
+                last_id = record_id
+                last_values = values
             # if there are still lines to be yielded, increment count
             if lines:
                 count += 1
             # set state to finished and add count to progress dict
             self.progress['state'] = 'Finished'
             self.progress['processed'] = count
-            # flush read-ahead buffer and get position in file
-            file.flush()
-            self.progress['progress'] = file.tell()
+            # get position in file
+            self.refresh_file_prog(file)
             # report progress - wait for this one
             self.progress_queue.put(self.progress)
             # if there are lines to yield, add them to info dict, update
             # metadata, and yield the dictionary
             if lines:
+                if last_values is not None:
+                    last = self.get_line_dict(last_values)
                 del last[self.text_field]
                 self.info['metadata'].update(last)
                 self.info['data'] = lines
                 yield self.info
 
+    def group_lines(self, file, start=0):
+        """Generator that yields the index and line of each line in file sorted
+        by record ID, with blank lines kept after the line before them. Lines
+        are sorted in memory until there are group_buffer_size characters of
+        them, then they are written to a temporary file as a sorted run and
+        the runs are merged at the end."""
+        limit = cdc.CONFIG.getint('read.epic', 'group_buffer_size', fallback=16777216)
+        self.progress['state'] = 'Grouping'
+        self.prog_nowait()
+        lines = self.id_lines(file, start)
+        for record_id, index, line in external_sort(lines, limit, lambda entry: len(entry[2]),
+                                                    self.write_run, self.read_run):
+            yield index, line
+
+    def id_lines(self, file, start=0):
+        """Generator that yields the (record ID, index, line) of each line in file, the
+        index keeps the lines for an ID in the order they were in"""
+        columns = self.get_columns()
+        record_id = None
+        for index, line in self.file_gen(file, start):
+            if line.strip() == '' or line == self.first_line:
+                # skip the header and blank lines before the first record
+                # like read_data, later blank lines go with the line before
+                if record_id is None:
+                    continue
+            # get the ID the same way read_data does, it warns about bad lines later
+            if line.strip() != '':
+                values = line.split('\t')
+                if columns is not None and len(values) == len(self.fields):
+                    record_id = values[columns[0]].strip()
+                else:
+                    record_id = self.get_line_dict(values).get(self.options['epic_id'], '')
+            yield record_id, index, line
+        # every line has been read, the rest is merging
+        self.progress['state'] = 'Running'
+
+    def write_run(self, lines, path):
+        """Writes sorted (record ID, index, line) tuples to a file and returns its path"""
+        with open(path, 'w', encoding='utf8', newline='\n') as file:
+            for record_id, index, line in lines:
+                # every line needs a newline to be read back separately
+                file.write('{}\t{}\t{}{}'.format(record_id, index, line, '' if line.endswith('\n') else '\n'))
+        return path
+
+    def read_run(self, path):
+        """Generator that reads the (record ID, index, line) tuples from a run"""
+        with open(path, 'r', encoding='utf8', newline='\n') as file:
+            for entry in file:
+                record_id, index, line = entry.split('\t', 2)
+                yield record_id, int(index), line
+
+    def get_columns(self):
+        """Returns the indices of the ID and text fields, or None if either
+        isn't one of the fields"""
+        if self.options['epic_id'] not in self.fields or self.text_field not in self.fields:
+            return None
+        # if a field name is repeated, the dicts keep the last value for it
+        last_index = {field: index for index, field in enumerate(self.fields)}
+        return last_index[self.options['epic_id']], last_index[self.text_field]
+
+    def get_line_dict(self, values):
+        """Returns a dict of field to value from the split values of a line"""
+        return dict(zip(self.fields, [value.strip() for value in values]))
+
     def read_helper(self, index, line):
         """Helper that processes the lines"""
-        values = [value.strip() for value in line.split('\t')]
+        values = line.split('\t')
         if len(values) != len(self.fields):
-            self.put_warning(self.info['metadata']['filename'], 'Line does not match header', index + 1)
-        line_dict = dict(zip(self.fields, values))
-        return line_dict
+            self.put_warning(self.info['metadata']['filename'], 'header_mismatch', index + 1)
+        return self.get_line_dict(values)
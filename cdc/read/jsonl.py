@@ -0,0 +1,334 @@
+"""Contains class for reading in JSON Lines files"""
+import io
+import json
+import sys
+import time
+import traceback
+import cdc
+from .text import FileRange, ReadTXT
+from ..utils import compression, recordfilter
+from ..utils.encoding import is_ascii_compatible, is_byte_searchable
+from ..utils.timing import ProgressTimer
+
+class ReadJSONL(ReadTXT):
+    """JSON Lines Reader"""
+
+    # required class variables for extensions, interface labels, and description
+    EXTENSIONS = ['jsonl', 'ndjson'] + ['{}.{}'.format(name, extension) for name in ('jsonl', 'ndjson') for extension in compression.EXTENSIONS]
+    GUI_LABELS = ['JSON Lines']
+    CLI_LABELS = ['jsonl', 'ndjson']
+    DESCRIPTION = 'Files with one JSON object on each line for each note, with its text and metadata as fields. These files have a ".jsonl" or ".ndjson" extension.'
+    # get the possible text fields from the config file
+    TEXT_FIELDS = [field.lower().strip() for field in cdc.CONFIG.get('read.jsonl', 'Text_Fields', fallback='text, note_text, report_text, note, body').split(',')]
+
+    # Add UC_PROPS to ones from ReadTXT
+    UC_PROPS = [
+        {'flag': '--textfield',
+         'name': '--text-field',
+         'label': 'Text Field',
+         'action': 'store',
+         'default': None,
+         'type': str,
+         'help': ('The field of each object with the note text. If it isn\'t given, the first of the text '
+                  'fields in the config file that is in the first object is used.'),
+         'var': 'text_field',
+         'position': -2,
+         'required': False},
+        {'flag': '--metafields',
+         'name': '--metadata-fields',
+         'label': 'Metadata Fields',
+         'action': 'store',
+         'default': None,
+         'type': str,
+         'help': ('The fields to keep as each record\'s metadata, separated by commas. All of the fields '
+                  'other than the text field are kept if it isn\'t given.'),
+         'var': 'metadata_fields',
+         'position': -1,
+         'required': False},
+        {'flag': '--hdr',
+         'name': '--add-header',
+         'label': 'Create Record Headers',
+         'action': 'store_true',
+         'default': False,
+         'help': 'Add a header line with the metadata fields of each record before its text',
+         'var': 'add_header',
+         'position': 0,
+         'required': False}
+    ] + recordfilter.UC_PROPS + ReadTXT.UC_PROPS
+
+    # sort UC_PROPS
+    UC_PROPS = sorted(UC_PROPS, key=lambda k: k['position'])
+
+    # every line is a record, so files can be split between any two lines
+    # and reading can start again after any of them
+    SPLITTABLE = True
+    RESUMABLE = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # the fields variable stores the (lowercase) fields of the first object, for the record filter
+        self.fields = []
+        # the field with the text, and the fields to keep as metadata (None for all of them)
+        self.text_field = None
+        self.metadata_fields = None
+        # the file being read and the line the next record starts on, for checkpoints
+        self.file = None
+        self.next_line = 1
+        # read the first object to find the text field
+        first = {}
+        try:
+            lines = self.read_first_lines(1)
+            if lines:
+                first = json.loads(lines[0][0].lstrip(u'\ufeff'))
+            if not isinstance(first, dict):
+                self.put_error(self.info['metadata']['filename'], 'Not a valid JSON Lines file, the first line is not a JSON object')
+        except (UnicodeDecodeError, UnicodeError) as e:
+            self.put_error(self.info['metadata']['filename'], 'Unable to decode file with given encoding: ' + str(e))
+        except ValueError as e:
+            self.put_error(self.info['metadata']['filename'], 'Not a valid JSON Lines file: ' + str(e))
+        except:
+            error = traceback.format_exc()
+            self.put_error(self.info['metadata']['filename'], 'Unable to read input file: ' + str(sys.exc_info()[1]), error)
+        self.fields = [field.lower() for field in first]
+        # find the text field, the records have no text without it
+        if self.options.get('text_field'):
+            self.text_field = self.find_field(first, self.options['text_field'].strip())
+        else:
+            for field in self.TEXT_FIELDS:
+                if field in self.fields:
+                    self.text_field = self.find_field(first, field)
+                    break
+            if self.text_field is None:
+                self.put_error(self.info['metadata']['filename'], 'Could not determine file\'s text field.')
+        # the metadata fields are named as they are in the first object if they're in it
+        if self.options.get('metadata_fields'):
+            self.metadata_fields = [self.find_field(first, field.strip()) for field in self.options['metadata_fields'].split(',') if field.strip()]
+        # the metadata every record has, the fields of each record are added to a copy of it
+        self.file_metadata = dict(self.info['metadata'])
+        # update metadata fields
+        self.info['metadata'] = dict({field: None for field in (self.metadata_fields or first) if field != self.text_field}, **self.file_metadata)
+        # only convert the records the user wants, if they filtered them
+        self.create_record_filter()
+
+    def find_field(self, record, name):
+        """Returns the field of record that is name in any case, or name if there isn't one"""
+        for field in record:
+            if field.lower() == name.lower():
+                return field
+        return name
+
+    def get_value(self, value):
+        """Returns the text of a field's value, JSON for anything that isn't a string"""
+        if isinstance(value, str):
+            return value
+        if value is None:
+            return ''
+        return json.dumps(value, ensure_ascii=False)
+
+    def get_metadata(self, record):
+        """Returns a dict of the metadata fields of a record"""
+        # most values are strings, which are kept as they are
+        if self.metadata_fields is None:
+            return {field: value if isinstance(value, str) else self.get_value(value) for field, value in record.items() if field != self.text_field}
+        return {field: self.get_value(record.get(field)) for field in self.metadata_fields}
+
+    def get_record_dict(self, record):
+        """Returns a dict of (lowercase) field name to value for a record, for the record filter"""
+        return {field.lower(): self.get_value(value) for field, value in record.items()}
+
+    def split(self, chunk_size):
+        """Returns (start, end) byte ranges of about chunk_size bytes that each end
+        after a line, or None if the file can't be split"""
+        # the chunks are read by other readers
+        self.close_input()
+        # lines can only be found in the raw bytes if the encoding is ASCII-compatible,
+        # and a compressed file can't be read from the middle
+        if not is_ascii_compatible(self.options['r_encoding']) or compression.get_compression(self.info['metadata']['filepath']) is not None:
+            return None
+        size = self.info['metadata']['size']
+        ranges = []
+        start = 0
+        with open(self.info['metadata']['filepath'], 'rb') as file:
+            while start < size:
+                # the last chunk just goes to the end of the file
+                if start + chunk_size >= size:
+                    ranges.append((start, size))
+                    break
+                # the chunk ends after the line we land in
+                file.seek(start + chunk_size)
+                file.readline()
+                end = file.tell()
+                ranges.append((start, end))
+                start = end
+        return ranges
+
+    def get_position(self):
+        """Returns the offset and line number where the next record starts,
+        only valid while the generator is paused after yielding a record"""
+        # lines are read with readline() when resuming so tell() is exact
+        return self.file.tell(), self.next_line
+
+    def sample_ranges(self, count):
+        """Returns the (start, end) byte ranges of up to count records picked at random,
+        in the order they're in the file, or None if they can't be found by searching it"""
+        if not is_byte_searchable(self.options['r_encoding']) or compression.get_compression(self.info['metadata']['filepath']) is not None:
+            return None
+        return self.sample_records(count)
+
+    def find_record(self, data, offset):
+        """Returns the (start, end, is_record) of the line that offset is on in the memory-mapped file"""
+        start = data.rfind(b'\n', 0, offset) + 1
+        end = data.find(b'\n', offset)
+        end = len(data) if end == -1 else end + 1
+        # a blank line isn't a record
+        return start, end, bool(data[start:end].strip())
+
+    def find_records(self, data, index):
+        """Adds where each record starts in the memory-mapped file to the index"""
+        position = 0
+        timer = ProgressTimer(self.report_interval)
+        countdown = 1
+        while position < len(data):
+            end = data.find(b'\n', position)
+            end = len(data) if end == -1 else end + 1
+            # a blank line isn't a record
+            if data[position:end].strip():
+                index.add(position)
+                # check for messages every so often
+                countdown -= 1
+                if not countdown:
+                    due, countdown = timer.check()
+                    if due:
+                        self.check_msg_queue()
+            position = end
+
+    def read_record(self, line, number, limit):
+        """Generator that yields the info for the record on a line (in parts of about limit
+        characters if it's more than 0), or nothing if the line is blank, isn't a JSON
+        object or the record is filtered out. number is the line's number if it's known."""
+        # skip blank lines
+        if not line.strip():
+            return
+        self.info['line'] = number
+        # the first line of a file can start with a byte order mark
+        if line.startswith(u'\ufeff'):
+            line = line[1:]
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        # skip lines that aren't objects, one bad line shouldn't lose the rest of the file
+        if not isinstance(record, dict):
+            self.put_warning(self.info['metadata']['filename'], 'invalid_json', number)
+            return
+        if self.record_filter is not None and not self.record_filter.keep(self.get_record_dict(record)):
+            self.filtered += 1
+            self.progress['filtered'] = self.filtered
+            return
+        # the metadata of each record replaces the last one's, but a field can't
+        # replace what the reader knows about the file (like its filename)
+        metadata = self.get_metadata(record)
+        self.info['metadata'] = dict(metadata, **self.file_metadata)
+        lines = []
+        # if the user wants a header, give em a header
+        if self.options['add_header']:
+            lines.append('{}\n'.format('\t'.join(metadata.values())))
+        if self.text_field not in record:
+            self.put_warning(self.info['metadata']['filename'], 'no_text_field', number)
+        # add the text, in parts if it's too long to keep in memory twice
+        parts = self.read_text(self.get_value(record.get(self.text_field)), limit)
+        # the record isn't needed anymore
+        del record
+        self.progress['processed'] += 1
+        # every part but the last one continues the record
+        part = next(parts)
+        for following in parts:
+            lines.extend(part)
+            self.info['continues'] = True
+            self.info['data'] = lines
+            yield self.info
+            lines = []
+            part = following
+        lines.extend(part)
+        self.info['continues'] = False
+        self.info['data'] = lines
+        yield self.info
+
+    def get_limit(self):
+        """Returns the number of characters of text to yield at a time, 0 for all of it"""
+        # if the writer takes the records in parts, yield a part whenever it
+        # has this many characters so a huge note isn't held twice
+        if self.streaming:
+            return cdc.CONFIG.getint('read.txt', 'stream_part_size', fallback=16777216)
+        return 0
+
+    def read_sample(self):
+        """Generator like read_data() that only reads the records in the byte ranges of the sample"""
+        # each record is read from its own range of the file
+        self.close_input()
+        self.progress['records'] = len(self.sample)
+        self.progress['processed'] = 0
+        # start the time and set state to Running
+        self.progress['timer'] = time.time()
+        self.progress['state'] = 'Running'
+        # put the progress without waiting
+        self.prog_nowait()
+        limit = self.get_limit()
+        self.info['continues'] = False
+        for number, (start, end) in enumerate(self.sample):
+            raw = FileRange(self.info['metadata']['filepath'], start, end)
+            with io.TextIOWrapper(io.BufferedReader(raw), encoding=self.options['r_encoding']) as file:
+                try:
+                    line = file.read()
+                except UnicodeDecodeError as e:
+                    # There was an error decoding the data
+                    self.put_error(self.info["metadata"]["location"], str(e) + " (Did you choose the correct encoding?)")
+            # the progress is the share of the sample that's been read
+            self.progress['progress'] = self.progress['size'] * (number + 1) // len(self.sample)
+            self.prog_nowait()
+            # the line numbers aren't known without reading the rest of the file
+            yield from self.read_record(line, None, limit)
+        self.progress['state'] = 'Finished'
+        self.prog_wait()
+
+    def read_data(self):
+        """Generator to yield lines from each record in file"""
+        # only the records picked for a random sample are read
+        if self.sample is not None:
+            yield from self.read_sample()
+            return
+        # check for messages before starting
+        self.check_msg_queue()
+        with self.open_file() as file:
+            # keep the file so the position can be checked for checkpoints
+            self.file = file
+            # count the number of records
+            self.progress['processed'] = 0
+            # the first line is 1, or where the last checkpoint was if resuming
+            start = 0
+            if self.resume is not None:
+                file.seek(self.resume['offset'])
+                self.progress['processed'] = self.resume['records']
+                start = self.resume['line'] - 1
+            # tell() is only exact between records when reading with readline()
+            # (iterating reads ahead), so use it if saving checkpoints
+            lines_iter = None
+            if self.options.get('resume'):
+                lines_iter = iter(file.readline, '')
+            # start the time and set state to Running
+            self.progress['timer'] = time.time()
+            self.progress['state'] = 'Running'
+            # put the progress without waiting
+            self.prog_nowait()
+            limit = self.get_limit()
+            self.info['continues'] = False
+            for index, line in self.file_gen(file, start, lines_iter):
+                # the next record starts on the next line
+                self.next_line = index + 2
+                yield from self.read_record(line, index + 1, limit)
+            # set state to finished
+            self.progress['state'] = 'Finished'
+            # get position in file
+            self.refresh_file_prog(file)
+            # report progress - wait for this one
+            self.prog_wait()
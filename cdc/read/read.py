@@ -1,5 +1,4 @@
 """Contains superclass for reading in files"""
-import datetime
 import multiprocessing
 import os
 import queue
@@ -9,22 +8,45 @@ import time
 
 import cdc
 from .. import read
+from ..utils.timing import ProgressTimer
+from ..utils.warninglog import WarningLog, get_path
 from ..utils.ucprop import UCPropMixin
 
-# time format for warnings
-TIME_FORMAT = cdc.CONFIG.get('GUI', 'gui_log_timestamp', fallback='%H:%M:%S - %m-%d-%Y')
-
 class Read(UCPropMixin, object):
     """Superclass for reading in files"""
 
+    # whether files can be split into chunks that are converted in parallel
+    SPLITTABLE = False
+
+    # whether the reader can start from a checkpoint in the middle of a file
+    RESUMABLE = False
+
     def __init__(self, options, file_location, progress_queue=None, msg_queue=None):
         # create instance variables for options and queues
         self.options = options
         self.progress_queue = progress_queue
         self.msg_queue = msg_queue
-        self.warnings = []
-        # get the report rate from the config file
-        self.report_rate = cdc.CONFIG.getint('PROGRESS', 'report_rate', fallback=10000)
+        # the chunk of the file to read if it was split, otherwise None
+        self.chunk = options.get('chunk')
+        # warnings past the first few of each kind are written to a file in the output folder,
+        # named after the input until the writer has named its output (a chunk's go next to
+        # its part file, and are added to the file's warnings when the parts are merged)
+        warnings_path = None
+        if self.chunk is not None:
+            warnings_path = get_path(self.chunk['path'])
+        elif options.get('output_dir') is not None:
+            warnings_path = get_path(os.path.join(options['output_dir'], os.path.basename(file_location)))
+        self.warnings = WarningLog(warnings_path)
+        # the checkpoint to start reading from if resuming, otherwise None
+        self.resume = None
+        # whether the writer takes long documents in parts, set by the writer
+        self.streaming = False
+        # the (start, end) byte ranges of the records picked at random for a sample, set by the writer
+        self.sample = None
+        # seconds spent paused, so it isn't counted as time spent reading
+        self.paused = 0
+        # get the seconds between progress reports from the config file
+        self.report_interval = cdc.CONFIG.getfloat('PROGRESS', 'report_interval', fallback=0.2)
         # create info dictionary - this is used to communicate with writer
         self.info = {
             'data': None,
@@ -42,9 +64,25 @@ class Read(UCPropMixin, object):
             'state': 'Waiting',
             'warning': None,
             'error': None,
-            'timer': None
+            'timer': None,
+            # seconds spent in each stage of the conversion (read, unwrap, write, etc.)
+            'timings': {},
+            # the number of warnings of each code
+            'warnings': self.warnings.counts
         }
 
+    @classmethod
+    def has_extension(cls, filename):
+        """Checks if filename ends with one of the reader's EXTENSIONS, which can
+        have more than one part (like "txt.gz")"""
+        name = os.path.basename(filename).lower()
+        return any(name.endswith('.{}'.format(extension)) for extension in cls.EXTENSIONS)
+
+    def sample_ranges(self, count):
+        """Returns the (start, end) byte ranges of count records picked at random for a
+        sample, or None if the reader can't find records in the middle of a file"""
+        return None
+
     def check_msg_queue(self, message=None):
         """Checks msg_queue for messages to cancel, pause, resume, etc."""
         if self.msg_queue is not None:
@@ -73,7 +111,9 @@ class Read(UCPropMixin, object):
                     self.progress['state'] = 'Paused'
                     self.progress_queue.put(self.progress)
                 # this will block until a message is received, pausing process
+                paused = time.perf_counter()
                 resume_msg = self.msg_queue.get()
+                self.paused += time.perf_counter() - paused
                 # if the message is to resume, report progress, set state to Running
                 if resume_msg == 'resume':
                     if self.progress_queue is not None:
@@ -83,18 +123,22 @@ class Read(UCPropMixin, object):
                 else:
                     self.check_msg_queue(message=resume_msg)
 
-    def put_warning(self, filename, message, line=None):
-        """Adds a warning"""
-        time_str = datetime.datetime.now().strftime(TIME_FORMAT)
-        # create string and add to warnings list
-        if line is not None:
-            warning = '{} | {}, line {}: {}'.format(time_str, filename, line, message)
-        else:
-            warning = '{} | {}: {}'.format(time_str, filename, message)
-        self.warnings.append(warning)
-        if len(self.warnings) == cdc.CONFIG.getint('PROGRESS', 'warning_list_size', fallback=1000):
-            self.progress_queue.put(self.warnings)
-            self.warnings = []
+    def put_warning(self, filename, code, line=None, *args):
+        """Adds a warning, code is one of the codes in warninglog.MESSAGES (formatted
+        with args) or the message itself"""
+        if self.warnings.add(code, filename, line, args):
+            self.send_warnings()
+
+    def send_warnings(self, last=False):
+        """Puts the warnings that haven't been sent in the progress queue, and closes
+        the warnings file after the last ones"""
+        if last:
+            path = self.warnings.close()
+            # a chunk's warnings file is only kept until the parts are merged
+            if path is not None and self.chunk is None:
+                self.progress['warnings_file'] = path
+        if self.progress_queue is not None:
+            self.progress_queue.put(self.warnings.take())
 
     def put_error(self, filename, message, stack_info=None):
         """Adds an error"""
@@ -106,8 +150,7 @@ class Read(UCPropMixin, object):
             self.progress['state'] = 'Error'
 
             # put warnings in the queue so they get logged
-            self.progress_queue.put(self.warnings)
-            self.warnings = []
+            self.send_warnings(last=True)
             
             # copy progress dict
             progress = dict(self.progress)
@@ -123,23 +166,27 @@ class Read(UCPropMixin, object):
             self.progress_queue.put(progress)
         raise read.ReaderError(message)
     
-    def file_gen(self, file):
+    def file_gen(self, file, start=0, lines=None):
         """A generator based off of enumerate that checks for messages and reports progress periodically"""
-        # iterate over lines in file
+        timer = ProgressTimer(self.report_interval)
+        # the number of lines until the timer is checked
+        countdown = 1
+        # iterate over lines in file (or the given iterator over its lines)
         try:
-            for index, line in enumerate(file):
-                # check 
-                if index % self.report_rate == 0:
-                    # check messages
-                    self.check_msg_queue()
-                    # flush read-ahead buffer to allow use of tell()
-                    file.flush()
-                    # get position in file and add to progress dict
-                    self.progress['progress'] = file.tell()
-                    try:
-                        self.progress_queue.put_nowait(self.progress)
-                    except (queue.Full, AttributeError):
-                        pass
+            for index, line in enumerate(file if lines is None else lines, start):
+                # check the time every so many lines
+                countdown -= 1
+                if not countdown:
+                    due, countdown = timer.check()
+                    if due:
+                        # check messages
+                        self.check_msg_queue()
+                        # get position in file and add to progress dict
+                        self.refresh_file_prog(file)
+                        try:
+                            self.progress_queue.put_nowait(self.progress)
+                        except (queue.Full, AttributeError):
+                            pass
                 # yield index and line
                 yield index, line
         except UnicodeDecodeError as e:
@@ -150,10 +197,19 @@ class Read(UCPropMixin, object):
             
             
     def refresh_file_prog(self, file):
-        # flush read-ahead buffer to allow use of tell()
-        file.flush()
-        # get position in file and add to progress dict
-        self.progress['progress'] = file.tell()
+        """Sets the progress to the number of bytes of the file read so far"""
+        # compressed files report how much of the compressed file has been read,
+        # because the size is the compressed size
+        if hasattr(file, 'compressed_tell'):
+            self.progress['progress'] = file.compressed_tell()
+        # tell() on a text file has to rebuild the decoder's state, the binary
+        # buffer under it just knows where it is (a little ahead of the text)
+        elif hasattr(file, 'buffer'):
+            self.progress['progress'] = file.buffer.tell()
+        else:
+            # flush read-ahead buffer to allow use of tell()
+            file.flush()
+            self.progress['progress'] = file.tell()
 
     def prog_nowait(self):
         """Report progress and check for messages without waiting"""
@@ -2,6 +2,7 @@
 import sys, traceback
 import cdc
 from .text import ReadTXT, ReadDelimTXT
+from ..utils import recordfilter, ucprop
 
 class ReadRPDR(ReadDelimTXT):
     """RPDR Reader"""
@@ -12,6 +13,8 @@ class ReadRPDR(ReadDelimTXT):
     DESCRIPTION = 'Files from the Research Partners Data Registry, a centralized data registry that  gathers data from hospital systems and stores it in one place. These files are plain text files with a ".txt" extension.'
     # get the possible text fields from the config file
     TEXT_FIELDS = [field.lower().strip() for field in cdc.CONFIG.get('read.rpdr', 'Text_Fields', fallback='Report_Text, Comments, Organism_Text').split(',')]
+    # get the possible ID fields (saved in record indexes) from the config file
+    ID_FIELDS = [field.lower().strip() for field in cdc.CONFIG.get('read.rpdr', 'Id_Fields', fallback='Report_Number, Accession, Accession_Number, Record_Id, Encounter_Number, Microbiology_Number').split(',')]
 
     # Add UC_PROPS to ones from ReadTXT
     UC_PROPS = [
@@ -24,52 +27,48 @@ class ReadRPDR(ReadDelimTXT):
          'gui_help': 'Preserve the metadata headers of each RPDR record in output',
          'var': 'preserve_header',
          'position': 0,
-         'required': False}
-    ] + ReadTXT.UC_PROPS
+         'required': False},
+        # the delimiter is fixed, but the fast engine and indexes can be used
+        ucprop.get_ucprop(ReadDelimTXT.UC_PROPS, '--fast'),
+        ucprop.get_ucprop(ReadDelimTXT.UC_PROPS, '--index')
+    ] + recordfilter.UC_PROPS + ReadTXT.UC_PROPS
 
     # sort UC_PROPS
     UC_PROPS = sorted(UC_PROPS, key=lambda k: k['position'])
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # instantiate text field variable
+        # instantiate text and ID field variables
         self.text_field = None
+        self.id_field = None
         # the fields variable stores the metadata field titles in the file
         self.fields = []
         # the user doesn't have an option for the delimiter, RPDR is always this
         self.options['sep_delim'] = '[report_end]'
         # this bool is to make sure the file is valid
         valid = False
-        # open the file to validate file and get fields
+        # read the first two lines with text to validate the file and get the fields,
+        # and where the records start after the header so read_data() doesn't read it again
         try:
-            with open(self.info['metadata']['filepath'], 'r', encoding=self.options['r_encoding']) as file:
-                # read line-by-line, the first two lines with text is all we need
-                for line in file:
-                    # skip any blank lines
-                    if line.strip() == '':
-                        continue
+            lines = self.read_first_lines(2)
+            # here, valid tells us if we already checked the first line
+            for line, start in lines:
+                if not valid:
+                    # store first line, in case the records can't start after it
+                    self.first_line = line
+                    self.data_start = start
+                    # if not, read in the metadata fields
+                    self.fields = [field.lower().strip() for field in line.split('|')]
+                    # if not a pipe-delimited list, break with valid = False
+                    if len(self.fields) <= 1:
+                        break
+                    # otherwise, it looks good so far, continue to next line
                     else:
-                        # here, valid tells us if we already checked the first line
-                        if not valid:
-                            # store first line, we need to remove it from first doc
-                            self.first_line = line
-                            # if not, read in the metadata fields
-                            self.fields = [field.lower().strip() for field in line.split('|')]
-                            # if not a pipe-delimited list, break with valid = False
-                            if len(self.fields) <= 1:
-                                break
-                            # otherwise, it looks good so far, continue to next line
-                            else:
-                                valid = True
-                        # if first line is checked and all set, check next line
-                        else:
-                            # if not pipe-delimited list set valid to False
-                            if len(line.split('|')) <= 1:
-                                valid = False
-                                break
-                            # if it is, break with valid set to True
-                            else:
-                                break
+                        valid = True
+                # if first line is checked and all set, check next line
+                # if not pipe-delimited list set valid to False
+                elif len(line.split('|')) <= 1:
+                    valid = False
         except (UnicodeDecodeError, UnicodeError) as e:
             # There was a decoding error
             self.put_error(self.info['metadata']['filename'], 'Unable to decode file with given encoding: ' + (str(e)))
@@ -96,7 +95,14 @@ class ReadRPDR(ReadDelimTXT):
                     break
             # if it can't find it, put a warning
             if self.text_field is None:
-                self.put_warning(self.info['metadata']['filename'], 'Could not determine file\'s text field.')
+                self.put_warning(self.info['metadata']['filename'], 'no_text_field')
+            # find the ID field the same way, the records just don't have IDs without it
+            for field in self.ID_FIELDS:
+                if field in self.fields:
+                    self.id_field = field
+                    break
+            # only convert the records the user wants, if they filtered them
+            self.create_record_filter()
 
     def read_data(self):
         """Generator to yield lines from each document in file"""
@@ -104,17 +110,24 @@ class ReadRPDR(ReadDelimTXT):
         #self.put_error("Test", "Test Error")
         
         
-        # get the super generator
+        # get the super generator, it starts after the header if the reader found where it ends
         super_generator = super().read_data()
-        # read in first doc first to get rid of the header
-        first_doc = next(super_generator)
-        # remove the header line
-        first_doc['data'].remove(self.first_line)
-        # use the helper method to process it
-        self.read_helper(first_doc)
-        # if it's not empty, yield it
-        if self.info['data']:
-            yield self.info
+        # otherwise the header is in the first document, only the first chunk of a
+        # split file has it, and it was already skipped if resuming from a checkpoint
+        if self.get_start() is None and (self.chunk is None or self.chunk['start'] == 0):
+            # read in first doc first to get rid of the header
+            # (if the records are filtered, there may not be one)
+            first_doc = next(super_generator, None)
+            if first_doc is None:
+                return
+            # remove the header line, unless the first record was filtered out with it
+            if self.first_line in first_doc['data']:
+                first_doc['data'].remove(self.first_line)
+            # use the helper method to process it
+            self.read_helper(first_doc)
+            # if it's not empty, yield it
+            if self.info['data']:
+                yield self.info
         # now go through the rest of the records
         for lines in super_generator:
             # continue if there's nothing to process
@@ -128,39 +141,65 @@ class ReadRPDR(ReadDelimTXT):
 
     def read_helper(self, lines):
         """Helper that processes the lines"""
-        # keep track if we're on the first line
-        first_line = True
-        # iterate through lines
-        for line in lines['data']:
-            # if we're on the first line, store metadata
-            if first_line:
-                # just continue if the first line is blank
-                if line.strip() == '':
-                    continue
-                # zip together the fields and the values in record header
-                # add it to the dict
-                self.info['metadata'].update(dict(zip(self.fields, line.split('|'))))
-                # if the text field is in the header
-                if self.text_field in self.info['metadata']:
-                    # add the record header to the lines if the user wants it
-                    if self.options['preserve_header']:
-                        self.info['data'] = [line]
-                        # delete text from the metadata so it's not stored twice
-                        del self.info['metadata'][self.text_field]
-                    # if the user doesn't want to keep the header, just add
-                    # the text to the dictionary and remove it from the metadata
-                    else:
-                        self.info['data'] = [self.info['metadata'].pop(self.text_field)]
-                # if the text field isn't there
-                else:
-                    # add the header if the user wants it
-                    if self.options['preserve_header']:
-                        self.info['data'] = [line]
-                    # if there's a text field, warn user we couldn't find it
-                    if self.text_field is not None:
-                        self.put_warning(self.info['metadata']['filename'], 'Medical record has no content', self.info['line'])
-                # set the first line bool to false
-                first_line = False
-            # if it's not the first line, just add the line to the dict
+        data = lines['data']
+        # the record header is the first line that isn't blank
+        for index, line in enumerate(data):
+            if line.strip() != '':
+                break
+        # if every line is blank, there's nothing to process
+        else:
+            return
+        # zip together the fields and the values in record header
+        # add it to the dict
+        self.info['metadata'].update(dict(zip(self.fields, line.split('|'))))
+        # if the text field is in the header
+        if self.text_field in self.info['metadata']:
+            # add the record header to the lines if the user wants it
+            if self.options['preserve_header']:
+                self.info['data'] = [line]
+                # delete text from the metadata so it's not stored twice
+                del self.info['metadata'][self.text_field]
+            # if the user doesn't want to keep the header, just add
+            # the text to the dictionary and remove it from the metadata
             else:
-                self.info['data'].append(line)
+                self.info['data'] = [self.info['metadata'].pop(self.text_field)]
+        # if the text field isn't there
+        else:
+            # add the header if the user wants it
+            if self.options['preserve_header']:
+                self.info['data'] = [line]
+            # if there's a text field, warn user we couldn't find it
+            if self.text_field is not None:
+                self.put_warning(self.info['metadata']['filename'], 'no_content', self.info['line'])
+        # add the rest of the lines all at once
+        self.info['data'].extend(data[index + 1:])
+
+    def filter_line(self, line):
+        """Checks if the record should be converted once its record header is read"""
+        # the file's header is before the first record's header
+        if line.strip() == '' or line == self.first_line:
+            return None
+        return self.record_filter.keep(dict(zip(self.fields, line.split('|'))))
+
+    def get_record_id(self, data, start, end):
+        """Returns the ID from the header of the record in data[start:end] for the index"""
+        if self.id_field is None:
+            return ''
+        position = start
+        while position < end:
+            # carriage returns are line breaks too
+            breaks = [found for found in (data.find(b'\n', position, end), data.find(b'\r', position, end)) if found != -1]
+            line_end = min(breaks) + 1 if breaks else end
+            try:
+                line = data[position:line_end].decode(self.options['r_encoding'])
+            except UnicodeDecodeError:
+                return ''
+            position = line_end
+            # the record header is the first line that isn't blank or the file's header
+            if line.strip() == '' or line.strip() == self.first_line.strip():
+                continue
+            values = line.split('|')
+            if len(values) > self.fields.index(self.id_field):
+                return values[self.fields.index(self.id_field)].strip()
+            return ''
+        return ''
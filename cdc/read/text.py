@@ -1,20 +1,119 @@
 """Contains class for reading in plain text files"""
+import io
+import mmap
 import os
 import queue
+import random
 import time
 from encodings.aliases import aliases
 
 import cdc
 from .read import Read
+from ..utils import compression, recordfilter
+from ..utils.encoding import is_ascii_compatible, is_byte_searchable
+from ..utils.index import RecordIndex
+from ..utils.timing import ProgressTimer
+
+# size of the blocks the fast engine searches for delimiters at a time
+MAPPED_BLOCK_SIZE = 4 * 1024 * 1024
+
+def split_lines(text):
+    """Returns a list of the lines in text with their newlines, the same as reading them
+    from a file in text mode (carriage returns are line breaks, but nothing else is)"""
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    lines = text.split('\n')
+    last = lines.pop()
+    lines = [line + '\n' for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+class FileRange(io.RawIOBase):
+    """Raw stream over a byte range of a file, positions are relative to the start"""
+
+    def __init__(self, path, start, end):
+        super().__init__()
+        self.file = open(path, 'rb')
+        self.start = start
+        self.end = end
+        self.file.seek(start)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        """Reads into the buffer without going past the end of the range"""
+        remaining = self.end - self.file.tell()
+        if remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:remaining]
+        return self.file.readinto(view)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = self.start + offset
+        elif whence == io.SEEK_CUR:
+            position = self.file.tell() + offset
+        else:
+            position = self.end + offset
+        # keep the position inside the range
+        self.file.seek(min(max(position, self.start), self.end))
+        return self.tell()
+
+    def tell(self):
+        return self.file.tell() - self.start
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+class RecordSample:
+    """Picks count of the records added to it at random, each as likely as any other
+    (reservoir sampling), for find_records() to add the records to like a RecordIndex"""
+
+    def __init__(self, count, size):
+        self.count = count
+        self.size = size
+        # the start offsets of the picked records, and where the ones that aren't last end
+        self.starts = []
+        self.ends = {}
+        self.added = 0
+        self.last = None
+
+    def add(self, offset, record_id=''):
+        """Adds a record that starts at offset, the record before it ends there"""
+        if self.last in self.ends:
+            self.ends[self.last] = offset
+        self.added += 1
+        if len(self.starts) < self.count:
+            self.starts.append(offset)
+        else:
+            # the record replaces one of the picked ones with a chance of count in added
+            number = random.randrange(self.added)
+            if number >= self.count:
+                self.last = None
+                return
+            del self.ends[self.starts[number]]
+            self.starts[number] = offset
+        self.ends[offset] = self.size
+        self.last = offset
+
+    def ranges(self):
+        """Returns the (start, end) byte ranges of the picked records in the order they're in the file"""
+        return sorted(self.ends.items())
 
 class ReadTXT(Read):
     """.txt Reader"""
 
     # required class variables for extensions, interface labels, and description
-    EXTENSIONS = ['txt']
+    # compressed text files are decompressed as they're read
+    EXTENSIONS = ['txt'] + ['txt.{}'.format(extension) for extension in compression.EXTENSIONS]
     GUI_LABELS = ['Plain Text']
     CLI_LABELS = ['txt']
-    DESCRIPTION = 'All files with the ".txt" extension.'
+    DESCRIPTION = 'All files with the ".txt" extension (or ".txt.gz", ".txt.bz2" or ".txt.xz" if they are compressed).'
 
     # UC_PROPS class variable with the base class UC_PROPS added
     UC_PROPS = Read.UC_PROPS + [
@@ -69,7 +168,16 @@ class ReadTXT(Read):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        
+        # decides which records to convert if the user filters them, see create_record_filter()
+        self.record_filter = None
+        # the number of records that were filtered out
+        self.filtered = 0
+        # where the data after the file's header starts (offset and line number), for readers
+        # whose files have one, so it's skipped without reading it again (see read_first_lines())
+        self.data_start = None
+        # the input file opened for reading bytes by read_first_lines(), kept open for read_data()
+        self.input_file = None
+
         # Ensure that the input is a file
         if not os.path.isfile(self.info['metadata']['location']):
             self.put_error(self.info['metadata']['location'], "Not a valid file path.")
@@ -82,11 +190,19 @@ class ReadTXT(Read):
                 'size': os.path.getsize(self.info['metadata']['location']),
                 'conversion_id': os.path.abspath(self.info['metadata']['location'])
         })
+        # if reading a chunk, the size is the chunk's and the ID and label say which part
+        if self.chunk is not None:
+            self.info['metadata'].update({
+                'size': self.chunk['end'] - self.chunk['start'],
+                'conversion_id': '{} (part {} of {})'.format(self.info['metadata']['conversion_id'], self.chunk['index'] + 1, self.chunk['count'])
+            })
         self.progress.update({
             'filename': self.info['metadata']['filename'],
             'size': self.info['metadata']['size'],
-            'conversion_id': os.path.abspath(self.info['metadata']['location'])
+            'conversion_id': self.info['metadata']['conversion_id']
         })
+        if self.chunk is not None:
+            self.progress['filename'] = '{} (part {} of {})'.format(self.info['metadata']['filename'], self.chunk['index'] + 1, self.chunk['count'])
         
         # check that the file is not empty
         if not self.progress['size'] > 0:
@@ -96,28 +212,215 @@ class ReadTXT(Read):
             # if there's no error, report the progress
             self.prog_wait()
 
+    def create_record_filter(self):
+        """Sets record_filter from the user's include and exclude options, for readers
+        whose records have metadata fields (in self.fields)"""
+        try:
+            self.record_filter = recordfilter.get_filter(self.options)
+        except ValueError as e:
+            self.put_error(self.info['metadata']['filename'], 'Invalid record filter: {}'.format(e))
+        if self.record_filter is None:
+            return
+        for field in sorted(self.record_filter.get_fields()):
+            if field not in self.fields:
+                self.put_warning(self.info['metadata']['filename'], 'filter_field_missing', None, field)
+
+    def find_line_end(self, data, position):
+        """Returns where the line that position is on ends in data, after its line break"""
+        # look a bit further each time so files without one kind of line break aren't searched to the end
+        size = 4096
+        while True:
+            stop = min(position + size, len(data))
+            newline = data.find(b'\n', position, stop)
+            carriage_return = data.find(b'\r', position, stop)
+            if newline != -1 or carriage_return != -1 or stop == len(data):
+                break
+            size *= 2
+        # a carriage return ends the line unless it's followed by a newline
+        if carriage_return != -1 and (newline == -1 or carriage_return < newline):
+            if carriage_return + 1 != newline:
+                return carriage_return + 1
+        if newline != -1:
+            return newline + 1
+        return len(data)
+
+    def sample_records(self, count):
+        """Returns the (start, end) byte ranges of count records picked at random (or all of
+        them if there aren't that many), in the order they're in the file, or None if the file
+        can't be mapped. The reader finds the record an offset is in with find_record(data,
+        offset), which returns its (start, end, is_record), and adds every record to an
+        index-like object with find_records(data, index)."""
+        size = self.info['metadata']['size']
+        ranges = {}
+        try:
+            with open(self.info['metadata']['filepath'], 'rb') as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    # take the records random offsets land in until it has searched as much
+                    # as reading the whole file would, since a few long records can take most
+                    # of the offsets (and make the records that are picked longer than most)
+                    searched = 0
+                    while len(ranges) < count and searched < size:
+                        start, end, is_record = self.find_record(data, random.randrange(size))
+                        # an offset at the end of the file can find nothing after it
+                        searched += max(end - start, 1)
+                        if is_record:
+                            ranges[start] = end
+                    if len(ranges) < count:
+                        # go through every record once and keep a random sample of them
+                        sample = RecordSample(count, size)
+                        self.find_records(data, sample)
+                        return sample.ranges()
+        # the records can't be found if the file can't be mapped
+        except (OSError, ValueError, OverflowError):
+            return None
+        return sorted(ranges.items())
+
+    def read_text(self, text, limit):
+        """Generator that yields the lines of a record's text in lists of about limit
+        characters (or all of them at once if limit is 0), so a huge note is never split
+        into lines all at once. A line break is added after the text to end the record."""
+        position = 0
+        while True:
+            # the part ends at the end of a line
+            end = len(text)
+            if limit > 0 and position + limit < len(text):
+                found = text.find('\n', position + limit)
+                if found != -1:
+                    end = found + 1
+            lines = split_lines(text[position:end])
+            position = end
+            if position < len(text):
+                yield lines
+                continue
+            if lines and not lines[-1].endswith('\n'):
+                lines[-1] += '\n'
+            else:
+                lines.append('\n')
+            yield lines
+            return
+
+    def read_first_lines(self, count):
+        """Returns a list of the first count lines of the file that aren't blank, each with a
+        dict of the offset and line number where the data after it starts, so reading can
+        start right after a header instead of opening the file again and skipping it. The
+        dict is None if the offset can't be found from the bytes in the file's encoding."""
+        lines = []
+        encoding = self.options['r_encoding']
+        # lines can only be split in the raw bytes if newlines can't be part of another character
+        if not is_byte_searchable(encoding):
+            with compression.open_text(self.info['metadata']['filepath'], encoding) as file:
+                for line in file:
+                    if line.strip() != '':
+                        lines.append((line, None))
+                        if len(lines) == count:
+                            break
+            return lines
+        compressed = compression.get_compression(self.info['metadata']['filepath']) is not None
+        file = compression.open_binary(self.info['metadata']['filepath'])
+        try:
+            data = b''
+            # where data starts in the file and where the next line starts in data
+            offset = 0
+            position = 0
+            number = 0
+            end_of_file = False
+            while len(lines) < count:
+                line_end = self.find_line_end(data, position)
+                # the line may go on (or a carriage return may have its newline) in the next block
+                if line_end == len(data) and not end_of_file:
+                    # read more each time so a long line isn't searched over and over
+                    block = file.read(max(io.DEFAULT_BUFFER_SIZE, len(data)))
+                    if not block:
+                        end_of_file = True
+                    # drop the lines that were already read
+                    offset += position
+                    data = data[position:] + block
+                    position = 0
+                    continue
+                if position == len(data):
+                    break
+                # decode the line the same way as reading it in text mode
+                line = data[position:line_end].decode(encoding).replace('\r\n', '\n').replace('\r', '\n')
+                position = line_end
+                number += 1
+                if line.strip() != '':
+                    lines.append((line, {'offset': offset + position, 'line': number + 1}))
+        except:
+            file.close()
+            raise
+        # keep an uncompressed file open so read_data() can start after the lines without opening
+        # it again (a chunk is read from its own range of the file, and a merge doesn't read it)
+        if compressed or self.chunk is not None or self.options.get('merge') is not None:
+            file.close()
+        else:
+            self.input_file = file
+        return lines
+
+    def open_input(self):
+        """Opens the (uncompressed) input file for reading bytes, or returns the one
+        read_first_lines() kept open at the start of the file"""
+        file, self.input_file = self.input_file, None
+        if file is None:
+            return open(self.info['metadata']['filepath'], 'rb')
+        file.seek(0)
+        return file
+
+    def close_input(self):
+        """Closes the input file read_first_lines() kept open, if it wasn't used"""
+        if self.input_file is not None:
+            self.input_file.close()
+            self.input_file = None
+
+    def put_error(self, filename, message, stack_info=None):
+        # the file won't be read after an error
+        self.close_input()
+        super().put_error(filename, message, stack_info)
+
+    def open_file(self, newline=None):
+        """Opens the input file for reading (only the chunk if there is one), newline
+        is the same as for open()"""
+        if self.chunk is None:
+            if compression.get_compression(self.info['metadata']['filepath']) is None:
+                return io.TextIOWrapper(self.open_input(), encoding=self.options['r_encoding'], newline=newline)
+            return compression.open_text(self.info['metadata']['filepath'], self.options['r_encoding'], newline=newline)
+        # wrap the byte range so reading stops at the end of the chunk
+        raw = FileRange(self.info['metadata']['filepath'], self.chunk['start'], self.chunk['end'])
+        return io.TextIOWrapper(io.BufferedReader(raw), encoding=self.options['r_encoding'], newline=newline)
+
     def read_data(self):
         """Generator to yield lines in file"""
         # open the file using with statement to avoid having to close file
-        with open(self.info['metadata']['filepath'],
-                  'r',
-                  encoding=self.options['r_encoding']) as file:
+        with self.open_file() as file:
             # set state to Reading
             self.progress['state'] = 'Reading'
             # put the progress dict without waiting
             self.prog_nowait()
+            # if the writer takes the document in parts, yield a part whenever
+            # it has this many characters so the whole file isn't held in memory
+            limit = 0
+            if self.streaming:
+                limit = cdc.CONFIG.getint('read.txt', 'stream_part_size', fallback=16777216)
+            size = 0
+            self.info['continues'] = False
             # iterate through lines in file
             for index, line in self.file_gen(file):
                 # add the line to the info dictionary
                 self.info['data'].append(line)
+                size += len(line)
+                if limit > 0 and size >= limit:
+                    # more of the document follows in the next part
+                    self.info['continues'] = True
+                    yield self.info
+                    self.info['data'] = []
+                    size = 0
+            self.info['continues'] = False
             # set the state to writing
             self.progress['state'] = 'Writing'
-            # flush the read-ahead buffer, get position, report progress
-            file.flush()
-            self.progress['progress'] = file.tell()
+            # get position, report progress
+            self.refresh_file_prog(file)
             # let it block if it needs to, this message must go through
             self.prog_wait()
-            # yield the info dictionary
+            # yield the info dictionary (or the last part of it)
             # although this seems weird as a generator that only yields once,
             # it's necessary so that the writers work with all readers
             yield self.info
@@ -142,20 +445,480 @@ class ReadDelimTXT(ReadTXT):
          'help': 'The separator between each document in your input file',
          'var': 'sep_delim',
          'required': True,
-         'position': 3}
+         'position': 3},
+        {'flag': '--fast',
+         'name': '--fast-reading',
+         'label': 'Fast Reading',
+         'action': 'store_true',
+         'default': False,
+         'help': ('Find the documents in a memory-mapped copy of the input file and decode each '
+                  'one at once instead of line by line. The output is the same, but it is faster. '
+                  'Only works for UTF-8 and single-byte encodings (like latin-1), other encodings '
+                  'are read line by line.'),
+         'var': 'fast_engine',
+         'position': 5,
+         'required': False},
+        {'flag': '--index',
+         'name': '--record-index',
+         'label': 'Index Records',
+         'action': 'store_true',
+         'default': False,
+         'help': ('Save where each record starts in an index next to the input file, so the number of records '
+                  'is known before converting and progress is shown in records. Later conversions of the same '
+                  'file reuse the index, and large files are split at records without reading them first. '
+                  'Only works for UTF-8 and single-byte encodings (like latin-1).'),
+         'var': 'record_index',
+         'position': 6,
+         'required': False}
     ]
 
     # sort UC_PROPS on position key
     UC_PROPS = sorted(UC_PROPS, key=lambda k: k['position'])
 
+    # documents end at a delimiter line, so files can be split between them
+    # and reading can start again after any of them
+    SPLITTABLE = True
+    RESUMABLE = True
+
+    def split(self, chunk_size):
+        """Returns (start, end) byte ranges of about chunk_size bytes that each end
+        after a delimiter line, or None if the file can't be split"""
+        # the chunks are read by other readers
+        self.close_input()
+        # the delimiter can only be found in the raw bytes if the encoding is ASCII-compatible,
+        # and a compressed file can't be read from the middle
+        if not is_ascii_compatible(self.options['r_encoding']) or self.is_compressed():
+            return None
+        delimiter = self.options['sep_delim'].encode(self.options['r_encoding'])
+        size = self.info['metadata']['size']
+        ranges = []
+        start = 0
+        # if the records are indexed, the chunks can end where the next record starts
+        index = self.get_index()
+        if index is not None:
+            while start < size:
+                end = None
+                if start + chunk_size < size:
+                    end = index.find(start + chunk_size)
+                # the last chunk just goes to the end of the file
+                if end is None:
+                    ranges.append((start, size))
+                    break
+                ranges.append((start, end))
+                start = end
+            return ranges
+        with open(self.info['metadata']['filepath'], 'rb') as file:
+            while start < size:
+                # the last chunk just goes to the end of the file
+                if start + chunk_size >= size:
+                    ranges.append((start, size))
+                    break
+                # jump ahead and skip the rest of the line we land in
+                file.seek(start + chunk_size)
+                file.readline()
+                # the chunk ends after the next delimiter line (or the end of the file)
+                for line in file:
+                    if delimiter in line:
+                        break
+                end = file.tell()
+                ranges.append((start, end))
+                start = end
+        return ranges
+
+    def get_position(self):
+        """Returns the offset and line number where the next document starts,
+        only valid while the generator is paused after yielding a document"""
+        # the fast engine keeps track of the offset itself
+        if self.file is None:
+            return self.position, self.next_line
+        # lines are read with readline() when resuming so tell() is exact
+        return self.file.tell(), self.next_line
+
+    def get_start(self):
+        """Returns a dict of the offset, line number and number of records before where
+        reading starts: the checkpoint if resuming, after the file's header if the reader
+        found where it ends, or None to start at the start of the file or chunk"""
+        if self.resume is not None:
+            return self.resume
+        # only the first chunk of a split file has the header
+        if self.data_start is not None and (self.chunk is None or self.chunk['start'] == 0):
+            return dict(self.data_start, records=0)
+        return None
+
+    def get_index(self):
+        """Returns the RecordIndex of the file if the user wants one, loading it or
+        finding the records and saving it if it's out of date, or None"""
+        if not self.options.get('record_index') or not self.is_searchable():
+            return None
+        index = RecordIndex(self.info['metadata']['filepath'], self.get_index_key())
+        if index.load():
+            return index
+        state = self.progress['state']
+        self.progress['state'] = 'Indexing'
+        self.prog_nowait()
+        try:
+            with open(self.info['metadata']['filepath'], 'rb') as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    self.find_records(data, index)
+        # the records can't be indexed if the file can't be mapped
+        except (OSError, ValueError, OverflowError):
+            return None
+        finally:
+            self.progress['state'] = state
+        index.save()
+        return index
+
+    def get_index_key(self):
+        """Returns a dict of what decides where the records are, to check the index against"""
+        return {
+            'reader': type(self).__name__,
+            'delimiter': self.options['sep_delim'],
+            'encoding': self.options['r_encoding']
+        }
+
+    def find_records(self, data, index):
+        """Adds where each document starts in the memory-mapped file to the index, the
+        same documents the generators yield (a delimiter line ends each one)"""
+        delimiter = self.options['sep_delim'].encode(self.options['r_encoding'])
+        position = 0
+        timer = ProgressTimer(self.report_interval)
+        countdown = 1
+        while True:
+            found = data.find(delimiter, position)
+            if found == -1:
+                break
+            # the line the delimiter is on, carriage returns are line breaks too
+            line_start = max(data.rfind(b'\n', position, found), data.rfind(b'\r', position, found)) + 1 or position
+            line_end = self.find_line_end(data, found)
+            # there's a record if there are any lines before the delimiter line
+            if line_start > position:
+                index.add(position, self.get_record_id(data, position, line_start))
+                # check for messages every so often
+                countdown -= 1
+                if not countdown:
+                    due, countdown = timer.check()
+                    if due:
+                        self.check_msg_queue()
+            position = line_end
+        # whatever is after the last delimiter is the last document
+        if position < len(data):
+            index.add(position, self.get_record_id(data, position, len(data)))
+
+    def get_record_id(self, data, start, end):
+        """Returns the ID of the record in data[start:end] for the index, documents don't have one"""
+        return ''
+
+    def sample_ranges(self, count):
+        """Returns the (start, end) byte ranges of up to count documents picked at random,
+        in the order they're in the file, or None if they can't be found by searching it"""
+        if not self.is_searchable():
+            return None
+        size = self.info['metadata']['size']
+        # if the records are indexed, any of them can be picked directly
+        index = self.get_index()
+        if index is not None:
+            picked = sorted(random.sample(range(len(index)), min(count, len(index))))
+            return [(index.offsets[number], index.offsets[number + 1] if number + 1 < len(index) else size) for number in picked]
+        return self.sample_records(count)
+
+    def find_record(self, data, offset):
+        """Returns the (start, end, is_record) of the document that offset is in, or the
+        delimiter line it's on, in the memory-mapped file"""
+        delimiter = self.options['sep_delim'].encode(self.options['r_encoding'])
+        # the document starts after the delimiter line before the offset
+        found = data.rfind(delimiter, 0, offset)
+        start = 0 if found == -1 else self.find_line_end(data, found)
+        # and ends after the next delimiter line
+        found = data.find(delimiter, start)
+        end = len(data) if found == -1 else self.find_line_end(data, found)
+        # the delimiter line isn't a document on its own
+        is_record = start < end and (found == -1 or max(data.rfind(b'\n', start, found), data.rfind(b'\r', start, found)) != -1)
+        return start, end, is_record
+
+    def is_compressed(self):
+        """Checks if the input file is compressed"""
+        return compression.get_compression(self.info['metadata']['filepath']) is not None
+
+    def is_searchable(self):
+        """Checks if the documents can be found by searching the file's bytes"""
+        delimiter = self.options['sep_delim']
+        if not is_byte_searchable(self.options['r_encoding']) or self.is_compressed():
+            return False
+        # the delimiter has to fit on a line and be encodable to be found
+        if not delimiter or '\n' in delimiter or '\r' in delimiter:
+            return False
+        try:
+            delimiter.encode(self.options['r_encoding'])
+        except UnicodeEncodeError:
+            return False
+        return True
+
+    def use_fast_engine(self):
+        """Checks if the user chose the fast engine and it can be used"""
+        return bool(self.options.get('fast_engine')) and self.is_searchable()
+
+    def read_mapped(self, data):
+        """Generator like read_data() that finds the delimiter lines by searching
+        the bytes of the memory-mapped file and decodes each document in one piece"""
+        delimiter = self.options['sep_delim'].encode(self.options['r_encoding'])
+        # only search the chunk if the file was split
+        start, end = 0, len(data)
+        if self.chunk is not None:
+            start, end = self.chunk['start'], self.chunk['end']
+        # count the number of records for the logs
+        count = 0
+        # the number of the first line of the next document
+        line = 1
+        # where the next block starts
+        position = start
+        start_at = self.get_start()
+        if start_at is not None:
+            position = start_at['offset']
+            count = start_at['records']
+            line = start_at['line']
+        self.position = position
+        # set the start time and set state to Running
+        self.progress['timer'] = time.time()
+        self.progress['state'] = 'Running'
+        # put the progress without waiting
+        self.prog_nowait()
+        # keep track of line numbers for warning reporting
+        self.info['line'] = line
+        # report progress every so often, checking the time every so many documents
+        timer = ProgressTimer(self.report_interval)
+        countdown = 1
+        # the start of a document that goes on past the end of a block
+        pending = []
+        try:
+            while position < end:
+                # blocks end after a newline, so lines are never split between them
+                block_end = data.find(b'\n', min(position + MAPPED_BLOCK_SIZE, end) - 1, end)
+                block_end = end if block_end == -1 else block_end + 1
+                block = data[position:block_end]
+                # carriage returns are line breaks too when reading in text mode
+                has_cr = b'\r' in block
+                # where the next document starts in the block
+                index = 0
+                while True:
+                    # find the next delimiter and the line it's on
+                    found = block.find(delimiter, index)
+                    if found == -1:
+                        break
+                    line_start = block.rfind(b'\n', index, found) + 1 or index
+                    line_end = block.find(b'\n', found) + 1 or len(block)
+                    if has_cr:
+                        line_start = max(block.rfind(b'\r', line_start, found) + 1, line_start)
+                        carriage_return = block.find(b'\r', found, line_end)
+                        if carriage_return != -1 and carriage_return + 2 != line_end:
+                            line_end = carriage_return + 1
+                    # everything before the delimiter line is the document
+                    document = block[index:line_start]
+                    document_cr = has_cr
+                    if pending:
+                        pending.append(document)
+                        document = b''.join(pending)
+                        document_cr = b'\r' in document
+                        pending = []
+                    # a document that's filtered out is never decoded, only its lines are counted
+                    if document and self.record_filter is not None and not self.filter_document(document):
+                        line += self.count_lines(document)
+                        self.filtered += 1
+                        self.progress['filtered'] = self.filtered
+                    elif document:
+                        lines = self.decode_lines(document, document_cr)
+                        line += len(lines)
+                        # increment the record count
+                        count += 1
+                        self.progress['processed'] = count
+                        # put the lines in the dictionary and yield whole thing
+                        self.info['data'] = lines
+                        self.position = position + line_end
+                        self.next_line = line + 1
+                        yield self.info
+                        # update line number for warning reporting
+                        self.info['line'] = line + 1
+                    # skip the delimiter line
+                    line += 1
+                    index = line_end
+                    # check messages and report progress every so often
+                    countdown -= 1
+                    if not countdown:
+                        due, countdown = timer.check()
+                        if due:
+                            self.check_msg_queue()
+                            self.progress['progress'] = position + index - start
+                            try:
+                                self.progress_queue.put_nowait(self.progress)
+                            except (queue.Full, AttributeError):
+                                pass
+                # the rest of the block is the start of the next document
+                if index < len(block):
+                    pending.append(block[index:])
+                position = block_end
+            # whatever is after the last delimiter is the last document
+            document = b''.join(pending)
+            if document and self.record_filter is not None and not self.filter_document(document):
+                document = b''
+                self.filtered += 1
+                self.progress['filtered'] = self.filtered
+            lines = self.decode_lines(document, b'\r' in document)
+        except UnicodeDecodeError as e:
+            # There was an error decoding the data
+            self.put_error(self.info["metadata"]["location"], str(e) + " (Did you choose the correct encoding?)")
+        # increment the count if there are lines to yield
+        if lines:
+            count += 1
+        # update progress
+        self.progress['state'] = 'Finished'
+        self.progress['processed'] = count
+        self.progress['progress'] = end - start
+        # let this one block if it needs to
+        self.prog_wait()
+        # if there are lines to yield, yield them
+        if lines:
+            self.info['data'] = lines
+            self.position = end
+            self.next_line = line + len(lines)
+            yield self.info
+
+    def read_sample(self):
+        """Generator like read_data() that only reads the documents in the byte ranges of the sample"""
+        # each document is read from its own range of the file
+        self.close_input()
+        self.progress['records'] = len(self.sample)
+        # set the start time and set state to Running
+        self.progress['timer'] = time.time()
+        self.progress['state'] = 'Running'
+        # put the progress without waiting
+        self.prog_nowait()
+        count = 0
+        # the line numbers aren't known without reading the rest of the file
+        self.info['line'] = None
+        for number, (start, end) in enumerate(self.sample):
+            # the first document starts after the file's header
+            if self.data_start is not None:
+                start = max(start, min(self.data_start['offset'], end))
+            raw = FileRange(self.info['metadata']['filepath'], start, end)
+            with io.TextIOWrapper(io.BufferedReader(raw), encoding=self.options['r_encoding']) as file:
+                lines = []
+                try:
+                    for line in file:
+                        # the document ends at the delimiter line
+                        if self.options['sep_delim'] in line:
+                            break
+                        lines.append(line)
+                except UnicodeDecodeError as e:
+                    # There was an error decoding the data
+                    self.put_error(self.info["metadata"]["location"], str(e) + " (Did you choose the correct encoding?)")
+            # the progress is the share of the sample that's been read
+            self.progress['progress'] = self.progress['size'] * (number + 1) // len(self.sample)
+            self.prog_nowait()
+            if self.record_filter is not None and not self.keep_lines(lines):
+                self.filtered += 1
+                self.progress['filtered'] = self.filtered
+            elif lines:
+                count += 1
+                self.progress['processed'] = count
+                self.info['data'] = lines
+                yield self.info
+        self.progress['state'] = 'Finished'
+        self.prog_wait()
+
+    def keep_lines(self, lines):
+        """Checks the lines of a document with filter_line() until one of them decides if it should be converted"""
+        for line in lines:
+            keep = self.filter_line(line)
+            if keep is not None:
+                return keep
+        return True
+
+    def filter_line(self, line):
+        """Checks if the document a line is at the start of should be converted, when the
+        records are filtered. Returns True or False once the line decides it (like the
+        record header), or None if it's up to the next line. Documents don't have
+        metadata, so readers whose records do have to override this."""
+        return True
+
+    def filter_document(self, document):
+        """Checks the lines of the bytes of a document with filter_line() until one of
+        them decides if it should be converted, without decoding the rest of it"""
+        position = 0
+        while position < len(document):
+            line_end = self.find_line_end(document, position)
+            keep = self.filter_line(self.decode_lines(document[position:line_end], True)[0])
+            if keep is not None:
+                return keep
+            position = line_end
+        return True
+
+    def count_lines(self, document):
+        """Returns the number of lines in the bytes of a document, the same as the
+        length of decode_lines() (a carriage return and newline is one line break)"""
+        breaks = document.count(b'\n') + document.count(b'\r') - document.count(b'\r\n')
+        return breaks + (not document.endswith((b'\n', b'\r')))
+
+    def decode_lines(self, document, has_cr):
+        """Decodes the bytes of a document into a list of lines, the same as
+        reading them from a file in text mode"""
+        text = document.decode(self.options['r_encoding'])
+        if has_cr:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        lines = text.splitlines(True)
+        # splitlines() also breaks at characters other than newlines, so only
+        # use it if there aren't any of those
+        if len(lines) == text.count('\n') + (not text.endswith('\n')) or not text:
+            return lines
+        lines = text.split('\n')
+        last = lines.pop()
+        lines = [line + '\n' for line in lines]
+        if last:
+            lines.append(last)
+        return lines
+
     def read_data(self):
         """Generator to yield lines from each document in file"""
+        # only the documents picked for a random sample are read
+        if self.sample is not None:
+            yield from self.read_sample()
+            return
+        # if the records are indexed, the number of them is known before reading
+        record_index = self.get_index()
+        if record_index is not None:
+            if self.chunk is None:
+                self.progress['records'] = len(record_index)
+            else:
+                self.progress['records'] = record_index.count(self.chunk['start'], self.chunk['end'])
+        # the fast engine yields the same documents if it can be used
+        self.file = None
+        if self.use_fast_engine():
+            try:
+                with self.open_input() as file:
+                    data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            # read line by line if the file can't be mapped (too big for a 32-bit Python, etc.)
+            except (OSError, ValueError, OverflowError):
+                data = None
+            if data is not None:
+                with data:
+                    yield from self.read_mapped(data)
+                return
         # open file
-        with open(self.info['metadata']['filepath'],
-                  'r',
-                  encoding=self.options['r_encoding']) as file:
+        with self.open_file() as file:
+            # keep the file so the position can be checked for checkpoints
+            self.file = file
             # count the number of records for the logs
             count = 0
+            # the first line is 1, or where the last checkpoint was if resuming
+            start = 0
+            start_at = self.get_start()
+            if start_at is not None:
+                file.seek(start_at['offset'])
+                count = start_at['records']
+                start = start_at['line'] - 1
+            # tell() is only exact between records when reading with readline()
+            # (iterating reads ahead), so use it if saving checkpoints
+            lines_iter = None
+            if self.options.get('resume'):
+                lines_iter = iter(file.readline, '')
             # set the start time and set state to Running
             self.progress['timer'] = time.time()
             self.progress['state'] = 'Running'
@@ -164,37 +927,60 @@ class ReadDelimTXT(ReadTXT):
             # list to store lines in document
             lines = []
             # keep track of line numbers for warning reporting
-            self.info['line'] = 1
+            self.info['line'] = start + 1
+            # if the records are filtered, whether a document is kept is decided
+            # by its first lines, and the rest of a skipped one isn't kept in memory
+            deciding = self.record_filter is not None
+            skipping = False
             # read file line-by line
-            for index, line in self.file_gen(file):
+            for index, line in self.file_gen(file, start, lines_iter):
                 # check for a delimiter
                 if self.options['sep_delim'] in line:
+                    # start deciding again with the next document
+                    deciding = self.record_filter is not None
+                    if skipping:
+                        skipping = False
+                        self.info['line'] = index + 2
                     # if there are lines to be yielded
-                    if lines:
+                    elif lines:
                         # increment the record count
                         count += 1
+                        self.progress['processed'] = count
                         # put the lines in the dictionary and yield whole thing
                         self.info['data'] = lines
+                        self.next_line = index + 2
                         yield self.info
                         # update line number for warning reporting
                         self.info['line'] = index + 2
                         # clear lines list, but don't delete them from memory
                         lines = []
+                # skip the lines of a document that was filtered out
+                elif skipping:
+                    continue
                 # if the delimiter isn't there, add the line
                 else:
                     lines.append(line)
+                    if deciding:
+                        keep = self.filter_line(line)
+                        if keep is not None:
+                            deciding = False
+                        if keep is False:
+                            skipping = True
+                            lines = []
+                            self.filtered += 1
+                            self.progress['filtered'] = self.filtered
             # increment the count if there are lines to yield
             if lines:
                 count += 1
             # update progress
             self.progress['state'] = 'Finished'
             self.progress['processed'] = count
-            # flush read-ahead buffer, get position in file, report progress
-            file.flush()
-            self.progress['progress'] = file.tell()
+            # get position in file, report progress
+            self.refresh_file_prog(file)
             # let this one block if it needs to
             self.prog_wait()
             # if there are lines to yield, yield them
             if lines:
                 self.info['data'] = lines
+                self.next_line = index + 2
                 yield self.info
@@ -1,3 +1,3 @@
-from . import ucprop
+from . import checkpoint, compression, encoding, manifest, stream, timing, ucprop
 
-__all__ = ["ucprop"]
\ No newline at end of file
+__all__ = ["checkpoint", "compression", "encoding", "manifest", "stream", "timing", "ucprop"]
@@ -0,0 +1,78 @@
+"""
+Checkpoints for resuming the conversion of a large file.
+"""
+import hashlib
+import json
+import os
+
+# folder in the output folder that the checkpoints are saved in
+FOLDER = '.cdc-checkpoints'
+
+def get_path(output_dir, input_path):
+    """Returns the path of the checkpoint for an input file in the output folder"""
+    name = hashlib.sha1(os.path.abspath(input_path).encode('utf8')).hexdigest()
+    return os.path.join(output_dir, FOLDER, '{}.json'.format(name))
+
+class Checkpoint:
+    """
+    The last record boundary saved while converting an input file: the offset
+    in the input file, the line and number of records read up to there, and
+    the output file and its length at that point. It's only valid for the same
+    input file (same size and modified time) converted with the same options.
+    """
+
+    def __init__(self, output_dir, description):
+        # description is a dict from manifest.describe_input()
+        self.description = description
+        self.path = get_path(output_dir, description['path'])
+
+    def exists(self):
+        """Checks if a checkpoint was saved"""
+        return os.path.isfile(self.path)
+
+    def load(self):
+        """Returns the saved state if it can be resumed from, otherwise None"""
+        try:
+            with open(self.path, 'r', encoding='utf8') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return None
+        # the input file and options have to be the same
+        if state.get('input') != self.description:
+            return None
+        # the output has to still have everything written up to the checkpoint
+        try:
+            if os.path.getsize(state['output_path']) < state['output_offset']:
+                return None
+        except (OSError, KeyError, TypeError):
+            return None
+        return state
+
+    def save(self, offset, line, records, output_path, output_offset):
+        """Saves a checkpoint, replacing the last one"""
+        state = {
+            'input': self.description,
+            'offset': offset,
+            'line': line,
+            'records': records,
+            'output_path': output_path,
+            'output_offset': output_offset
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # write to a temporary file first so a crash never leaves half a checkpoint
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf8') as file:
+            json.dump(state, file)
+        os.replace(temp_path, self.path)
+
+    def remove(self):
+        """Deletes the checkpoint once the file is finished"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        # remove the folder too if there are no other checkpoints
+        try:
+            os.rmdir(os.path.dirname(self.path))
+        except OSError:
+            pass
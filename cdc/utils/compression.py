@@ -0,0 +1,75 @@
+"""
+Utilities for reading compressed input files as if they weren't compressed.
+"""
+import bz2
+import gzip
+import io
+import lzma
+
+# a function that decompresses an open binary file, for each kind of compressed file by extension
+DECOMPRESSORS = {
+    'gz': lambda file: gzip.GzipFile(fileobj=file),
+    'bz2': bz2.BZ2File,
+    'xz': lzma.LZMAFile
+}
+
+# a function that opens a compressed file by its path, for each kind of compressed file by extension
+OPENERS = {
+    'gz': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open
+}
+
+# the extensions of compressed files
+EXTENSIONS = list(DECOMPRESSORS)
+
+def get_compression(path):
+    """Returns the compression extension of path (gz, bz2 or xz), or None if it isn't compressed"""
+    extension = path.rsplit('.', 1)[-1].lower()
+    if extension in DECOMPRESSORS:
+        return extension
+    return None
+
+def strip_extension(filename):
+    """Returns filename without its compression extension, like "notes.txt" for "notes.txt.gz\""""
+    if get_compression(filename) is None:
+        return filename
+    return filename.rsplit('.', 1)[0]
+
+class CompressedTextFile(io.TextIOWrapper):
+    """Text file that decompresses a compressed file as it's read. tell() and seek()
+    are positions in the decompressed text, compressed_tell() is how much of the
+    compressed file has been read so far"""
+
+    def __init__(self, path, encoding, **kwargs):
+        self.compressed = open(path, 'rb')
+        try:
+            decompressed = DECOMPRESSORS[get_compression(path)](self.compressed)
+            super().__init__(decompressed, encoding=encoding, **kwargs)
+        except:
+            self.compressed.close()
+            raise
+
+    def compressed_tell(self):
+        """Returns the number of bytes of the compressed file read so far"""
+        return self.compressed.tell()
+
+    def close(self):
+        # the decompressors don't close a file they were given
+        try:
+            super().close()
+        finally:
+            self.compressed.close()
+
+def open_binary(path):
+    """Opens path for reading bytes like open(), decompressing it if it's compressed"""
+    compressed = get_compression(path)
+    if compressed is None:
+        return open(path, 'rb')
+    return OPENERS[compressed](path, 'rb')
+
+def open_text(path, encoding, **kwargs):
+    """Opens path for reading text like open(), decompressing it if it's compressed"""
+    if get_compression(path) is None:
+        return open(path, 'r', encoding=encoding, **kwargs)
+    return CompressedTextFile(path, encoding, **kwargs)
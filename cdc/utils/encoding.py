@@ -0,0 +1,117 @@
+"""
+Encoding related utilities.
+"""
+import codecs
+import os
+
+from . import compression
+
+# byte order marks at the start of a file and the encoding they mean, longest first
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf32'),
+    (codecs.BOM_UTF32_BE, 'utf32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf16'),
+    (codecs.BOM_UTF16_BE, 'utf16')
+]
+
+def is_ascii_compatible(encoding):
+    """Check if an encoding stores ASCII characters (like newlines) as single bytes"""
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        return False
+    return '\n[]|'.encode(encoding) == b'\n[]|'
+
+def is_byte_searchable(encoding):
+    """Check if ASCII text can be found by searching the encoded bytes, which works for
+    UTF-8 and single-byte encodings, but not for other ASCII-compatible encodings where
+    ASCII bytes can also be part of a multi-byte character"""
+    if not is_ascii_compatible(encoding):
+        return False
+    if codecs.lookup(encoding).name == 'utf-8':
+        return True
+    # a single-byte encoding decodes every byte to one character
+    return len(bytes(range(256)).decode(encoding, errors='replace')) == 256
+
+def describe_error(error, offset):
+    """Returns a message for a UnicodeDecodeError in data that started at offset in the file"""
+    return "'{}' codec can't decode byte 0x{:02x} at byte {} of the file: {}".format(
+        error.encoding, error.object[error.start], offset + error.start, error.reason)
+
+def check_start(path, encoding, block_size, limit=None):
+    """Decodes the file from the start a block at a time (up to limit bytes, or all of it),
+    returns a message for the first error or None if there isn't one"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    position = 0
+    with compression.open_binary(path) as file:
+        while limit is None or position < limit:
+            block = file.read(block_size)
+            try:
+                decoder.decode(block, final=not block)
+            except UnicodeDecodeError as e:
+                return describe_error(e, position)
+            if not block:
+                break
+            position += len(block)
+    return None
+
+def check_samples(path, encoding, block_size, blocks):
+    """Decodes blocks spread evenly through the file, returns a message for the
+    first error or None if there isn't one"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as file:
+        for number in range(blocks):
+            offset = number * (size - block_size) // max(blocks - 1, 1)
+            file.seek(offset)
+            block = file.read(block_size)
+            final = offset + len(block) >= size
+            # a block in the middle of the file can start in the middle of a character,
+            # so it's fine if it can be decoded starting at any of its first few bytes
+            errors = []
+            for shift in range(1 if offset == 0 else 4):
+                try:
+                    codecs.getincrementaldecoder(encoding)().decode(block[shift:], final)
+                except UnicodeDecodeError as e:
+                    errors.append(describe_error(e, offset + shift))
+                    continue
+                break
+            else:
+                return errors[0]
+    return None
+
+def check_encoding(path, encoding, block_size=1024 * 1024, blocks=16):
+    """Checks if a file can be read with encoding by decoding blocks of block_size
+    bytes spread through it, or all of it if blocks is 0 or it's not much bigger.
+    Compressed files are checked from the start, because finding the middle means
+    decompressing everything before it. Returns a message for the first error or
+    None if there isn't one"""
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        return 'unknown encoding: {}'.format(encoding)
+    if compression.get_compression(path) is not None:
+        return check_start(path, encoding, block_size, block_size * blocks or None)
+    if not blocks or os.path.getsize(path) <= block_size * blocks:
+        return check_start(path, encoding, block_size)
+    return check_samples(path, encoding, block_size, blocks)
+
+def get_bom_encoding(path):
+    """Returns the encoding the file's byte order mark says it's in, or None"""
+    with compression.open_binary(path) as file:
+        start = file.read(4)
+    for bom, encoding in BOMS:
+        if start.startswith(bom):
+            return encoding
+    return None
+
+def find_encoding(path, encodings, block_size=1024 * 1024, blocks=16):
+    """Returns the first of encodings that the file can be read with (the one its
+    byte order mark says first, if it has one), or None if none of them work"""
+    bom_encoding = get_bom_encoding(path)
+    if bom_encoding is not None:
+        encodings = [bom_encoding] + list(encodings)
+    for encoding in encodings:
+        if check_encoding(path, encoding, block_size, blocks) is None:
+            return encoding
+    return None
@@ -0,0 +1,51 @@
+"""
+External sorting for readers that group records by ID, so files too large to
+sort in memory can still be grouped.
+"""
+import heapq
+import os
+import shutil
+import tempfile
+
+# the most sorted runs to merge at once
+MERGE_RUNS = 64
+
+def external_sort(entries, limit, size, write_run, read_run):
+    """Generator that yields the tuples in entries in sorted order. Entries are sorted
+    in memory until size() of them adds up to limit (0 never writes a run), then they
+    are written to a temporary file as a sorted run with write_run(entries, path) and
+    the runs are read back with read_run(path) and merged at the end."""
+    temp_dir = None
+    runs = []
+    buffer = []
+    total = 0
+    try:
+        for entry in entries:
+            buffer.append(entry)
+            total += size(entry)
+            # write out a sorted run when there are enough entries
+            if limit > 0 and total >= limit:
+                if temp_dir is None:
+                    temp_dir = tempfile.mkdtemp(prefix='cdc-group-')
+                buffer.sort()
+                runs.append(write_run(buffer, os.path.join(temp_dir, str(len(runs)))))
+                buffer = []
+                total = 0
+        buffer.sort()
+        # merge the runs a batch at a time if there are too many to open at once
+        count = len(runs)
+        while len(runs) > MERGE_RUNS:
+            merged = []
+            for start in range(0, len(runs), MERGE_RUNS):
+                batch = runs[start:start + MERGE_RUNS]
+                merged.append(write_run(heapq.merge(*[read_run(path) for path in batch]),
+                                        os.path.join(temp_dir, str(count))))
+                count += 1
+                for path in batch:
+                    os.remove(path)
+            runs = merged
+        # the entries still in memory are merged with the runs
+        yield from heapq.merge(buffer, *[read_run(path) for path in runs])
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
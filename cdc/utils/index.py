@@ -0,0 +1,125 @@
+"""
+Indexes of where the records in an input file start, saved in the user's
+cache folder so later conversions of the same file don't have to find them.
+"""
+import array
+import bisect
+import hashlib
+import json
+import os
+import sys
+
+import cdc
+
+# folder in the user's cache folder the indexes are saved in, unless the config file gives one
+FOLDER = os.path.join('cdc', 'index')
+
+def get_cache_folder():
+    """Returns the user's cache folder for the platform"""
+    if cdc.os_system == 'Windows':
+        return os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+    if cdc.os_system == 'Darwin':
+        return os.path.join(os.path.expanduser('~'), 'Library', 'Caches')
+    return os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+
+def get_path(input_path):
+    """Returns the path of the index for an input file"""
+    folder = cdc.CONFIG.get('read.txt', 'index_folder', fallback='')
+    if not folder:
+        folder = os.path.join(get_cache_folder(), FOLDER)
+    name = hashlib.sha1(os.path.abspath(input_path).encode('utf8')).hexdigest()
+    return os.path.join(folder, '{}.idx'.format(name))
+
+def describe_input(path, key):
+    """Returns a dict describing an input file as it is now and how its records are found"""
+    stat = os.stat(path)
+    description = {
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime
+    }
+    description.update(key)
+    # round trip through JSON so it compares equal to a loaded one
+    return json.loads(json.dumps(description))
+
+class RecordIndex:
+    """
+    The byte offset and ID of the start of each record in an input file. The
+    file has a JSON header line followed by the offsets as an array of 64-bit
+    integers and the IDs as lines of UTF-8 text. It's only valid for the same
+    input file (same size and modified time) read with the same key, which is
+    a dict of whatever decides where the records are (reader, delimiter, etc.).
+    """
+
+    def __init__(self, input_path, key):
+        self.description = describe_input(input_path, key)
+        self.path = get_path(input_path)
+        self.offsets = array.array('q')
+        self.ids = []
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def add(self, offset, record_id=''):
+        """Adds a record that starts at offset"""
+        self.offsets.append(offset)
+        self.ids.append(record_id)
+
+    def count(self, start=0, end=None):
+        """Returns the number of records that start between the start and end offsets"""
+        end_index = len(self.offsets) if end is None else bisect.bisect_left(self.offsets, end)
+        return end_index - bisect.bisect_left(self.offsets, start)
+
+    def find(self, offset):
+        """Returns the offset of the first record that starts at or after offset, or None"""
+        index = bisect.bisect_left(self.offsets, offset)
+        if index == len(self.offsets):
+            return None
+        return self.offsets[index]
+
+    def load(self):
+        """Reads the saved index, returns False if there isn't a valid one"""
+        try:
+            with open(self.path, 'rb') as file:
+                header = json.loads(file.readline().decode('utf8'))
+                # the input file and how its records are found have to be the same
+                if header.get('input') != self.description:
+                    return False
+                offsets = array.array('q')
+                offsets.frombytes(file.read(header['count'] * offsets.itemsize))
+                ids = file.read().decode('utf8').split('\n')
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return False
+        if len(offsets) != header['count'] or len(ids) != header['count'] + 1:
+            return False
+        # the offsets are saved in the byte order of the machine that saved them
+        if header.get('byteorder') != sys.byteorder:
+            offsets.byteswap()
+        self.offsets = offsets
+        self.ids = ids[:-1]
+        return True
+
+    def save(self):
+        """Saves the index, it's only an optimization so it's fine if it can't be saved"""
+        header = {
+            'input': self.description,
+            'count': len(self.offsets),
+            'byteorder': sys.byteorder
+        }
+        temp_path = self.path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # write to a temporary file first so a crash never leaves half an index
+            with open(temp_path, 'wb') as file:
+                file.write(json.dumps(header).encode('utf8') + b'\n')
+                self.offsets.tofile(file)
+                # every ID ends with a newline so an empty one isn't lost
+                file.write(''.join(record_id + '\n' for record_id in self.ids).encode('utf8'))
+            os.replace(temp_path, self.path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return False
+        return True
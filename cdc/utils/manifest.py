@@ -0,0 +1,138 @@
+"""
+Manifest of converted input files, used to skip unchanged files.
+"""
+import hashlib
+import json
+import os
+
+import cdc
+
+# name of the manifest file in the output folder
+FILENAME = cdc.CONFIG.get('MAIN', 'manifest_filename', fallback='canary_manifest.jsonl')
+
+def hash_file(path, block_size=1024 * 1024):
+    """Returns the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def describe_input(path, Reader, Writer, options):
+    """Returns a dict describing an input file as it is now and how it's converted"""
+    stat = os.stat(path)
+    # only the options that affect the output are compared
+    props = {}
+    for prop in Reader.UC_PROPS + Writer.UC_PROPS:
+        if 'intype' not in prop and 'outtype' not in prop:
+            props[prop['var']] = options.get(prop['var'])
+    return {
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'reader': Reader.__name__,
+        'writer': Writer.__name__,
+        # round trip through JSON so it compares equal to a loaded one
+        'options': json.loads(json.dumps(props, default=str))
+    }
+
+def remove_outputs(output_dir, output_paths):
+    """Deletes the output files of an earlier conversion, returns a list of the deleted paths"""
+    output_dir = os.path.abspath(output_dir)
+    removed = []
+    for output_path in output_paths:
+        output_path = os.path.abspath(output_path)
+        # only delete files a conversion wrote to the output folder
+        if os.path.dirname(output_path) != output_dir or not os.path.isfile(output_path):
+            continue
+        os.remove(output_path)
+        removed.append(output_path)
+    return removed
+
+class Manifest:
+    """
+    Record of the input files converted into an output folder. Entries are
+    appended as files finish, one JSON object per line, and the last entry for
+    a path is the one that counts.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = os.path.abspath(output_dir)
+        self.path = os.path.join(self.output_dir, FILENAME)
+        self.entries = {}
+        self.load()
+        # open for appending so finished files are recorded right away
+        self.file = open(self.path, 'a', encoding='utf8')
+
+    def load(self):
+        """Reads the entries from the manifest file if there is one"""
+        try:
+            with open(self.path, 'r', encoding='utf8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    # skip a line left unfinished if the last run was stopped
+                    except ValueError:
+                        continue
+                    if isinstance(entry, dict) and 'path' in entry:
+                        self.entries[entry['path']] = entry
+        except FileNotFoundError:
+            pass
+
+    def create_entry(self, path, Reader, Writer, options):
+        """Returns the entry describing the input file as it is now, the hash of its
+        contents is added by the worker that converts it if the user wants them compared"""
+        entry = describe_input(path, Reader, Writer, options)
+        entry['hash'] = None
+        entry['output_paths'] = []
+        return entry
+
+    def get(self, path):
+        """Returns the recorded entry for the input file, or None"""
+        return self.entries.get(os.path.abspath(path))
+
+    def is_unchanged(self, entry):
+        """Checks if the recorded entry matches the new one and its output still exists"""
+        old = self.get(entry['path'])
+        if old is None:
+            return False
+        if any(old.get(key) != entry[key] for key in ('size', 'mtime', 'reader', 'writer', 'options')):
+            return False
+        # make sure none of the output was deleted
+        return all(os.path.exists(output_path) for output_path in old.get('output_paths', []))
+
+    def get_check(self, entry):
+        """Returns a dict with the recorded hash and output paths of an input file that
+        only has a new modified time, for the worker to compare its contents to, or None
+        if it changed in another way or there isn't a hash to compare to"""
+        old = self.get(entry['path'])
+        if old is None or not old.get('hash'):
+            return None
+        if any(old.get(key) != entry[key] for key in ('size', 'reader', 'writer', 'options')):
+            return None
+        if not all(os.path.exists(output_path) for output_path in old.get('output_paths', [])):
+            return None
+        return {'hash': old['hash'], 'output_paths': old.get('output_paths', [])}
+
+    def get_outputs(self, path):
+        """Returns the recorded output files of an input file, for the worker to delete
+        so the new output can take their place"""
+        old = self.get(path)
+        if old is None:
+            return []
+        return old.get('output_paths', [])
+
+    def add(self, entry):
+        """Records a converted input file"""
+        self.entries[entry['path']] = entry
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+
+    def close(self):
+        """Rewrites the manifest with only the latest entry for each file"""
+        self.file.close()
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf8') as file:
+            for entry in self.entries.values():
+                file.write(json.dumps(entry) + '\n')
+        os.replace(temp_path, self.path)
@@ -0,0 +1,141 @@
+"""
+Filters that decide which records to convert from the values of their metadata fields.
+"""
+import datetime
+import re
+
+import cdc
+
+# formats to try when comparing values as dates
+DATE_FORMATS = [date_format.strip() for date_format in cdc.CONFIG.get('read.txt', 'filter_date_formats', fallback='%m/%d/%Y %I:%M:%S %p, %m/%d/%Y %H:%M:%S, %m/%d/%Y %H:%M, %m/%d/%Y, %Y-%m-%d %H:%M:%S, %Y-%m-%d').split(',')]
+
+# a condition is a field, an operator and a value, like "report_date >= 01/01/2015"
+CONDITION = re.compile(r'^\s*([^=!<>~]+?)\s*(!=|>=|<=|=|>|<|~)\s*(.*?)\s*$')
+
+# options for the readers that have metadata fields to filter on
+UC_PROPS = [
+    {'flag': '--include',
+     'name': '--include-records',
+     'label': 'Only Convert Records Where',
+     'action': 'store',
+     'default': None,
+     'type': str,
+     'help': ('Only convert the records whose metadata match all of these conditions, separated by '
+              'semicolons, like "report_type=RAD,PATH; report_date>=01/01/2015". The operators are '
+              '= (one of a comma-separated list of values, or @file for a file with a value on each line), '
+              '!=, <, <=, >, >= (compared as dates or numbers if they are) and ~ (contains). Records that '
+              'don\'t match are skipped without being read into memory or written.'),
+     'var': 'include_filter',
+     'position': 7,
+     'required': False},
+    {'flag': '--exclude',
+     'name': '--exclude-records',
+     'label': 'Skip Records Where',
+     'action': 'store',
+     'default': None,
+     'type': str,
+     'help': ('Skip the records whose metadata match any of these conditions, separated by semicolons, '
+              'like "mrn=@excluded_mrns.txt". The conditions are written the same way as for --include.'),
+     'var': 'exclude_filter',
+     'position': 8,
+     'required': False}
+]
+
+def parse_date(text):
+    """Returns text as a datetime if it's in one of the DATE_FORMATS, or None"""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+    return None
+
+def parse_number(text):
+    """Returns text as a float if it's a number, or None"""
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+class Condition(object):
+    """A comparison of a metadata field to a value"""
+
+    def __init__(self, text):
+        match = CONDITION.match(text)
+        if match is None or not match.group(3):
+            raise ValueError('"{}" is not a condition like field=value'.format(text.strip()))
+        self.field, self.operator, value = match.groups()
+        self.field = self.field.lower()
+        # equality is with any of a list of values
+        if self.operator in ('=', '!='):
+            if value.startswith('@'):
+                self.values = set(self.read_values(value[1:]))
+            else:
+                self.values = set(item.strip().casefold() for item in value.split(','))
+        elif self.operator == '~':
+            self.value = value.casefold()
+        # ordering compares dates or numbers if the value is one, text otherwise
+        else:
+            self.convert = parse_date
+            self.value = parse_date(value)
+            if self.value is None:
+                self.convert = parse_number
+                self.value = parse_number(value)
+            if self.value is None:
+                self.convert = str.casefold
+                self.value = value.casefold()
+
+    def read_values(self, path):
+        """Returns the values in a file with one on each line"""
+        try:
+            with open(path, 'r', encoding='utf8') as file:
+                return [line.strip().casefold() for line in file if line.strip()]
+        except OSError as e:
+            raise ValueError('could not read the values in {}: {}'.format(path, e.strerror))
+
+    def matches(self, metadata):
+        """Checks if the field's value in the metadata dict matches, a missing field never does"""
+        value = metadata.get(self.field)
+        if value is None:
+            return False
+        value = value.strip()
+        if self.operator == '=':
+            return value.casefold() in self.values
+        if self.operator == '!=':
+            return value.casefold() not in self.values
+        if self.operator == '~':
+            return self.value in value.casefold()
+        value = self.convert(value)
+        if value is None:
+            return False
+        if self.operator == '<':
+            return value < self.value
+        if self.operator == '<=':
+            return value <= self.value
+        if self.operator == '>':
+            return value > self.value
+        return value >= self.value
+
+class RecordFilter(object):
+    """Decides if a record is converted from its metadata. It has to match all
+    of the include conditions and none of the exclude conditions."""
+
+    def __init__(self, include=None, exclude=None):
+        self.include = [Condition(text) for text in (include or '').split(';') if text.strip()]
+        self.exclude = [Condition(text) for text in (exclude or '').split(';') if text.strip()]
+
+    def get_fields(self):
+        """Returns the fields the conditions are on"""
+        return set(condition.field for condition in self.include + self.exclude)
+
+    def keep(self, metadata):
+        """Checks if the record with the metadata dict should be converted"""
+        return (all(condition.matches(metadata) for condition in self.include)
+                and not any(condition.matches(metadata) for condition in self.exclude))
+
+def get_filter(options):
+    """Returns the RecordFilter for the user's options, or None if they don't filter
+    the records. Raises a ValueError if a condition isn't valid."""
+    if not options.get('include_filter') and not options.get('exclude_filter'):
+        return None
+    return RecordFilter(options.get('include_filter'), options.get('exclude_filter'))
@@ -0,0 +1,199 @@
+"""
+Registry of the readers and writers. Their labels, descriptions and UC_PROPS are
+saved in a cached manifest, so a reader or writer's module is only imported when
+it's chosen instead of every module being imported at startup (and again in every
+worker process). Other packages can add formats with the "cdc.readers" and
+"cdc.writers" entry point groups, each entry point naming a Read or Write subclass.
+"""
+import importlib
+import inspect
+import json
+import logging
+import os
+
+import cdc
+
+# the package and entry point group of each kind of plugin
+PACKAGES = {'read': 'cdc.read', 'write': 'cdc.write'}
+ENTRY_POINT_GROUPS = {'read': 'cdc.readers', 'write': 'cdc.writers'}
+
+# the class attributes kept in the manifest, anything else imports the class
+ATTRIBUTES = ['GUI_LABELS', 'CLI_LABELS', 'DESCRIPTION', 'UC_PROPS']
+
+# file the manifest is cached in, in the package folder unless the config file gives one
+FILENAME = '.cdc-plugins.json'
+
+def get_path():
+    """Returns the path of the cached manifest"""
+    path = cdc.CONFIG.get('MAIN', 'plugin_cache', fallback='')
+    if not path:
+        path = os.path.join(cdc.cdc_dir, FILENAME)
+    return path
+
+def list_modules(kind):
+    """Returns the names of the modules in a plugin package, without importing them"""
+    folder = os.path.join(cdc.cdc_dir, kind)
+    return sorted(f.split('.')[0] for f in os.listdir(folder) if not f.startswith('_') and f.endswith('py'))
+
+def find_entry_points(group):
+    """Returns the entry points registered in a group, or an empty list if they can't be found"""
+    try:
+        from importlib import metadata
+    except ImportError:
+        return []
+    entry_points = metadata.entry_points()
+    # entry_points() returns a dict of groups before Python 3.10
+    if hasattr(entry_points, 'select'):
+        return list(entry_points.select(group=group))
+    return list(entry_points.get(group, []))
+
+def describe_sources():
+    """Returns a dict describing the plugin modules and entry points as they are now,
+    the manifest is only valid while they haven't changed"""
+    modules = {}
+    entry_points = {}
+    for kind in PACKAGES:
+        for module in list_modules(kind):
+            path = os.path.join(cdc.cdc_dir, kind, '{}.py'.format(module))
+            try:
+                stat = os.stat(path)
+                modules['{}.{}'.format(PACKAGES[kind], module)] = [stat.st_size, stat.st_mtime]
+            except OSError:
+                modules['{}.{}'.format(PACKAGES[kind], module)] = None
+        # the version of the package an entry point is from, if it's known, so upgrading it updates the manifest
+        entry_points[kind] = sorted([entry_point.name, entry_point.value, getattr(getattr(entry_point, 'dist', None), 'version', None)]
+                                    for entry_point in find_entry_points(ENTRY_POINT_GROUPS[kind]))
+    # round trip through JSON so it compares equal to a loaded one
+    return json.loads(json.dumps({
+        'version': cdc.__version__,
+        'modules': modules,
+        'entry_points': entry_points
+    }))
+
+def encode_props(props):
+    """Returns a copy of UC_PROPS that can be saved as JSON, the types are saved as "module:name\""""
+    encoded = []
+    for prop in props:
+        prop = dict(prop)
+        if 'type' in prop:
+            prop['type'] = '{}:{}'.format(prop['type'].__module__, prop['type'].__qualname__)
+        encoded.append(prop)
+    return encoded
+
+def decode_props(props):
+    """Returns UC_PROPS loaded from the manifest with their types"""
+    for prop in props:
+        if 'type' in prop:
+            module, name = prop['type'].split(':')
+            prop['type'] = getattr(importlib.import_module(module), name)
+    return props
+
+def describe_class(cls):
+    """Returns the manifest entry for a reader or writer class"""
+    entry = {'path': '{}:{}'.format(cls.__module__, cls.__qualname__)}
+    for attribute in ATTRIBUTES:
+        entry[attribute] = getattr(cls, attribute)
+    entry['UC_PROPS'] = encode_props(entry['UC_PROPS'])
+    return entry
+
+def find_classes(kind):
+    """Imports the plugin modules and entry points of a kind and returns their classes"""
+    package = importlib.import_module(PACKAGES[kind])
+    # the base class can't actually read or write
+    base = package.Read if kind == 'read' else package.Write
+    classes = []
+    for module in list_modules(kind):
+        module = importlib.import_module('{}.{}'.format(PACKAGES[kind], module))
+        for name, value in vars(module).items():
+            if inspect.isclass(value) and issubclass(value, base) and value is not base and value not in classes:
+                classes.append(value)
+    for entry_point in find_entry_points(ENTRY_POINT_GROUPS[kind]):
+        # a broken plugin shouldn't stop the converter from starting
+        try:
+            value = entry_point.load()
+        except Exception as e:
+            logging.getLogger('log').warning('Could not load the {} plugin "{}": {}'.format(kind, entry_point.name, e))
+            continue
+        if inspect.isclass(value) and issubclass(value, base) and value not in classes:
+            classes.append(value)
+    return classes
+
+def build_manifest():
+    """Imports every plugin and returns the manifest of them"""
+    manifest = {'sources': describe_sources()}
+    for kind in PACKAGES:
+        manifest[kind] = [describe_class(cls) for cls in find_classes(kind)]
+    return manifest
+
+def load_manifest():
+    """Returns the cached manifest if it's still valid, otherwise builds it and saves it"""
+    path = get_path()
+    sources = describe_sources()
+    try:
+        with open(path, 'r', encoding='utf8') as file:
+            manifest = json.load(file)
+        if manifest.get('sources') == sources and all(kind in manifest for kind in PACKAGES):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    manifest = build_manifest()
+    # the manifest is only an optimization, so it's fine if it can't be saved
+    temp_path = path + '.tmp'
+    try:
+        with open(temp_path, 'w', encoding='utf8') as file:
+            json.dump(manifest, file)
+        os.replace(temp_path, path)
+    except (OSError, TypeError, ValueError):
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+    # use it the same way as a loaded one
+    return json.loads(json.dumps(manifest, default=str))
+
+class Plugin(object):
+    """A reader or writer in the manifest. It has the ATTRIBUTES without importing its
+    module, load() (or getting any other attribute) imports it and returns the class."""
+
+    def __init__(self, entry):
+        self.path = entry['path']
+        self.cls = None
+        self.GUI_LABELS = entry['GUI_LABELS']
+        self.CLI_LABELS = entry['CLI_LABELS']
+        self.DESCRIPTION = entry['DESCRIPTION']
+        self.UC_PROPS = decode_props(entry['UC_PROPS'])
+
+    def load(self):
+        """Imports the class and returns it"""
+        if self.cls is None:
+            module, name = self.path.split(':')
+            cls = importlib.import_module(module)
+            for part in name.split('.'):
+                cls = getattr(cls, part)
+            self.cls = cls
+        return self.cls
+
+    def __getattr__(self, name):
+        # only called for attributes that aren't set, which the class has
+        if name.startswith('_') or name == 'cls':
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+    def __repr__(self):
+        return '<Plugin {}>'.format(self.path)
+
+# the GUI_KEYS and CLI_KEYS dicts of each kind, once they're created
+KEYS = {}
+
+def get_keys(kind):
+    """Returns the GUI_KEYS and CLI_KEYS dicts for a kind of plugin ("read" or "write"),
+    which map each label to a Plugin"""
+    if kind not in KEYS:
+        gui_keys = {}
+        cli_keys = {}
+        for entry in load_manifest()[kind]:
+            plugin = Plugin(entry)
+            gui_keys.update({label: plugin for label in plugin.GUI_LABELS})
+            cli_keys.update({label: plugin for label in plugin.CLI_LABELS})
+        KEYS[kind] = (gui_keys, cli_keys)
+    return KEYS[kind]
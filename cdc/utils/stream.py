@@ -0,0 +1,74 @@
+"""
+Utilities for wrapping and unwrapping a document that is written in parts.
+"""
+
+# the characters textwrap treats as whitespace (str.strip removes more)
+WHITESPACE = '\t\n\x0b\x0c\r '
+
+class StreamWrapper(object):
+    """Wraps a document in parts with a textwrap.TextWrapper. The last line
+    wrapped from each part is wrapped again with the next part, so the output
+    is the same as wrapping the whole document at once (unless the line ends
+    with whitespace textwrap doesn't split on, like U+2028)."""
+
+    def __init__(self, wrapper):
+        self.wrapper = wrapper
+        # text to put before the next part
+        self.pending = ''
+
+    def get_tail(self, text):
+        """Returns the whitespace at the end of text, with tabs expanded from
+        the start of its line like the wrapper expands them"""
+        end = len(text.rstrip(WHITESPACE))
+        tail = text[text.rfind('\n', 0, end) + 1:]
+        if self.wrapper.expand_tabs:
+            tail = tail.expandtabs(self.wrapper.tabsize)
+        return tail[len(tail.rstrip(WHITESPACE)):]
+
+    def wrap(self, lines, last=True):
+        """Returns the wrapped lines of a part that are finished"""
+        text = self.pending + ''.join(lines)
+        wrapped = self.wrapper.wrap(text)
+        self.pending = ''
+        if not last:
+            if not wrapped:
+                # only whitespace so far, keep all of it
+                self.pending = text
+            else:
+                # the last line may get more words from the next part
+                self.pending = wrapped.pop() + self.get_tail(text)
+        return [line + '\n' for line in wrapped]
+
+class StreamUnwrapper(object):
+    """Unwraps a document in parts with a RuleBasedUnwrapper. The lines after
+    the last blank line in each part are held back until the next part, so
+    paragraphs aren't split between parts unless a part has no blank lines.
+    Whether the text is wrapped is decided for each part."""
+
+    def __init__(self, unwrapper):
+        self.unwrapper = unwrapper
+        # lines to put before the next part
+        self.pending = []
+        # the first line of the document is not unwrapped
+        self.started = False
+
+    def unwrap(self, lines, last=True):
+        """Returns the unwrapped lines of a part that are finished"""
+        lines = self.pending + lines
+        self.pending = []
+        head = []
+        if not self.started and lines:
+            head = lines[:1]
+            lines = lines[1:]
+            self.started = True
+        if not last:
+            # hold back the lines after the last blank line
+            for index in range(len(lines) - 1, -1, -1):
+                if not lines[index].strip():
+                    self.pending = lines[index + 1:]
+                    lines = lines[:index + 1]
+                    break
+        if not lines:
+            return head
+        doc = self.unwrapper.process(''.join(lines))
+        return head + self.unwrapper.render(doc, 'reflow').splitlines(True)
@@ -138,7 +138,11 @@ def window(iterable, left, right, padding=None, step=1 ):
 
     while True: 
         for i in range(step):
-            elements.append( next(iterator) ) 
+            # a StopIteration can't escape a generator since Python 3.7
+            try:
+                elements.append( next(iterator) ) 
+            except StopIteration:
+                return
         yield tuple( elements )
         
         
\ No newline at end of file
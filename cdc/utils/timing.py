@@ -0,0 +1,46 @@
+"""
+Per-stage timing and progress report timing utilities.
+"""
+import time
+
+def add_timings(total, timings):
+    """Adds the seconds spent in each stage of timings to total"""
+    for stage, seconds in timings.items():
+        total[stage] = total.get(stage, 0) + seconds
+    return total
+
+def format_timings(timings):
+    """Returns the share of time spent in each stage, like
+    "read 31% / unwrap 55% / write 14%", or an empty string if nothing was timed"""
+    total = sum(timings.values())
+    if total <= 0:
+        return ''
+    # stages are listed in the order they were first timed
+    return ' / '.join('{} {:.0f}%'.format(stage, 100 * seconds / total) for stage, seconds in timings.items())
+
+class ProgressTimer(object):
+    """Decides when to report progress, every interval seconds. Checking the
+    clock for every line would cost more than reading a short line, so it's
+    only checked every so many lines, and that number is doubled or halved
+    so the clock is checked about ten times per interval whether the lines
+    are short or long."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        # the number of lines between checks of the clock
+        self.lines = 1
+        self.last_check = time.monotonic()
+        self.next_report = self.last_check + interval
+
+    def check(self):
+        """Returns whether it's time to report progress and the number of lines until the next check"""
+        now = time.monotonic()
+        if now - self.last_check < self.interval / 10:
+            self.lines *= 2
+        elif self.lines > 1:
+            self.lines //= 2
+        self.last_check = now
+        if now >= self.next_report:
+            self.next_report = now + self.interval
+            return True, self.lines
+        return False, self.lines
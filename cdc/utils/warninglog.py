@@ -0,0 +1,148 @@
+"""
+Warnings from converting a file, kept as compact (code, filename, line, args)
+tuples and counted by code, so a file with millions of the same warning doesn't
+fill the memory of the worker or swamp the progress queue and the interfaces.
+"""
+import os
+
+import cdc
+
+# the message for each warning code, formatted with the warning's args
+MESSAGES = {
+    'no_text_field': 'Could not determine file\'s text field.',
+    'no_content': 'Medical record has no content',
+    'header_mismatch': 'Line does not match header',
+    'filter_field_missing': 'The record filter field "{}" is not in the file',
+    'no_record_id': 'Could not find record ID, using {} instead',
+    'no_random_sample': 'Records can\'t be picked at random from this file, converting the first {} instead',
+    'invalid_json': 'Line is not a JSON object, skipping it'
+}
+
+# the number of warnings of each code that are sent to the interfaces, the rest are only counted
+# (and written to the warnings file if there is an output folder)
+EXAMPLES = cdc.CONFIG.getint('PROGRESS', 'warning_examples', fallback=20)
+
+# the number of warnings to send to the main process at a time
+BATCH_SIZE = cdc.CONFIG.getint('PROGRESS', 'warning_list_size', fallback=1000)
+
+def get_message(code, args=()):
+    """Returns the message for a warning code formatted with its args. A code that isn't
+    in MESSAGES is the message itself, so readers and writers can warn about anything."""
+    message = MESSAGES.get(code, code)
+    if args:
+        return message.format(*args)
+    return message
+
+def format_warning(warning):
+    """Returns the text of a warning tuple, like "notes.txt, line 12: Line does not match header\""""
+    code, filename, line, args = warning
+    if line is not None:
+        return '{}, line {}: {}'.format(filename, line, get_message(code, args))
+    return '{}: {}'.format(filename, get_message(code, args))
+
+def summarize(progress):
+    """Returns a message for each code in a final progress dict that had more warnings
+    than were sent, saying how many more there were and where they are"""
+    messages = []
+    for code, count in sorted(progress.get('warnings', {}).items()):
+        if count <= EXAMPLES:
+            continue
+        # the args are different for each warning, so leave them out
+        message = '{}: {} more "{}" warnings'.format(progress['filename'], count - EXAMPLES, MESSAGES.get(code, code).replace('{}', '...'))
+        if progress.get('warnings_file'):
+            message += ' in {}'.format(progress['warnings_file'])
+        messages.append(message)
+    # the warnings that weren't sent for the chunks of a split file are added to its file
+    if progress.get('merged_warnings'):
+        messages.append('{}: {} more warnings from converting the parts of the file in {}'.format(progress['filename'], progress['merged_warnings'], progress['warnings_file']))
+    return messages
+
+def get_path(output_path):
+    """Returns the path of the warnings file for an output file"""
+    return os.path.join(os.path.dirname(output_path), '{} warnings.log'.format(os.path.basename(output_path)))
+
+class WarningLog(object):
+    """The warnings for a file. The first EXAMPLES warnings of each code are kept
+    until they're sent, the rest are counted and written to the file at path (if
+    there is one), which is only created if it's needed. A number is added to the
+    name if there's already a file there, so another file's warnings aren't lost."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.file = None
+        # the number of warnings of each code
+        self.counts = {}
+        # the warnings that haven't been sent yet
+        self.pending = []
+
+    def add(self, code, filename, line=None, args=()):
+        """Adds a warning, returns True if there are enough pending to send them"""
+        count = self.counts.get(code, 0) + 1
+        self.counts[code] = count
+        warning = (code, filename, line, args)
+        if count <= EXAMPLES:
+            self.pending.append(warning)
+            return len(self.pending) >= BATCH_SIZE
+        self.spill(warning)
+        return False
+
+    def name_after(self, output_path):
+        """Names the warnings file after an output file, if it hasn't been created yet"""
+        if self.path is not None and self.file is None:
+            self.path = get_path(output_path)
+
+    def open_file(self):
+        """Creates the warnings file, with a number added to the name if the path is taken"""
+        name, extension = os.path.splitext(self.path)
+        path = self.path
+        count = 1
+        while True:
+            # only create a new file, other workers can be writing warnings files too
+            try:
+                self.file = open(path, 'x', encoding='utf8')
+            except FileExistsError:
+                path = '{} ({}){}'.format(name, count, extension)
+                count += 1
+                continue
+            self.path = path
+            return
+
+    def spill(self, warning):
+        """Writes a warning that isn't sent to the warnings file"""
+        if self.path is None:
+            return
+        if self.file is None:
+            try:
+                self.open_file()
+            # the warnings are still counted if they can't be written
+            except OSError:
+                self.path = None
+                return
+        self.file.write(format_warning(warning) + '\n')
+
+    def append(self, path):
+        """Adds the warnings in another warnings file to this one, returns how many there were"""
+        if self.path is None:
+            return 0
+        count = 0
+        with open(path, 'r', encoding='utf8') as file:
+            for line in file:
+                if self.file is None:
+                    self.open_file()
+                self.file.write(line)
+                count += 1
+        return count
+
+    def take(self):
+        """Returns the pending warnings and clears them"""
+        pending = self.pending
+        self.pending = []
+        return pending
+
+    def close(self):
+        """Closes the warnings file, returns its path if it was written"""
+        if self.file is None:
+            return None
+        self.file.close()
+        self.file = None
+        return self.path
@@ -76,6 +76,10 @@ class WriteCanary(WriteDelimTXT):
         # What it specifically does is customize the delimiter for each record
         # Then we store this in 'concat_delim' which is the variable used by WriteDelimTXT
 
+        # the rest of a document that comes in parts keeps the first part's delimiter
+        if self.continuing:
+            return super().process_data(info)
+
         # if id field is the time, get the time and add it to the delimiter
         if self.options['id_field'] == '*time':
             self.options['concat_delim'] = '{}{}'.format(self.get_timestamp_id(), self.options['canary_delim'])
@@ -88,8 +92,8 @@ class WriteCanary(WriteDelimTXT):
             self.options['concat_delim'] = '{}{}'.format(time_id, self.options['canary_delim'])
 
             if 'line' in info:
-                self.read_file.put_warning(info['metadata']['filename'], 'Could not find record ID, using {} instead'.format(time_id), info['line'])
+                self.read_file.put_warning(info['metadata']['filename'], 'no_record_id', info['line'], time_id)
             else:
-                self.read_file.put_warning(info['metadata']['filename'], 'Could not find record ID, using {} instead'.format(time_id))
+                self.read_file.put_warning(info['metadata']['filename'], 'no_record_id', None, time_id)
 
         return super().process_data(info)
@@ -0,0 +1,126 @@
+"""Contains class for writing JSON Lines files"""
+import json
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+import cdc
+from .text import WriteTXT, WriteDelimTXT
+
+# metadata the readers keep about the input file, only written if it's asked for
+FILE_FIELDS = ['location', 'filepath', 'size', 'conversion_id']
+
+class WriteJSONL(WriteDelimTXT):
+    """JSON Lines Writer"""
+    # required class variables for interface labels and description
+    GUI_LABELS = ['JSON Lines']
+    CLI_LABELS = ['jsonl', 'ndjson']
+    DESCRIPTION = 'Files with one JSON object on each line for each record, with its text and metadata as fields. These files have a ".jsonl" extension.'
+    EXTENSION = 'jsonl'
+
+    # UC_PROPS plus the ones from WriteTXT (there's no delimiter between records)
+    UC_PROPS = [
+        {'flag': '--jsontext',
+         'name': '--json-text-field',
+         'label': 'Text Field',
+         'action': 'store',
+         'default': 'text',
+         'type': str,
+         'help': 'The name of the field with the text of each record.',
+         'var': 'json_text_field',
+         'required': True,
+         'position': -3},
+        {'flag': '--jsonmeta',
+         'name': '--json-metadata-fields',
+         'label': 'Metadata Fields',
+         'action': 'store',
+         'default': None,
+         'type': str,
+         'help': ('The metadata fields to write with each record, separated by commas, in that order. '
+                  'A record without one of them has null for it. All of the metadata the reader found '
+                  'for each record (and the input filename) is written if it isn\'t given.'),
+         'var': 'json_metadata_fields',
+         'required': False,
+         'position': -2},
+        {'flag': '--jsonascii',
+         'name': '--json-ascii',
+         'label': 'Escape Non-ASCII Characters',
+         'action': 'store_true',
+         'default': False,
+         'help': 'Write characters that aren\'t ASCII as \\u escapes, so the output is plain ASCII.',
+         'var': 'json_ascii',
+         'required': False,
+         'position': 6}
+    ] + WriteTXT.UC_PROPS
+
+    # sort UC_PROPS
+    UC_PROPS = sorted(UC_PROPS, key=lambda k: k['position'])
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # strings are encoded with the json module's C function for them, building a dict
+        # for each record and encoding it with json.dumps() is about twice as slow
+        self.encode = encode_basestring_ascii if self.options['json_ascii'] else encode_basestring
+        # the encoded field names followed by a colon, so each one is only encoded once
+        self.keys = {}
+        self.text_key = self.encode(self.options['json_text_field'])
+        # the metadata that isn't written if all of it is
+        self.excluded = set(FILE_FIELDS + [self.options['json_text_field']])
+        # the metadata fields to write, None for all of them
+        self.fields = None
+        if self.options['json_metadata_fields']:
+            self.fields = [field.strip() for field in self.options['json_metadata_fields'].split(',') if field.strip()]
+        # whether the last part of a record ended with a line break that hasn't been written
+        self.pending_newline = False
+
+    def get_buffer_size(self):
+        """Returns the size of the buffer to write the output files with, records are
+        short lines so they're collected in a larger buffer than the text writers'"""
+        return cdc.CONFIG.getint('write.jsonl', 'buffer_size', fallback=1048576)
+
+    def get_fields(self, metadata):
+        """Returns the (name, value) pairs of the metadata fields to write for a record"""
+        if self.fields is not None:
+            # the readers' field names aren't all in the same case
+            values = {field.lower(): value for field, value in metadata.items()}
+            return [(field, values.get(field.lower())) for field in self.fields]
+        return [(field, value) for field, value in metadata.items() if field not in self.excluded]
+
+    def encode_field(self, field, value):
+        """Returns the JSON for a field of an object, its name and value (which is usually a string)"""
+        key = self.keys.get(field)
+        if key is None:
+            key = self.keys[field] = self.encode(field) + ':'
+        if isinstance(value, str):
+            return key + self.encode(value)
+        return key + json.dumps(value, ensure_ascii=self.options['json_ascii'])
+
+    def process_data(self, info):
+        """Generator for processing the data with the UC_PROPS"""
+        # the records are lines, so skip WriteDelimTXT adding a delimiter
+        return WriteTXT.process_data(self, info)
+
+    def get_document(self, info):
+        # a long record comes in parts, the first one starts the object and the last one ends it
+        first = not self.continuing
+        last = not info.get('continues', False)
+        text = ''.join(self.process_data(info)['data'])
+        parts = []
+        if first:
+            # the object is left open for the text after the metadata
+            parts.append('{')
+            for field, value in self.get_fields(info['metadata']):
+                parts.append(self.encode_field(field, value))
+                parts.append(',')
+            parts.append(self.text_key + ':"')
+            self.pending_newline = False
+        # the line break the reader ends each record with isn't part of the text, so
+        # it's held back until it's known whether more of the text follows it
+        if self.pending_newline:
+            text = '\n' + text
+        self.pending_newline = text.endswith('\n')
+        if self.pending_newline:
+            text = text[:-1]
+        # the text goes in the object's string in pieces, without the quotes around each
+        parts.append(self.encode(text)[1:-1])
+        if last:
+            parts.append('"}\n')
+        return ''.join(parts)
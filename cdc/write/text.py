@@ -1,9 +1,14 @@
 """Contains class for writing plain text files"""
 import os
+import shutil
+import time
 from encodings.aliases import aliases
 import datetime
 import cdc
 from .write import Write
+from ..utils import compression
+from ..utils.stream import StreamUnwrapper, StreamWrapper
+from ..utils.warninglog import get_path as get_warnings_path
 
 class WriteTXT(Write):
     """.txt Writer"""
@@ -11,6 +16,8 @@ class WriteTXT(Write):
     GUI_LABELS = ['Plain Text']
     CLI_LABELS = ['txt', 'text', 'plain_text']
     DESCRIPTION = 'All files with the ".txt" extension.'
+    # the extension of the output files
+    EXTENSION = 'txt'
 
     # UC_PROPS class variable with the base class UC_PROPS added
     UC_PROPS = Write.UC_PROPS + [
@@ -101,89 +108,129 @@ class WriteTXT(Write):
     # sort the UC_PROPS on the position key
     UC_PROPS = sorted(UC_PROPS, key=lambda k: k['position'])
 
+    # long documents can be written in parts
+    STREAMABLE = True
+
     def __init__(self, options, read_file):
         super().__init__(options, read_file)
 
         # if the filename was provided, make sure the extension is there
         if self.options['output_filename'] is not None and len(self.options['output_filename']):
-            if self.options['output_filename'].split('.')[-1] != 'txt':
-                self.options['output_filename'] += '.txt'
+            if self.options['output_filename'].split('.')[-1] != self.EXTENSION:
+                self.options['output_filename'] += '.' + self.EXTENSION
         # else create the filename from input
         else:
-            # get input filename
-            filename = self.read_file.info['metadata']['filename']
-            # make sure you make the extension .txt
+            # get input filename, without the extension of a compressed file
+            filename = compression.strip_extension(self.read_file.info['metadata']['filename'])
+            # make sure you make the extension the writer's (.txt)
             namelist = filename.split('.')
-            namelist[-1] = 'txt'
+            namelist[-1] = self.EXTENSION
             # join it back together
             filename = '.'.join(namelist)
             # set the output filename
             self.options['output_filename'] = filename
 
+        # whether the next info the reader yields continues the same document
+        self.continuing = False
+
         self.wrap = None
         if self.options["text_wrap"]:
             import textwrap
-            self.wrap = textwrap.TextWrapper(self.options["text_wrap"])
+            # carries the unfinished line from one part of a document to the next
+            self.wrap = StreamWrapper(textwrap.TextWrapper(self.options["text_wrap"]))
 
         self.unwrapper = None
+        # holds back the end of each part of a document until the next part
+        self.stream_unwrapper = None
         if self.options["text_unwrap"]:
             from ..utils.textunwrapper.unwrapper import RuleBasedUnwrapper
             self.unwrapper = RuleBasedUnwrapper()
             #print(self.unwrapper)
        
         
+    def get_buffer_size(self):
+        """Returns the size of the buffer to write the output files with"""
+        return cdc.CONFIG.getint('WRITE', 'OutputBufferSize', fallback=8192)
+
     def write_dir(self):
         """Writes file(s) to a directory"""
         # count files so we can distinguish multiple output files
         count = 1
-        # iterate through records yielded by reader generator
-        for info in self.read_file.read_data():
-            # add numbers to output filename for multiple file output
-            name = self.options['output_filename'].split('.')
-            name[-2] = '{} ({})'.format(name[-2], count)
-            name = '.'.join(name)
-            path = os.path.join(self.options['output_dir'], name)
-
-            # make sure you aren't overwriting
-            path = self.get_safe_path(path)
+        # get buffer size
+        buffer = self.get_buffer_size()
+        # the output file stays open while the parts of a document are written
+        file = None
+        try:
+            # iterate through records yielded by reader generator
+            for info in self.read_records():
+                if file is None:
+                    # add numbers to output filename for multiple file output
+                    name = self.options['output_filename'].split('.')
+                    name[-2] = '{} ({})'.format(name[-2], count)
+                    name = '.'.join(name)
+                    path = os.path.join(self.options['output_dir'], name)
 
-            # get buffer size
-            buffer = cdc.CONFIG.getint('WRITE', 'OutputBufferSize', fallback=8192)
-            
-            try:
-                # open output file for writing
-                with open(path, 'w', buffer, encoding=self.options['w_encoding']) as file:
-                    # run it through process_data generator and write line-by-line
-                    file.write(self.get_document(info))
+                    # make sure you aren't overwriting
+                    path = self.get_safe_path(path)
+
+                    # open output file for writing
+                    file = open(path, 'w', buffer, encoding=self.options['w_encoding'])
+
+                # run it through process_data before timing the write
+                document = self.get_document(info)
+                start = time.perf_counter()
+                file.write(document)
+                # close the file after the last part of the document
+                if not info.get('continues', False):
+                    file.close()
+                    file = None
+                self.add_time('write', time.perf_counter() - start)
 
                 # increment count for the next file
-                count += 1
-            except:
+                if file is None:
+                    count += 1
+        except:
+            if file is not None:
+                file.close()
                 os.remove(path)
-                raise
+            raise
 
     def process_data(self, info):
         """Generator for processing the data with the UC_PROPS"""
 
+        # a long document may come in parts, wrapping and unwrapping carry
+        # what they haven't finished over to the next part
+        first = not self.continuing
+        last = not info.get('continues', False)
+        self.continuing = not last
+
+        # each step is timed so the time spent in it can be reported
         # go through the lines and perform any in-place modifications
-        for i, line in enumerate(info['data']):
-            # process user-specified properties  
-            if self.options['lowercase']:
+        if self.options['lowercase']:
+            start = time.perf_counter()
+            for i, line in enumerate(info['data']):
                 info['data'][i] = line.lower()
+            self.add_time('lowercase', time.perf_counter() - start)
 
 		# Remove blank lines
         if self.options['ignore_blank_lines']:
+            start = time.perf_counter()
             info["data"] = [line for line in info["data"] if line.strip()]
+            self.add_time('blank lines', time.perf_counter() - start)
 
         # text wrapping
         if self.wrap:
-            info["data"] = self.wrap.wrap(''.join(info['data']))
-            info["data"] = [line + "\n" for line in info["data"]]	# should not need to do this
+            start = time.perf_counter()
+            info["data"] = self.wrap.wrap(info['data'], last)
+            self.add_time('wrap', time.perf_counter() - start)
 
         if self.unwrapper:
-            # do not include the first line
-            unwrapped = self.unwrapper.process(''.join(info['data'][1:]))
-            info["data"] = [info["data"][0]] + self.unwrapper.render(unwrapped, "reflow").splitlines(True)
+            start = time.perf_counter()
+            # start again for each document, its first line is not unwrapped
+            if first:
+                self.stream_unwrapper = StreamUnwrapper(self.unwrapper)
+            info["data"] = self.stream_unwrapper.unwrap(info['data'], last)
+            self.add_time('unwrap', time.perf_counter() - start)
             
         return info
 
@@ -217,30 +264,128 @@ class WriteDelimTXT(WriteTXT):
     # sort UC_PROPS
     UC_PROPS = sorted(UC_PROPS, key=lambda k: k['position'])
 
+    # all of the records go in one file, so the files for chunks can be joined
+    # and writing can start again at the end of a partial file
+    MERGEABLE = True
+    RESUMABLE = True
+
     # nothing special for constructor, just inherit it
 
     def write_dir(self):
         """Write file to a directory"""
-        # build path and make sure it's safe to write to
-        path = os.path.join(self.options['output_dir'], self.options['output_filename'])
-        path = self.get_safe_path(path)
+        # get the last checkpoint if resuming
+        resume = None
+        if self.checkpoint is not None:
+            resume = self.checkpoint.load()
+        # a chunk of a split file is written to its part file to be merged later
+        if self.read_file.chunk is not None:
+            path = self.read_file.chunk['path']
+        # keep writing to the output the checkpoint was saved for
+        elif resume is not None:
+            path = resume['output_path']
+            self.read_file.progress['output_path'] = path
+            self.read_file.progress['output_paths'] = [path]
+            self.read_file.warnings.name_after(path)
+            self.read_file.resume = resume
+        else:
+            # build path and make sure it's safe to write to
+            path = os.path.join(self.options['output_dir'], self.options['output_filename'])
+            path = self.get_safe_path(path)
         # get buffer size
-        buffer = cdc.CONFIG.getint('WRITE', 'OutputBufferSize', fallback=8192)
+        buffer = self.get_buffer_size()
+        # get how often to save checkpoints
+        interval = cdc.CONFIG.getint('WRITE', 'checkpoint_interval', fallback=30)
         try:
+            mode = 'w'
+            records = 0
+            if resume is not None:
+                # remove anything written after the checkpoint and add to the end
+                with open(path, 'r+b') as file:
+                    file.truncate(resume['output_offset'])
+                mode = 'a'
+                records = resume['records']
+            last_checkpoint = time.time()
             # open file for writing
-            with open(path, 'w', buffer, encoding=self.options['w_encoding']) as file:
+            with open(path, mode, buffer, encoding=self.options['w_encoding']) as file:
                 # iterate through records in input file
-                for info in self.read_file.read_data():
+                for info in self.read_records():
                     # run it through process_data generator and write line-by-line
-                    file.write(self.get_document(info))
+                    document = self.get_document(info)
+                    start = time.perf_counter()
+                    file.write(document)
+                    self.add_time('write', time.perf_counter() - start)
+                    # a record is only finished after its last part
+                    if info.get('continues', False):
+                        continue
+                    records += 1
+                    # save a checkpoint every so often, between records
+                    if self.checkpoint is not None and time.time() - last_checkpoint >= interval:
+                        file.flush()
+                        offset, line = self.read_file.get_position()
+                        self.checkpoint.save(offset, line, records, path, file.tell())
+                        last_checkpoint = time.time()
         except:
-            os.remove(path)
+            # keep the output if the conversion can be resumed from a checkpoint
+            if self.checkpoint is None or not self.checkpoint.exists():
+                os.remove(path)
             raise
+        # the file is finished so the checkpoint isn't needed
+        if self.checkpoint is not None:
+            self.checkpoint.remove()
+
+    def merge_dir(self, merge):
+        """Joins the part files of a split file into the output file, in order"""
+        try:
+            # make sure every chunk wrote its part
+            for part in merge['parts']:
+                if not os.path.isfile(part):
+                    self.read_file.put_error(self.read_file.info['metadata']['filename'], 'Could not merge the output because a part of the file was not converted.')
+            # build path and make sure it's safe to write to
+            path = os.path.join(self.options['output_dir'], self.options['output_filename'])
+            path = self.get_safe_path(path)
+            # get buffer size
+            buffer = self.get_buffer_size()
+            # progress is reported in input bytes, so scale the bytes copied
+            total = sum(os.path.getsize(part) for part in merge['parts'])
+            copied = 0
+            self.read_file.progress['state'] = 'Merging'
+            # the chunks already reported the records, this job only joins their parts
+            self.read_file.progress['merged_parts'] = len(merge['parts'])
+            self.read_file.prog_nowait()
+            try:
+                with open(path, 'wb') as file:
+                    for part in merge['parts']:
+                        start = time.perf_counter()
+                        with open(part, 'rb') as part_file:
+                            shutil.copyfileobj(part_file, file, buffer)
+                        self.add_time('merge', time.perf_counter() - start)
+                        # update progress after each part
+                        copied += os.path.getsize(part)
+                        if total:
+                            self.read_file.progress['progress'] = int(self.read_file.info['metadata']['size'] * copied / total)
+                        self.read_file.prog_nowait()
+            except:
+                os.remove(path)
+                raise
+            # add the warnings the chunks wrote to files to the file's warnings
+            merged = 0
+            for part in merge['parts']:
+                if os.path.isfile(get_warnings_path(part)):
+                    merged += self.read_file.warnings.append(get_warnings_path(part))
+            if merged:
+                self.read_file.progress['merged_warnings'] = merged
+        finally:
+            # always clean up the parts
+            shutil.rmtree(merge['dir'], ignore_errors=True)
 
     def process_data(self, info):
         """Generator for processing the data with the UC_PROPS"""
+        # only the first part of a document gets a delimiter
+        first = not self.continuing
         # process the lines with the super-generator
         info = super().process_data(info)
+        if not first:
+            return info
         # if the user didn't provide a delimiter, yield default
         if self.options['concat_delim'] is None:
             info['data'].insert(0, '===\n')
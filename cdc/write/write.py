@@ -1,5 +1,6 @@
 """Contains superclass for writing files"""
 import os
+import time
 
 from ..utils.ucprop import UCPropMixin
 
@@ -11,10 +12,64 @@ class Write(UCPropMixin, object):
     CLI_LABELS = []
     DESCRIPTION = ''
 
+    # whether the outputs for chunks of a split file can be merged into one
+    MERGEABLE = False
+
+    # whether the writer can save checkpoints and resume from them
+    RESUMABLE = False
+
+    # whether the writer can take a long document in parts, which some
+    # readers yield with info['continues'] set until the last part
+    STREAMABLE = False
+
     def __init__(self, options, read_file):
         # create instance variables for options and reader object
         self.options = options
         self.read_file = read_file
+        # the checkpoint to save progress to if the conversion can be resumed
+        self.checkpoint = None
+        # let the reader know if it can yield documents in parts
+        self.read_file.streaming = self.STREAMABLE
+
+    def add_time(self, stage, seconds):
+        """Adds seconds to the time spent in a stage, which is reported in the progress dict"""
+        timings = self.read_file.progress['timings']
+        timings[stage] = timings.get(stage, 0) + seconds
+
+    def read_records(self):
+        """Generator over the records from the reader's read_data() that times the reading,
+        and stops once it has the number of records the user wants for a sample"""
+        sample_size = self.options.get('sample_size')
+        # the reader picks the records for a random sample if it can find them in the middle of the file
+        if sample_size and self.options.get('sample_mode') == 'random':
+            start = time.perf_counter()
+            self.read_file.sample = self.read_file.sample_ranges(sample_size)
+            self.add_time('read', time.perf_counter() - start)
+            if self.read_file.sample is None:
+                self.read_file.put_warning(self.read_file.info['metadata']['filename'], 'no_random_sample', None, sample_size)
+        records = self.read_file.read_data()
+        # the number of whole records so far
+        count = 0
+        try:
+            while not sample_size or count < sample_size:
+                start = time.perf_counter()
+                paused = self.read_file.paused
+                try:
+                    info = next(records)
+                finally:
+                    # don't count the time the reader spent paused
+                    self.add_time('read', time.perf_counter() - start - (self.read_file.paused - paused))
+                # a document in parts is one record once its last part is read
+                if not info.get('continues'):
+                    count += 1
+                yield info
+            # the sample is done, so the rest of the file counts as read
+            self.read_file.progress['progress'] = self.read_file.progress['size']
+            self.read_file.progress['processed'] = count
+        except StopIteration:
+            return
+        finally:
+            records.close()
     
     def get_safe_path(self, path):
         """Returns a path that won't cause overwriting"""
@@ -41,5 +96,10 @@ class Write(UCPropMixin, object):
         #     self.read_file.put_warning(self.read_file.info['metadata']['filename'], 'Output filename changed to {} to prevent overwriting.'.format(os.path.basename(path)))
         # set the output path in the progress dict so it can be logged
         self.read_file.progress['output_path'] = path
+        # and keep every path, a writer can write more than one file for an input
+        self.read_file.progress.setdefault('output_paths', []).append(path)
+        # the warnings file is named after the first one
+        if len(self.read_file.progress['output_paths']) == 1:
+            self.read_file.warnings.name_after(path)
         # return the path
         return path
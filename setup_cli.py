@@ -7,7 +7,7 @@ with open(os.path.join(cur_path, 'cdc', 'resources', 'version.txt'), 'r') as vfi
  
 setup(
     name = "Canary Data Converter",
-    packages = ["cdc", "cdc.cli", "cdc.read", "cdc.write", "cdc.gui", "cdc.utils"],
+    packages = ["cdc", "cdc.cli", "cdc.read", "cdc.write", "cdc.gui", "cdc.utils", "cdc.bench"],
     entry_points = {
         "console_scripts": ['canarydc = cdc.cli.application:main']
         },
@@ -0,0 +1,64 @@
+"""Shared fixtures for the tests, which convert small synthetic files through the
+same worker pool and conversion thread the interfaces use"""
+import os
+
+import pytest
+
+import cdc
+from cdc.bench import corpus, harness
+from cdc.utils import manifest
+
+def get_handler(name):
+    """Returns the Reader or Writer class with the class name"""
+    readers, writers = harness.get_handlers()
+    for Handler in readers + writers:
+        if Handler.__name__ == name:
+            return Handler
+    raise KeyError(name)
+
+def convert(reader, writer, input_dir, output_dir, processes=1, errors=False, **options):
+    """Converts the files in input_dir with the default options changed by options,
+    returns the results from cdc.bench.harness.run_conversion. Fails the test if there
+    were errors, unless they're expected."""
+    Reader = get_handler(reader)
+    Writer = get_handler(writer)
+    os.makedirs(output_dir, exist_ok=True)
+    conversion_options = harness.get_options(Reader, Writer, input_dir, output_dir, processes, 'plain')
+    conversion_options.update(options)
+    results = harness.run_conversion(Reader, Writer, conversion_options)
+    if not errors:
+        assert not results['errors']
+    return results
+
+def read_outputs(output_dir):
+    """Returns a dict of the name and contents of each output file, without the
+    conversion logs, manifest, warnings files or the converter's own folders"""
+    outputs = {}
+    for name in os.listdir(output_dir):
+        path = os.path.join(output_dir, name)
+        if not os.path.isfile(path) or name.endswith('.log') or name == manifest.FILENAME:
+            continue
+        with open(path, 'rb') as file:
+            outputs[name] = file.read()
+    return outputs
+
+@pytest.fixture(scope='session')
+def corpus_dirs(tmp_path_factory):
+    """Two files of each corpus format, with records of skewed lengths"""
+    return corpus.generate_corpus(str(tmp_path_factory.mktemp('corpus')), files=2, records=300, skew=1)
+
+@pytest.fixture
+def config():
+    """Returns a function that changes a config file setting for the test"""
+    changed = []
+
+    def set_config(section, option, value):
+        changed.append((section, option, cdc.CONFIG.get(section, option, fallback=None)))
+        cdc.CONFIG.set(section, option, str(value))
+
+    yield set_config
+    for section, option, value in reversed(changed):
+        if value is None:
+            cdc.CONFIG.remove_option(section, option)
+        else:
+            cdc.CONFIG.set(section, option, value)
@@ -0,0 +1,30 @@
+"""Tests for splitting large files into chunks converted in parallel"""
+import os
+
+import pytest
+
+from cdc.bench import corpus
+from conftest import convert, read_outputs
+
+@pytest.fixture(scope='module')
+def large_dirs(tmp_path_factory):
+    """One file of each splittable format, a few MB so it's split into 1 MB chunks"""
+    return corpus.generate_corpus(str(tmp_path_factory.mktemp('large')), ['rpdr', 'delim', 'jsonl'], files=1, records=2000, skew=1)
+
+@pytest.mark.parametrize('reader, name', [('ReadRPDR', 'rpdr'), ('ReadDelimTXT', 'delim'), ('ReadJSONL', 'jsonl')])
+@pytest.mark.parametrize('writer', ['WriteDelimTXT', 'WriteJSONL'])
+def test_chunked_output_is_the_same(tmp_path, large_dirs, reader, name, writer):
+    """Merging the chunks' parts gives the same output as converting the file in one go"""
+    plain = convert(reader, writer, large_dirs[name], str(tmp_path / 'plain'), processes=3)
+    chunked = convert(reader, writer, large_dirs[name], str(tmp_path / 'chunked'), processes=3, chunk_size=1)
+    assert read_outputs(str(tmp_path / 'plain')) == read_outputs(str(tmp_path / 'chunked'))
+    assert plain['records'] == chunked['records']
+    # the folder of parts is deleted once they're merged
+    assert not [name for name in os.listdir(str(tmp_path / 'chunked')) if name.startswith('.cdc-')]
+
+def test_file_is_split(tmp_path, large_dirs):
+    """The file really is converted in chunks"""
+    convert('ReadRPDR', 'WriteDelimTXT', large_dirs['rpdr'], str(tmp_path / 'chunked'), processes=2, chunk_size=1)
+    logs = [name for name in os.listdir(str(tmp_path / 'chunked')) if name.startswith('canary_conversion')]
+    with open(str(tmp_path / 'chunked' / logs[0]), encoding='utf8') as file:
+        assert 'Splitting rpdr_0.txt into' in file.read()
@@ -0,0 +1,76 @@
+"""Tests for the CSV/TSV reader and the external sort it groups rows with"""
+import os
+import random
+
+import pytest
+
+from cdc.utils import extsort
+from conftest import convert, read_outputs
+
+def write_lines(folder, name, lines):
+    folder.mkdir(exist_ok=True)
+    with open(str(folder / name), 'w', encoding='utf8', newline='') as file:
+        file.write(''.join(lines))
+
+def test_quoted_fields(tmp_path):
+    """Quoted fields can have delimiters and line breaks in them"""
+    write_lines(tmp_path / 'input', 'notes.csv', ['NOTE_ID,NOTE_TEXT\n', '1,"line one\nline two"\n', '2,"x, y"\n'])
+    convert('ReadCSV', 'WriteDelimTXT', str(tmp_path / 'input'), str(tmp_path / 'output'))
+    assert read_outputs(str(tmp_path / 'output')) == {'notes.txt': b'===\n1\nline one\nline two\n===\n2\nx, y\n'}
+
+def test_tsv_is_the_same_as_csv(tmp_path):
+    write_lines(tmp_path / 'csv', 'notes.csv', ['NOTE_ID,NOTE_TEXT\n', '1,"line one\nline two"\n', '2,text\n'])
+    write_lines(tmp_path / 'tsv', 'notes.tsv', ['NOTE_ID\tNOTE_TEXT\n', '1\t"line one\nline two"\n', '2\ttext\n'])
+    convert('ReadCSV', 'WriteDelimTXT', str(tmp_path / 'csv'), str(tmp_path / 'csv_output'))
+    convert('ReadCSV', 'WriteDelimTXT', str(tmp_path / 'tsv'), str(tmp_path / 'tsv_output'))
+    assert read_outputs(str(tmp_path / 'csv_output')) == read_outputs(str(tmp_path / 'tsv_output'))
+
+def test_field_larger_than_the_csv_default(tmp_path):
+    """Notes longer than the csv module's default limit of 128 KB are read"""
+    text = 'word ' * 60000
+    write_lines(tmp_path / 'input', 'notes.csv', ['NOTE_ID,NOTE_TEXT\n', '1,"{}"\n'.format(text)])
+    convert('ReadCSV', 'WriteDelimTXT', str(tmp_path / 'input'), str(tmp_path / 'output'))
+    assert read_outputs(str(tmp_path / 'output'))['notes.txt'] == '===\n1\n{}\n'.format(text).encode('utf8')
+
+def test_rows_with_the_same_id_are_one_record(tmp_path):
+    write_lines(tmp_path / 'input', 'notes.csv', ['NOTE_ID,NOTE_TEXT\n', '1,first\n', '1,second\n', '2,third\n'])
+    convert('ReadCSV', 'WriteDelimTXT', str(tmp_path / 'input'), str(tmp_path / 'output'))
+    assert read_outputs(str(tmp_path / 'output')) == {'notes.txt': b'===\n1\nfirst\nsecond\n===\n2\nthird\n'}
+
+@pytest.mark.parametrize('buffer_size', [0, 1000, 50])
+def test_grouping_mixed_rows(tmp_path, config, buffer_size):
+    """Rows for an ID that aren't together are grouped in the order they were in,
+    however many sorted runs they're spilled to"""
+    config('read.csv', 'group_buffer_size', buffer_size)
+    shuffle = random.Random(0)
+    rows = [(shuffle.randrange(50), number) for number in range(1000)]
+    write_lines(tmp_path / 'input', 'notes.csv', ['NOTE_ID,NOTE_TEXT\n'] + ['{},row {}\n'.format(*row) for row in rows])
+    convert('ReadCSV', 'WriteDelimTXT', str(tmp_path / 'input'), str(tmp_path / 'output'), group_records=True)
+    expected = ''
+    for record_id in sorted(set(str(record_id) for record_id, _ in rows)):
+        expected += '===\n{}\n'.format(record_id)
+        expected += ''.join('row {}\n'.format(number) for row_id, number in rows if str(row_id) == record_id)
+    assert read_outputs(str(tmp_path / 'output')) == {'notes.txt': expected.encode('utf8')}
+
+def write_run(entries, path):
+    with open(path, 'w', encoding='utf8') as file:
+        for key, value in entries:
+            file.write('{}\t{}\n'.format(key, value))
+    return path
+
+def read_run(path):
+    with open(path, encoding='utf8') as file:
+        for line in file:
+            key, value = line.rstrip('\n').split('\t')
+            yield key, int(value)
+
+@pytest.mark.parametrize('limit', [0, 1, 7, 1000])
+def test_external_sort(tmp_path, monkeypatch, limit):
+    """Sorting in runs, including more runs than are merged at once, is the same as
+    sorting in memory, and the runs are deleted afterwards"""
+    monkeypatch.setattr(extsort.tempfile, 'tempdir', str(tmp_path))
+    shuffle = random.Random(limit)
+    entries = [(str(shuffle.randrange(100)), number) for number in range(1000)]
+    result = list(extsort.external_sort(iter(entries), limit, lambda entry: 1, write_run, read_run))
+    assert result == sorted(entries)
+    assert os.listdir(str(tmp_path)) == []
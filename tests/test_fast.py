@@ -0,0 +1,32 @@
+"""Tests for the memory-mapped fast engine of the delimited text readers"""
+import os
+
+import pytest
+
+from cdc.bench import harness
+from conftest import convert, get_handler, read_outputs
+
+@pytest.mark.parametrize('reader, name', [('ReadRPDR', 'rpdr'), ('ReadDelimTXT', 'delim')])
+def test_fast_engine_is_used(tmp_path, corpus_dirs, reader, name):
+    """The corpus is read with the fast engine, so the other tests compare the two engines"""
+    Reader = get_handler(reader)
+    options = harness.get_options(Reader, get_handler('WriteDelimTXT'), corpus_dirs[name], str(tmp_path), 1, 'fast')
+    path = os.path.join(corpus_dirs[name], sorted(os.listdir(corpus_dirs[name]))[0])
+    assert Reader(options, path).use_fast_engine()
+
+@pytest.mark.parametrize('reader, name', [('ReadRPDR', 'rpdr'), ('ReadDelimTXT', 'delim')])
+@pytest.mark.parametrize('options', [{}, {'lowercase': True, 'text_unwrap': True}])
+def test_fast_engine_gives_the_same_output(tmp_path, corpus_dirs, reader, name, options):
+    plain = convert(reader, 'WriteDelimTXT', corpus_dirs[name], str(tmp_path / 'plain'), **options)
+    fast = convert(reader, 'WriteDelimTXT', corpus_dirs[name], str(tmp_path / 'fast'), fast_engine=True, **options)
+    assert read_outputs(str(tmp_path / 'plain')) == read_outputs(str(tmp_path / 'fast'))
+    assert plain['records'] == fast['records']
+
+def test_fast_engine_with_crlf_lines(tmp_path, corpus_dirs):
+    """Windows line endings are read the same way by both engines"""
+    input_dir = tmp_path / 'input'
+    input_dir.mkdir()
+    (input_dir / 'crlf.txt').write_bytes(b'first line\r\nsecond line\r\n[document_end]\r\nnext record\r\n[document_end]\r\n')
+    convert('ReadDelimTXT', 'WriteDelimTXT', str(input_dir), str(tmp_path / 'plain'))
+    convert('ReadDelimTXT', 'WriteDelimTXT', str(input_dir), str(tmp_path / 'fast'), fast_engine=True)
+    assert read_outputs(str(tmp_path / 'plain')) == read_outputs(str(tmp_path / 'fast'))
@@ -0,0 +1,63 @@
+"""Tests for grouping the lines of Epic Text records that aren't next to each other"""
+import os
+import random
+import tempfile
+
+import pytest
+
+from conftest import convert, read_outputs
+
+def interleave(source, path, seed=0):
+    """Writes the lines of the Epic Text file at source to path with the records'
+    lines mixed together, keeping the order of each record's own lines"""
+    with open(source, encoding='utf8', newline='') as file:
+        header = file.readline()
+        records = {}
+        for line in file:
+            records.setdefault(line.split('\t', 1)[0], []).append(line)
+    remaining = [lines for lines in records.values()]
+    shuffle = random.Random(seed)
+    with open(path, 'w', encoding='utf8', newline='') as file:
+        file.write(header)
+        while remaining:
+            lines = shuffle.choice(remaining)
+            file.write(lines.pop(0))
+            if not lines:
+                remaining.remove(lines)
+
+def split_records(output):
+    """Returns the records in a delimited text output, in the order they're in"""
+    return output.split(b'===\n')[1:]
+
+@pytest.fixture
+def mixed_dir(tmp_path, corpus_dirs):
+    """Copies of the Epic Text files with their records' lines mixed together"""
+    path = tmp_path / 'mixed'
+    path.mkdir()
+    for name in os.listdir(corpus_dirs['epic']):
+        interleave(os.path.join(corpus_dirs['epic'], name), str(path / name))
+    return str(path)
+
+@pytest.mark.parametrize('buffer_size', [0, 50000, 1000])
+def test_grouping_mixed_lines(tmp_path, config, corpus_dirs, mixed_dir, buffer_size):
+    """Mixed lines give the same records as the original files, however many sorted runs
+    they're spilled to (1000 characters makes more runs than are merged at once)"""
+    config('read.epic', 'group_buffer_size', buffer_size)
+    convert('ReadEpicText', 'WriteDelimTXT', mixed_dir, str(tmp_path / 'mixed_output'), group_records=True)
+    convert('ReadEpicText', 'WriteDelimTXT', corpus_dirs['epic'], str(tmp_path / 'grouped'), group_records=True)
+    convert('ReadEpicText', 'WriteDelimTXT', corpus_dirs['epic'], str(tmp_path / 'original'))
+    mixed = read_outputs(str(tmp_path / 'mixed_output'))
+    assert mixed == read_outputs(str(tmp_path / 'grouped'))
+    # grouping sorts the records by ID but doesn't change them
+    for name, output in read_outputs(str(tmp_path / 'original')).items():
+        assert sorted(split_records(mixed[name])) == sorted(split_records(output))
+
+def test_grouping_leaves_no_runs(tmp_path, config, mixed_dir, monkeypatch):
+    """The temporary files of sorted runs are deleted after the file is converted"""
+    temp_dir = tmp_path / 'temp'
+    temp_dir.mkdir()
+    # the workers are forked with the same temporary folder
+    monkeypatch.setattr(tempfile, 'tempdir', str(temp_dir))
+    config('read.epic', 'group_buffer_size', 1000)
+    convert('ReadEpicText', 'WriteDelimTXT', mixed_dir, str(tmp_path / 'output'), group_records=True)
+    assert os.listdir(str(temp_dir)) == []
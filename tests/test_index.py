@@ -0,0 +1,47 @@
+"""Tests for the saved index of where records start"""
+import os
+
+import pytest
+
+from cdc.utils import index
+from conftest import convert, read_outputs
+
+@pytest.mark.parametrize('reader, name', [('ReadRPDR', 'rpdr'), ('ReadDelimTXT', 'delim')])
+def test_indexed_output_is_the_same(tmp_path, config, corpus_dirs, reader, name):
+    """Building the index and reading with it give the same output as not using one"""
+    config('read.txt', 'index_folder', str(tmp_path / 'index'))
+    convert(reader, 'WriteDelimTXT', corpus_dirs[name], str(tmp_path / 'plain'))
+    convert(reader, 'WriteDelimTXT', corpus_dirs[name], str(tmp_path / 'built'), record_index=True)
+    assert len(os.listdir(str(tmp_path / 'index'))) == len(os.listdir(corpus_dirs[name]))
+    convert(reader, 'WriteDelimTXT', corpus_dirs[name], str(tmp_path / 'indexed'), record_index=True)
+    plain = read_outputs(str(tmp_path / 'plain'))
+    assert read_outputs(str(tmp_path / 'built')) == plain
+    assert read_outputs(str(tmp_path / 'indexed')) == plain
+
+def test_index_is_saved_in_the_cache_folder(tmp_path, monkeypatch, corpus_dirs):
+    """Nothing is written to the input folder"""
+    monkeypatch.setattr(index, 'get_cache_folder', lambda: str(tmp_path / 'cache'))
+    before = sorted(os.listdir(corpus_dirs['delim']))
+    convert('ReadDelimTXT', 'WriteDelimTXT', corpus_dirs['delim'], str(tmp_path / 'output'), record_index=True)
+    assert sorted(os.listdir(corpus_dirs['delim'])) == before
+    assert len(os.listdir(str(tmp_path / 'cache' / index.FOLDER))) == len(before)
+
+def test_index_is_rebuilt_when_the_file_changes(tmp_path, config):
+    config('read.txt', 'index_folder', str(tmp_path / 'index'))
+    input_dir = tmp_path / 'input'
+    input_dir.mkdir()
+    path = input_dir / 'notes.txt'
+    path.write_text('first\n[document_end]\nsecond\n[document_end]\n', encoding='utf8')
+    convert('ReadDelimTXT', 'WriteDelimTXT', str(input_dir), str(tmp_path / 'first'), record_index=True)
+    path.write_text('first\n[document_end]\nsecond\n[document_end]\nthird\n[document_end]\n', encoding='utf8')
+    convert('ReadDelimTXT', 'WriteDelimTXT', str(input_dir), str(tmp_path / 'second'), record_index=True)
+    assert read_outputs(str(tmp_path / 'second')) == {'notes.txt': b'===\nfirst\n===\nsecond\n===\nthird\n'}
+
+def test_converter_folders_are_not_input(tmp_path):
+    """Indexes saved next to the input by older versions aren't converted"""
+    input_dir = tmp_path / 'input'
+    (input_dir / '.cdc-index').mkdir(parents=True)
+    (input_dir / 'notes.txt').write_text('text\n[document_end]\n', encoding='utf8')
+    (input_dir / '.cdc-index' / 'old.txt').write_text('not input\n', encoding='utf8')
+    convert('ReadDelimTXT', 'WriteDelimTXT', None, str(tmp_path / 'output'), input_dir_subdir=str(input_dir))
+    assert list(read_outputs(str(tmp_path / 'output'))) == ['notes.txt']
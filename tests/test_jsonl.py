@@ -0,0 +1,51 @@
+"""Tests for the JSON Lines reader and writer"""
+import json
+import os
+
+from cdc.bench import corpus
+from conftest import convert, read_outputs
+
+def read_records(path):
+    with open(path, encoding='utf8') as file:
+        return [json.loads(line) for line in file]
+
+def test_round_trip(tmp_path, corpus_dirs):
+    """Converting JSON Lines to JSON Lines keeps every record's text and metadata"""
+    convert('ReadJSONL', 'WriteJSONL', corpus_dirs['jsonl'], str(tmp_path / 'first'))
+    for name in os.listdir(corpus_dirs['jsonl']):
+        source = read_records(os.path.join(corpus_dirs['jsonl'], name))
+        output = read_records(str(tmp_path / 'first' / name))
+        # the writer adds the input filename to the metadata
+        assert all(record.pop('filename') == name for record in output)
+        assert output == source
+    # and converting the output again with only the original fields gives the input back
+    fields = corpus.CorpusGenerator().get_fields(corpus.JSONL_FIELDS, 'text')[:-1]
+    convert('ReadJSONL', 'WriteJSONL', str(tmp_path / 'first'), str(tmp_path / 'second'), json_metadata_fields=','.join(fields))
+    for name in os.listdir(corpus_dirs['jsonl']):
+        assert read_records(str(tmp_path / 'second' / name)) == read_records(os.path.join(corpus_dirs['jsonl'], name))
+
+def test_text_is_the_same_as_the_text_writer(tmp_path, corpus_dirs):
+    """The JSON writer writes the same text the plain text writer does"""
+    convert('ReadJSONL', 'WriteJSONL', corpus_dirs['jsonl'], str(tmp_path / 'json'))
+    convert('ReadJSONL', 'WriteDelimTXT', corpus_dirs['jsonl'], str(tmp_path / 'text'))
+    for name, output in read_outputs(str(tmp_path / 'text')).items():
+        records = read_records(str(tmp_path / 'json' / (os.path.splitext(name)[0] + '.jsonl')))
+        assert b''.join(b'===\n' + record['text'].encode('utf8') + b'\n' for record in records) == output
+
+def test_invalid_lines_are_skipped(tmp_path):
+    """Lines that aren't JSON are warned about, and the metadata is written as strings"""
+    input_dir = tmp_path / 'input'
+    input_dir.mkdir()
+    (input_dir / 'notes.jsonl').write_text('{"id": 1, "text": "caf\\u00e9"}\n{not json\n\n{"id": 2, "text": "two"}\n', encoding='utf8')
+    results = convert('ReadJSONL', 'WriteJSONL', str(input_dir), str(tmp_path / 'output'))
+    assert results['warnings'] == 1
+    assert read_outputs(str(tmp_path / 'output'))['notes.jsonl'] == (
+        '{"id":"1","filename":"notes.jsonl","text":"café"}\n'
+        '{"id":"2","filename":"notes.jsonl","text":"two"}\n').encode('utf8')
+
+def test_ascii_output(tmp_path):
+    input_dir = tmp_path / 'input'
+    input_dir.mkdir()
+    (input_dir / 'notes.jsonl').write_text('{"text": "café"}\n', encoding='utf8')
+    convert('ReadJSONL', 'WriteJSONL', str(input_dir), str(tmp_path / 'output'), json_ascii=True)
+    assert read_outputs(str(tmp_path / 'output'))['notes.jsonl'] == b'{"filename":"notes.jsonl","text":"caf\\u00e9"}\n'
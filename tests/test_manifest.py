@@ -0,0 +1,64 @@
+"""Tests for the manifest that --incremental uses to skip unchanged inputs"""
+import os
+import shutil
+
+import pytest
+
+from conftest import convert, read_outputs
+
+@pytest.fixture
+def input_dir(tmp_path, corpus_dirs):
+    """A copy of the delimited text files that the test can change"""
+    path = str(tmp_path / 'input')
+    shutil.copytree(corpus_dirs['delim'], path)
+    return path
+
+def get_log(output_dir):
+    """Returns the text of the newest conversion log"""
+    logs = sorted(name for name in os.listdir(output_dir) if name.startswith('canary_conversion'))
+    with open(os.path.join(output_dir, logs[-1]), encoding='utf8') as file:
+        return file.read()
+
+def change_file(path, text):
+    """Adds a record to the end of a file and moves its modified time on"""
+    with open(path, 'a', encoding='utf8') as file:
+        file.write(text)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+def test_unchanged_files_are_skipped(tmp_path, input_dir):
+    output_dir = str(tmp_path / 'output')
+    convert('ReadDelimTXT', 'WriteDelimTXT', input_dir, output_dir, incremental=True)
+    before = read_outputs(output_dir)
+    results = convert('ReadDelimTXT', 'WriteDelimTXT', input_dir, output_dir, incremental=True)
+    assert results['records'] == 0
+    assert 'Skipped 2 unchanged files' in get_log(output_dir)
+    assert read_outputs(output_dir) == before
+
+def test_changed_file_replaces_its_output(tmp_path, input_dir):
+    output_dir = str(tmp_path / 'output')
+    convert('ReadDelimTXT', 'WriteDelimTXT', input_dir, output_dir, incremental=True)
+    before = read_outputs(output_dir)
+    name = sorted(before)[0]
+    change_file(os.path.join(input_dir, name), 'a new record\n[document_end]\n')
+    convert('ReadDelimTXT', 'WriteDelimTXT', input_dir, output_dir, incremental=True)
+    after = read_outputs(output_dir)
+    # the new output takes the old one's name instead of getting a numbered one
+    assert sorted(after) == sorted(before)
+    assert after[name] != before[name]
+    assert after[name].endswith(b'a new record\n')
+    other = sorted(before)[1]
+    assert after[other] == before[other]
+
+def test_touched_file_is_compared_by_hash(tmp_path, input_dir):
+    output_dir = str(tmp_path / 'output')
+    convert('ReadDelimTXT', 'WriteDelimTXT', input_dir, output_dir, incremental=True, incremental_hash=True)
+    before = read_outputs(output_dir)
+    name = sorted(before)[0]
+    path = os.path.join(input_dir, name)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    results = convert('ReadDelimTXT', 'WriteDelimTXT', input_dir, output_dir, incremental=True, incremental_hash=True)
+    assert results['records'] == 0
+    assert 'Skipping {} (unchanged)'.format(os.path.abspath(path)) in get_log(output_dir)
+    assert read_outputs(output_dir) == before
@@ -0,0 +1,39 @@
+"""Tests for converting on the persistent worker pool"""
+import os
+
+import pytest
+
+from conftest import convert, read_outputs
+
+# the reader for each corpus format
+READERS = [
+    ('ReadRPDR', 'rpdr'),
+    ('ReadEpicText', 'epic'),
+    ('ReadDelimTXT', 'delim'),
+    ('ReadCSV', 'csv'),
+    ('ReadJSONL', 'jsonl')
+]
+
+@pytest.mark.parametrize('reader, name', READERS)
+def test_processes_give_same_output(tmp_path, corpus_dirs, reader, name):
+    """The output doesn't depend on how many workers converted the files"""
+    one = convert(reader, 'WriteDelimTXT', corpus_dirs[name], str(tmp_path / 'one'), processes=1)
+    three = convert(reader, 'WriteDelimTXT', corpus_dirs[name], str(tmp_path / 'three'), processes=3)
+    outputs = read_outputs(str(tmp_path / 'one'))
+    assert len(outputs) == len(os.listdir(corpus_dirs[name]))
+    assert outputs == read_outputs(str(tmp_path / 'three'))
+    assert one['records'] == three['records']
+
+def test_pool_runs_more_files_than_workers(tmp_path, corpus_dirs):
+    """Workers take the next job when they finish one, so every file is converted"""
+    input_dir = tmp_path / 'input'
+    input_dir.mkdir()
+    source = os.path.join(corpus_dirs['delim'], os.listdir(corpus_dirs['delim'])[0])
+    with open(source, 'rb') as file:
+        data = file.read()
+    for number in range(7):
+        (input_dir / 'file_{}.txt'.format(number)).write_bytes(data)
+    convert('ReadDelimTXT', 'WriteDelimTXT', str(input_dir), str(tmp_path / 'output'), processes=2)
+    outputs = read_outputs(str(tmp_path / 'output'))
+    assert sorted(outputs) == ['file_{}.txt'.format(number) for number in range(7)]
+    assert len(set(outputs.values())) == 1
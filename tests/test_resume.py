@@ -0,0 +1,43 @@
+"""Tests for resuming a conversion from the checkpoint saved before it failed"""
+import multiprocessing
+import os
+
+import pytest
+
+from cdc.write.text import WriteDelimTXT
+from conftest import convert, read_outputs
+
+# the workers only have the failing writer if they're forked from the test
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason='workers have to be forked')
+
+def fail_after(count):
+    """Returns a get_document that raises an error after count documents"""
+    get_document = WriteDelimTXT.get_document
+    written = []
+
+    def failing_get_document(self, info):
+        if len(written) >= count:
+            raise RuntimeError('the conversion failed')
+        if not info.get('continues', False):
+            written.append(True)
+        return get_document(self, info)
+
+    return failing_get_document
+
+@pytest.mark.parametrize('reader, name', [('ReadRPDR', 'rpdr'), ('ReadDelimTXT', 'delim'), ('ReadJSONL', 'jsonl')])
+def test_resume_gives_the_same_output(tmp_path, monkeypatch, config, corpus_dirs, reader, name):
+    # save a checkpoint after every record
+    config('WRITE', 'checkpoint_interval', 0)
+    output_dir = str(tmp_path / 'resumed')
+    monkeypatch.setattr(WriteDelimTXT, 'get_document', fail_after(100))
+    failed = convert(reader, 'WriteDelimTXT', corpus_dirs[name], output_dir, errors=True, resume=True)
+    assert failed['errors']
+    # the partial output and its checkpoint are kept to resume from
+    assert os.path.isdir(os.path.join(output_dir, '.cdc-checkpoints'))
+    monkeypatch.undo()
+    convert(reader, 'WriteDelimTXT', corpus_dirs[name], output_dir, resume=True)
+    convert(reader, 'WriteDelimTXT', corpus_dirs[name], str(tmp_path / 'plain'))
+    # starting over would have written a numbered file next to the partial one
+    assert read_outputs(output_dir) == read_outputs(str(tmp_path / 'plain'))
+    # the checkpoints are deleted once the files are finished
+    assert not os.path.exists(os.path.join(output_dir, '.cdc-checkpoints'))
@@ -0,0 +1,47 @@
+"""Tests for converting only a sample of the records"""
+import pytest
+
+from conftest import convert, read_outputs
+
+READERS = [
+    ('ReadRPDR', 'rpdr'),
+    ('ReadEpicText', 'epic'),
+    ('ReadDelimTXT', 'delim'),
+    ('ReadCSV', 'csv'),
+    ('ReadJSONL', 'jsonl')
+]
+
+def get_records(output_dir):
+    """Returns the JSON Lines records in each output file"""
+    return {name: output.splitlines() for name, output in read_outputs(output_dir).items()}
+
+@pytest.mark.parametrize('reader, name', READERS)
+@pytest.mark.parametrize('mode', ['first', 'random'])
+def test_sample_size(tmp_path, corpus_dirs, reader, name, mode):
+    """Each file gets the number of records asked for, and they're records from the file"""
+    convert(reader, 'WriteJSONL', corpus_dirs[name], str(tmp_path / 'all'))
+    convert(reader, 'WriteJSONL', corpus_dirs[name], str(tmp_path / 'sample'), sample_size=25, sample_mode=mode)
+    everything = get_records(str(tmp_path / 'all'))
+    sample = get_records(str(tmp_path / 'sample'))
+    assert sorted(sample) == sorted(everything)
+    for output_name, records in sample.items():
+        assert len(records) == 25
+        assert len(set(records)) == 25
+        assert set(records) <= set(everything[output_name])
+        if mode == 'first':
+            assert records == everything[output_name][:25]
+
+@pytest.mark.parametrize('mode', ['first', 'random'])
+def test_sample_larger_than_file(tmp_path, corpus_dirs, mode):
+    """A sample larger than the file is every record in it"""
+    convert('ReadRPDR', 'WriteJSONL', corpus_dirs['rpdr'], str(tmp_path / 'all'))
+    convert('ReadRPDR', 'WriteJSONL', corpus_dirs['rpdr'], str(tmp_path / 'sample'), sample_size=1000, sample_mode=mode)
+    everything = get_records(str(tmp_path / 'all'))
+    for output_name, records in get_records(str(tmp_path / 'sample')).items():
+        assert sorted(records) == sorted(everything[output_name])
+
+def test_sample_for_the_job(tmp_path, corpus_dirs):
+    """With the job scope, the sample is split across the files"""
+    convert('ReadDelimTXT', 'WriteJSONL', corpus_dirs['delim'], str(tmp_path / 'sample'), sample_size=40, sample_scope='job')
+    records = get_records(str(tmp_path / 'sample'))
+    assert sum(len(file_records) for file_records in records.values()) == 40
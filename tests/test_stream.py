@@ -0,0 +1,79 @@
+"""Tests for wrapping and unwrapping documents that are written in parts"""
+import random
+import textwrap
+
+import pytest
+
+from cdc.bench import corpus
+from cdc.utils.stream import StreamUnwrapper, StreamWrapper
+from cdc.utils.textunwrapper.unwrapper import RuleBasedUnwrapper
+from conftest import convert, read_outputs
+
+def get_lines(seed, count=60):
+    """Returns wrapped lines of text in paragraphs, with tabs and runs of spaces"""
+    generator = corpus.CorpusGenerator(seed=seed)
+    lines = []
+    for number in range(count):
+        line = generator.get_line()
+        if number % 7 == 3:
+            line = '\t' + line.replace(' ', '  ', 2)
+        lines.append(line + '\n')
+        if number % 9 == 8:
+            lines.append('\n')
+    return lines
+
+def split_lines(lines, seed):
+    """Splits lines into parts at random line boundaries"""
+    shuffle = random.Random(seed)
+    points = sorted(shuffle.sample(range(1, len(lines)), 5))
+    return [lines[start:end] for start, end in zip([0] + points, points + [len(lines)])]
+
+@pytest.mark.parametrize('seed', range(10))
+def test_wrapping_in_parts(seed):
+    """Wrapping a document in parts gives the same lines as wrapping all of it"""
+    lines = get_lines(seed)
+    expected = [line + '\n' for line in textwrap.TextWrapper(40).wrap(''.join(lines))]
+    wrapper = StreamWrapper(textwrap.TextWrapper(40))
+    parts = split_lines(lines, seed)
+    wrapped = []
+    for index, part in enumerate(parts):
+        wrapped += wrapper.wrap(part, last=index == len(parts) - 1)
+    assert wrapped == expected
+
+def test_unwrapping_in_one_part():
+    """A document in one part is unwrapped the same as by the unwrapper, after its first line"""
+    lines = get_lines(0)
+    unwrapper = RuleBasedUnwrapper()
+    expected = lines[:1] + unwrapper.render(unwrapper.process(''.join(lines[1:])), 'reflow').splitlines(True)
+    assert StreamUnwrapper(unwrapper).unwrap(lines) == expected
+
+@pytest.mark.parametrize('seed', range(10))
+def test_unwrapping_in_parts(seed):
+    """Unwrapping a document in parts keeps all of its words in order (whether the
+    text is wrapped is decided for each part, so the line breaks can differ)"""
+    lines = get_lines(seed)
+    stream = StreamUnwrapper(RuleBasedUnwrapper())
+    parts = split_lines(lines, seed)
+    unwrapped = []
+    for index, part in enumerate(parts):
+        unwrapped += stream.unwrap(part, last=index == len(parts) - 1)
+    assert all(line.endswith('\n') for line in unwrapped)
+    assert ''.join(unwrapped).split() == ''.join(lines).split()
+
+def split_words(outputs):
+    return {name: output.split() for name, output in outputs.items()}
+
+@pytest.mark.parametrize('options', [{'text_wrap': 40}, {'lowercase': True, 'text_wrap': 60}])
+def test_writer_parts(tmp_path, config, corpus_dirs, options):
+    """Writing plain text files a few hundred characters at a time gives the same output"""
+    convert('ReadTXT', 'WriteTXT', corpus_dirs['delim'], str(tmp_path / 'whole'), **options)
+    config('read.txt', 'stream_part_size', 300)
+    convert('ReadTXT', 'WriteTXT', corpus_dirs['delim'], str(tmp_path / 'parts'), **options)
+    assert read_outputs(str(tmp_path / 'whole')) == read_outputs(str(tmp_path / 'parts'))
+
+def test_writer_parts_unwrapped(tmp_path, config, corpus_dirs):
+    """Unwrapping plain text files a few hundred characters at a time keeps the text"""
+    convert('ReadTXT', 'WriteTXT', corpus_dirs['delim'], str(tmp_path / 'whole'), text_unwrap=True)
+    config('read.txt', 'stream_part_size', 300)
+    convert('ReadTXT', 'WriteTXT', corpus_dirs['delim'], str(tmp_path / 'parts'), text_unwrap=True)
+    assert split_words(read_outputs(str(tmp_path / 'whole'))) == split_words(read_outputs(str(tmp_path / 'parts')))